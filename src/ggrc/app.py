@@ -159,6 +159,16 @@ def init_extra_listeners():
   listeners.register_fulltext_listeners()
 
 
+def init_relationship_graph():
+  from ggrc.cache import relationship_graph
+  relationship_graph.init_graph(app)
+
+
+def init_profiling():
+  from ggrc.utils import profiling
+  profiling.init_profiling(app)
+
+
 def _enable_debug_toolbar():
   """Enable flask debug toolbar for benchmarking requests."""
   if getattr(settings, "FLASK_DEBUGTOOLBAR", False):
@@ -242,6 +252,8 @@ init_views(app)
 init_extension_blueprints(app)
 init_permissions_provider()
 init_extra_listeners()
+init_relationship_graph()
+init_profiling()
 notifications.register_notification_listeners()
 
 _enable_debug_toolbar()
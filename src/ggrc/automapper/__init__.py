@@ -3,6 +3,7 @@
 
 """Automapper generator."""
 
+import collections
 from datetime import datetime
 from logging import getLogger
 
@@ -31,6 +32,10 @@ class AutomapperGenerator(object):
   Consumes automapping rules and newly created Relationships, creates
   autogenerated Relationships registering them in Automappings table.
 
+  All relationships created in a single flush are processed together. They
+  share the neighborhood cache and the set of processed pairs, and all
+  generated relationships are inserted with a single statement.
+
   Note: we can rely on the order of src/dst pairs of queued and
   inserted mappings since we only queue ordered pairs (see `order`).
   """
@@ -42,6 +47,9 @@ class AutomapperGenerator(object):
     self.queue = set()
     self.auto_mappings = set()
     self.related_cache = RelationshipsCache()
+    self.permissions_cache = {}
+    # generated relationships that are not inserted yet
+    self.pending = collections.defaultdict(set)
 
   def related(self, obj):
     if obj in self.related_cache.cache:
@@ -49,59 +57,85 @@ class AutomapperGenerator(object):
 
     # Pre-fetch neighborhood for enqueued objects since we're gonna need these
     # results in a few steps. This drastically reduces number of queries.
-    stubs = {s for rel in self.queue for s in rel}
+    stubs = {s for rel in self.queue for s in rel
+             if s not in self.related_cache.cache}
     stubs.add(obj)
-    self.related_cache.populate_cache(stubs)
+    self._populate_cache(stubs)
 
     return self.related_cache.cache[obj]
 
+  def _populate_cache(self, stubs):
+    """Fetch neighborhoods of stubs including not yet inserted mappings."""
+    self.related_cache.populate_cache(stubs)
+    for stub in stubs:
+      if stub in self.pending:
+        self.related_cache.cache[stub].update(self.pending[stub])
+
   @staticmethod
   def order(src, dst):
     return (src, dst) if src < dst else (dst, src)
 
   def generate_automappings(self, relationship):
+    self.generate_automappings_for([relationship])
+
+  def generate_automappings_for(self, relationships):
+    """Generate and insert automappings for new relationships.
+
+    Args:
+      relationships: list of relationships created in the current flush.
+    """
+    with benchmark("Automapping generate_automappings_for"):
+      self._populate_cache({
+          stub for relationship in relationships
+          for stub in (Stub.from_source(relationship),
+                       Stub.from_destination(relationship))
+      })
+      parent_mappings = []
+      for relationship in relationships:
+        self._generate(relationship)
+        if len(self.auto_mappings) <= self.COUNT_LIMIT:
+          parent_mappings.append((relationship, self.auto_mappings))
+        else:
+          relationship._json_extras = {
+              'automapping_limit_exceeded': True
+          }
+      self._flush(parent_mappings)
+
+  def _generate(self, relationship):
+    """Collect automappings of a single relationship in self.auto_mappings."""
     self.auto_mappings = set()
-    with benchmark("Automapping generate_automappings"):
-      # initial relationship is special since it is already created and
-      # processing it would abort the loop so we manually enqueue the
-      # neighborhood
-      src = Stub.from_source(relationship)
-      dst = Stub.from_destination(relationship)
-      self._step(src, dst)
-      self._step(dst, src)
-      while self.queue:
-        if len(self.auto_mappings) > self.COUNT_LIMIT:
-          break
-        src, dst = entry = self.queue.pop()
-
-        if {src.type, dst.type} != {"Audit", "Issue"}:
-          # Auditor doesn't have edit (+map) permission on the Audit,
-          # but the Auditor should be allowed to Raise an Issue.
-          # Since Issue-Assessment-Audit is the only rule that
-          # triggers Issue to Audit mapping, we should skip the
-          # permission check for it
-          if not (self._can_map_to(src, relationship) and
-                  self._can_map_to(dst, relationship)):
-            continue
-
-        created = self._ensure_relationship(src, dst)
-        self.processed.add(entry)
-        if not created:
-          # If the edge already exists it means that auto mappings for it have
-          # already been processed and it is safe to cut here.
+    # initial relationship is special since it is already created and
+    # processing it would abort the loop so we manually enqueue the
+    # neighborhood
+    src = Stub.from_source(relationship)
+    dst = Stub.from_destination(relationship)
+    self._step(src, dst)
+    self._step(dst, src)
+    while self.queue:
+      if len(self.auto_mappings) > self.COUNT_LIMIT:
+        break
+      src, dst = entry = self.queue.pop()
+
+      if {src.type, dst.type} != {"Audit", "Issue"}:
+        # Auditor doesn't have edit (+map) permission on the Audit,
+        # but the Auditor should be allowed to Raise an Issue.
+        # Since Issue-Assessment-Audit is the only rule that
+        # triggers Issue to Audit mapping, we should skip the
+        # permission check for it
+        if not (self._can_map_to(src, relationship) and
+                self._can_map_to(dst, relationship)):
           continue
-        self._step(src, dst)
-        self._step(dst, src)
 
-      if len(self.auto_mappings) <= self.COUNT_LIMIT:
-        self._flush(relationship)
-      else:
-        relationship._json_extras = {
-            'automapping_limit_exceeded': True
-        }
+      created = self._ensure_relationship(src, dst)
+      self.processed.add(entry)
+      if not created:
+        # If the edge already exists it means that auto mappings for it have
+        # already been processed and it is safe to cut here.
+        continue
+      self._step(src, dst)
+      self._step(dst, src)
 
-  @staticmethod
-  def _can_map_to(obj, parent_relationship):
+  def _can_map_to(self, obj, parent_relationship):
     """True if the current user can edit obj in parent_relationship.context."""
     context_id = None
     if parent_relationship.context:
@@ -112,50 +146,74 @@ class AutomapperGenerator(object):
                      parent_relationship, parent_relationship.context,
                      parent_relationship.context_id)
       context_id = parent_relationship.context_id
-    return is_allowed_update(obj.type, obj.id, context_id)
+    key = (obj, context_id)
+    if key not in self.permissions_cache:
+      self.permissions_cache[key] = is_allowed_update(obj.type, obj.id,
+                                                      context_id)
+    return self.permissions_cache[key]
 
-  def _flush(self, parent_relationship):
-    """Manually INSERT generated automappings."""
-    if not self.auto_mappings:
+  @staticmethod
+  def _insert_automapping(parent_relationship):
+    """Insert the Automapping row of a parent relationship and get its id."""
+    automapping_result = db.session.execute(
+        Automapping.__table__.insert().values(
+            relationship_id=parent_relationship.id,
+            source_id=parent_relationship.source_id,
+            source_type=parent_relationship.source_type,
+            destination_id=parent_relationship.destination_id,
+            destination_type=parent_relationship.destination_type,
+        )
+    )
+    return automapping_result.inserted_primary_key[0]
+
+  def _flush(self, parent_mappings):
+    """Manually INSERT generated automappings.
+
+    Args:
+      parent_mappings: list of parent relationships with sets of their
+        generated (src, dst) pairs.
+    """
+    parent_mappings = [(parent, auto_mappings)
+                       for parent, auto_mappings in parent_mappings
+                       if auto_mappings]
+    if not parent_mappings:
       return
     with benchmark("Automapping flush"):
       current_user_id = login.get_current_user_id()
-      automapping_result = db.session.execute(
-          Automapping.__table__.insert().values(
-              relationship_id=parent_relationship.id,
-              source_id=parent_relationship.source_id,
-              source_type=parent_relationship.source_type,
-              destination_id=parent_relationship.destination_id,
-              destination_type=parent_relationship.destination_type,
-          )
-      )
-      automapping_id = automapping_result.inserted_primary_key
       now = datetime.now()
+      automapping_ids = []
+      values = []
+      for parent_relationship, auto_mappings in parent_mappings:
+        automapping_id = self._insert_automapping(parent_relationship)
+        automapping_ids.append(automapping_id)
+        original = self.order(Stub.from_source(parent_relationship),
+                              Stub.from_destination(parent_relationship))
+        values.extend({
+            "id": None,
+            "modified_by_id": current_user_id,
+            "created_at": now,
+            "updated_at": now,
+            "source_id": src.id,
+            "source_type": src.type,
+            "destination_id": dst.id,
+            "destination_type": dst.type,
+            "context_id": None,
+            "status": None,
+            "parent_id": parent_relationship.id,
+            "automapping_id": automapping_id}
+            for src, dst in auto_mappings
+            if (src, dst) != original)  # (src, dst) is sorted
+      if not values:
+        return
       # We are doing an INSERT IGNORE INTO here to mitigate a race condition
       # that happens when multiple simultaneous requests create the same
       # automapping. If a relationship object fails our unique constraint
       # it means that the mapping was already created by another request
       # and we can safely ignore it.
       inserter = Relationship.__table__.insert().prefix_with("IGNORE")
-      original = self.order(Stub.from_source(parent_relationship),
-                            Stub.from_destination(parent_relationship))
-      db.session.execute(inserter.values([{
-          "id": None,
-          "modified_by_id": current_user_id,
-          "created_at": now,
-          "updated_at": now,
-          "source_id": src.id,
-          "source_type": src.type,
-          "destination_id": dst.id,
-          "destination_type": dst.type,
-          "context_id": None,
-          "status": None,
-          "parent_id": parent_relationship.id,
-          "automapping_id": automapping_id}
-          for src, dst in self.auto_mappings
-          if (src, dst) != original]))  # (src, dst) is sorted
-
-      self._set_audit_id_for_issues(automapping_id)
+      db.session.execute(inserter.values(values))
+
+      self._set_audit_id_for_issues(automapping_ids)
 
       cache = Cache.get_cache(create=True)
       if cache:
@@ -164,13 +222,13 @@ class AutomapperGenerator(object):
         # will be created.
         cache.new.update(
             (relationship, relationship.log_json())
-            for relationship in Relationship.query.filter_by(
-                automapping_id=automapping_id,
+            for relationship in Relationship.query.filter(
+                Relationship.automapping_id.in_(automapping_ids),
             )
         )
 
   @staticmethod
-  def _set_audit_id_for_issues(automapping_id):
+  def _set_audit_id_for_issues(automapping_ids):
     """Set audit_id and context_id in automapped Issues."""
     iss, rel, aud = Issue.__table__, Relationship.__table__, Audit.__table__
     db.session.execute(
@@ -181,7 +239,7 @@ class AutomapperGenerator(object):
         })
         .where(
             sa.and_(
-                rel.c.automapping_id == automapping_id,
+                rel.c.automapping_id.in_(automapping_ids),
                 rel.c.source_type == Audit.__name__,
                 rel.c.source_id == aud.c.id,
                 rel.c.destination_type == Issue.__name__,
@@ -217,6 +275,8 @@ class AutomapperGenerator(object):
     self._check_single_audit_restriction(src, dst)
 
     self.auto_mappings.add((src, dst))
+    self.pending[src].add(dst)
+    self.pending[dst].add(src)
 
     if src in self.related_cache.cache:
       self.related_cache.cache[src].add(dst)
@@ -242,9 +302,9 @@ def register_automapping_listeners():
   # pylint: disable=unused-variable,unused-argument
 
   def automap(session, _):
-    automapper = AutomapperGenerator()
-    for obj in session.new:
-      if isinstance(obj, Relationship):
-        automapper.generate_automappings(obj)
+    relationships = [obj for obj in session.new
+                     if isinstance(obj, Relationship)]
+    if relationships:
+      AutomapperGenerator().generate_automappings_for(relationships)
 
   sa.event.listen(sa.orm.session.Session, "after_flush", automap)
@@ -175,6 +175,9 @@ class Cache:  # pylint: disable=no-self-use
   def add_multi(self, *_):
     return None
 
+  def set_multi(self, *_):
+    return None
+
   def update_multi(self, *_):
     return None
 
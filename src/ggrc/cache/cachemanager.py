@@ -24,6 +24,8 @@ class CacheManager:
                          before and after flush
     marked_for_<op>: dictionaries used in session event listeners after flush,
                      before and after commit
+    resource_generations: generations of the worker resource cache read
+                          before resources of the request were fetched
 
   Returns:
     None
@@ -52,6 +54,7 @@ class CacheManager:
     self.marked_for_add = {}
     self.marked_for_update = {}
     self.marked_for_delete = []
+    self.resource_generations = None
 
   def get_collection(self, category, resource, filter):
     """Get collection from cache.
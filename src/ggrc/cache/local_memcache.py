@@ -0,0 +1,137 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""In-process stand-in for the AppEngine memcache client.
+
+LocalMemcacheClient implements the part of ``google.appengine.api.memcache
+.Client`` API used by GGRC on top of a dict shared by all clients of the
+process. It is used when ``MEMCACHE_CLIENT`` setting is "local", e.g. in
+tests and development environments without the AppEngine SDK.
+"""
+
+import time
+from copy import deepcopy
+
+# Return values of Client.delete
+DELETE_NETWORK_FAILURE = 0
+DELETE_ITEM_MISSING = 1
+DELETE_SUCCESSFUL = 2
+
+
+class LocalMemcacheClient(object):
+  """Dict backed memcache client.
+
+  Values are copied on every write and read, the same way the real client
+  pickles them, so callers can not change cached values in place.
+  """
+
+  _entries = {}
+
+  def _get_entry(self, key):
+    """Get (value, expires_at) for the key or None for missing keys."""
+    entry = self._entries.get(key)
+    if entry is not None and entry[1] and entry[1] <= time.time():
+      del self._entries[key]
+      entry = None
+    return entry
+
+  def _store(self, key, value, time_=0):
+    expires_at = time.time() + time_ if time_ else 0
+    self._entries[key] = (deepcopy(value), expires_at)
+    return True
+
+  def get(self, key, namespace=None, for_cas=False):
+    # pylint: disable=unused-argument
+    entry = self._get_entry(key)
+    return deepcopy(entry[0]) if entry is not None else None
+
+  def gets(self, key, namespace=None):
+    return self.get(key, namespace, for_cas=True)
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    """Get a dict of found keys and their values."""
+    # pylint: disable=unused-argument
+    result = {}
+    for key in keys:
+      entry = self._get_entry(key_prefix + key)
+      if entry is not None:
+        result[key] = deepcopy(entry[0])
+    return result
+
+  def set(self, key, value, time=0, min_compress_len=0, namespace=None):
+    # pylint: disable=unused-argument,redefined-outer-name
+    return self._store(key, value, time)
+
+  def add(self, key, value, time=0, min_compress_len=0, namespace=None):
+    """Store the value only if the key is not cached yet."""
+    # pylint: disable=unused-argument,redefined-outer-name
+    if self._get_entry(key) is not None:
+      return False
+    return self._store(key, value, time)
+
+  def cas(self, key, value, time=0, min_compress_len=0, namespace=None):
+    """Replace the value only if the key is cached."""
+    # pylint: disable=unused-argument,redefined-outer-name
+    if self._get_entry(key) is None:
+      return False
+    return self._store(key, value, time)
+
+  def set_multi(self, mapping, time=0, key_prefix='', min_compress_len=0,
+                namespace=None):
+    """Store all values and return a list of keys that were not stored."""
+    # pylint: disable=unused-argument,redefined-outer-name
+    for key, value in mapping.iteritems():
+      self._store(key_prefix + key, value, time)
+    return []
+
+  def add_multi(self, mapping, time=0, key_prefix='', min_compress_len=0,
+                namespace=None):
+    """Add all values and return a list of keys that were already cached."""
+    # pylint: disable=unused-argument,redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.add(key_prefix + key, value, time)]
+
+  def cas_multi(self, mapping, time=0, key_prefix='', min_compress_len=0,
+                namespace=None):
+    """Replace all values and return a list of keys that were not cached."""
+    # pylint: disable=unused-argument,redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.cas(key_prefix + key, value, time)]
+
+  def delete(self, key, seconds=0, namespace=None):
+    # pylint: disable=unused-argument
+    if self._get_entry(key) is None:
+      return DELETE_ITEM_MISSING
+    del self._entries[key]
+    return DELETE_SUCCESSFUL
+
+  def delete_multi(self, keys, seconds=0, key_prefix='', namespace=None):
+    # pylint: disable=unused-argument
+    for key in keys:
+      self.delete(key_prefix + key)
+    return True
+
+  def offset_multi(self, mapping, key_prefix='', namespace=None,
+                   initial_value=None):
+    """Add offsets to integer values and return a dict of new values.
+
+    Missing keys are created from initial_value or skipped if it is None.
+    """
+    # pylint: disable=unused-argument
+    result = {}
+    for key, delta in mapping.iteritems():
+      entry = self._get_entry(key_prefix + key)
+      if entry is not None:
+        value, expires_at = entry
+      elif initial_value is not None:
+        value, expires_at = initial_value, 0
+      else:
+        result[key] = None
+        continue
+      result[key] = value + delta
+      self._entries[key_prefix + key] = (result[key], expires_at)
+    return result
+
+  def flush_all(self):
+    self._entries.clear()
+    return True
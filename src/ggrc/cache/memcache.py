@@ -2,25 +2,41 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
-from google.appengine.api import memcache
 from cache import Cache
 from cache import all_cache_entries
 from collections import OrderedDict
 from copy import deepcopy
 
+from ggrc import settings
+from ggrc.cache.local_memcache import LocalMemcacheClient
+from ggrc.utils import list_chunks
+
 """
     Memcache implements the remote AppEngine Memcache mechanism
 
 """
+
+# Maximal number of keys sent to memcache in a single batch call
+MULTI_CHUNK_SIZE = 500
+
+
+def create_client():
+  """Create a memcache client selected by MEMCACHE_CLIENT setting."""
+  if getattr(settings, "MEMCACHE_CLIENT", "appengine") == "local":
+    return LocalMemcacheClient()
+  from google.appengine.api import memcache
+  return memcache.Client()
+
+
 class MemCache(Cache):
-  def __init__(self):
+  def __init__(self, client=None):
     self.name = 'memcache'
     self.client = None
 
     for cache_entry in all_cache_entries():
       if cache_entry.cache_type is self.name:
         self.supported_resources[cache_entry.model_plural]=cache_entry.class_name
-        self.memcache_client = memcache.Client()
+    self.memcache_client = client or create_client()
 
   def get_name(self):
     return self.name
@@ -181,60 +197,85 @@ class MemCache(Cache):
 
   def add_multi(self, data, expiration_time=0):
     """ Add multiple entries to memcache
-    There are limits to size of data in memcache
+    Entries are sent in chunks of MULTI_CHUNK_SIZE keys because there are
+    limits to size of data in memcache calls
 
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
-      data: dictionary containing ids and dictionary of attrs
+      data: dictionary containing keys and values
+      expiration_time: expiration time in seconds, 0 for no expiration
 
     Returns:
-      memcache client API add_multi
+      list of keys that were not added, e.g. because they are already cached
     """
     # TODO(dan): import scenarios, add will return non-empty list, we should invoke update_multi for those items
     #
-    return self.memcache_client.add_multi(data, expiration_time)
+    not_added = []
+    for keys in list_chunks(data.keys(), MULTI_CHUNK_SIZE):
+      not_added.extend(self.memcache_client.add_multi(
+          {key: data[key] for key in keys}, expiration_time))
+    return not_added
+
+  def set_multi(self, data, expiration_time=0):
+    """ Set multiple entries in memcache, replacing cached values
+
+    Args:
+      data: dictionary containing keys and values
+      expiration_time: expiration time in seconds, 0 for no expiration
 
-  def get_multi(self, data):
+    Returns:
+      list of keys that were not set
+    """
+    not_set = []
+    for keys in list_chunks(data.keys(), MULTI_CHUNK_SIZE):
+      not_set.extend(self.memcache_client.set_multi(
+          {key: data[key] for key in keys}, expiration_time))
+    return not_set
+
+  def get_multi(self, data, for_cas=True):
     """ Get multiple entries from memcache
-    There are limits to size of data in memcache
 
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
-      data: dictionary containing ids
+      data: list of keys
+      for_cas: fetch values for a following update_multi
 
     Returns:
-      memcache client API get_multi
+      dictionary of found keys and their values
     """
-    return self.memcache_client.get_multi(data, '', None, True)
+    result = {}
+    for keys in list_chunks(list(data), MULTI_CHUNK_SIZE):
+      result.update(self.memcache_client.get_multi(keys, '', None, for_cas))
+    return result
 
   def update_multi(self, data, expiration_time=0):
     """ update multiple entries to memcache
-    There are limits to size of data in memcache
 
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
-      data: dictionary containing ids and dictionary of attrs
+      data: dictionary containing keys and values fetched by get_multi
 
     Returns:
-      memcache client API cas_multi (compare and set)
+      list of keys that were not updated (memcache cas_multi)
     """
-    return self.memcache_client.cas_multi(data, expiration_time)
+    not_updated = []
+    for keys in list_chunks(data.keys(), MULTI_CHUNK_SIZE):
+      not_updated.extend(self.memcache_client.cas_multi(
+          {key: data[key] for key in keys}, expiration_time))
+    return not_updated
 
-  def remove_multi(self, data, lockadd_seconds):
-    """ delete multiple entries to memcache
+  def remove_multi(self, data, lockadd_seconds=0):
+    """ delete multiple entries from memcache
 
     Args:
-      category: collection or stub
-      resource: regulation, controls, etc.
-      data:  list of keys
+      data: list of keys
+      lockadd_seconds: time for which add operations of the keys fail
 
     Returns:
-      memcache client API delete_multi
+      True if all chunks were deleted, False on network failure
     """
-    return self.memcache_client.delete_multi(data, lockadd_seconds)
+    deleted = True
+    for keys in list_chunks(list(data), MULTI_CHUNK_SIZE):
+      deleted = self.memcache_client.delete_multi(
+          keys, lockadd_seconds) and deleted
+    return deleted
 
   def clean(self):
     """ flush everything from memcache """
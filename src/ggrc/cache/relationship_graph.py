@@ -0,0 +1,679 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""In-process index of relationships and snapshots.
+
+Every worker keeps neighbours of all related objects and parents and children
+of all snapshots in integer arrays, so related objects are found without
+relationship table queries. Objects are encoded as a single integer of an
+interned type id and the object id.
+
+The graph is loaded in a background thread when the app starts. Relationships
+and snapshots committed by the worker are applied from session events. Every
+``RELATIONSHIP_GRAPH_CHECK_INTERVAL`` seconds rows inserted by other workers
+are loaded by their ids and rows deleted by other workers are removed by
+their "deleted" revisions, both are found by id ranges above the ids seen by
+the previous check. Deletes that are not logged as revisions are not seen
+until the graph is reloaded. A change that does not match the graph makes it
+stale and starts a reload. Lookups return None while the graph is not loaded
+or stale, so that callers query the database instead.
+
+The graph only holds committed rows, so it is not used by sessions that
+flushed changes in their current transaction. Changes collected in a
+savepoint are kept until the outermost transaction commits and are dropped
+when the savepoint rolls back. Rows written with core
+statements fire no session events, code that writes them calls
+``mark_changed`` so that the next lookup loads them.
+
+Lookups do not lock the graph. Parallel arrays of snapshots are swapped as a
+whole when a snapshot is inserted before the last one or removed, so lookups
+never see arrays of different lengths.
+
+The graph is not loaded on App Engine, where instances run many threads and
+are restarted often.
+"""
+
+import array
+import bisect
+import collections
+import logging
+import threading
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.session import Session
+
+from ggrc import db
+from ggrc import settings
+from ggrc.models.relationship import Relationship
+from ggrc.models.revision import Revision
+from ggrc.models.snapshot import Snapshot
+from ggrc.utils import list_chunks
+
+
+logger = logging.getLogger(__name__)
+
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+# Number of rows loaded by a single query
+LOAD_CHUNK_SIZE = 10000
+
+# Rows with ids up to this far below the highest loaded id are loaded again
+# by every check, so that rows committed out of id order are not missed.
+CATCH_UP_WINDOW = 1000
+
+_PENDING_KEY = "relationship_graph_pending"
+_FLUSHED_KEY = "relationship_graph_flushed"
+_CHANGED_KEY = "relationship_graph_changed"
+
+# Parallel arrays of snapshots sorted by id with encoded parents and children
+_Snapshots = collections.namedtuple("_Snapshots", ["ids", "parents",
+                                                   "children"])
+
+
+def _append(index, key, value):
+  """Append a value to an array stored in a dict."""
+  values = index.get(key)
+  if values is None:
+    values = index[key] = array.array("l")
+  values.append(value)
+
+
+def _remove(index, key, value):
+  """Remove a value from an array stored in a dict.
+
+  Returns:
+    False if the value was not found.
+  """
+  values = index.get(key)
+  if values is None or value not in values:
+    return False
+  values.remove(value)
+  if not values:
+    del index[key]
+  return True
+
+
+def _find_position(ids, id_):
+  """Get the position of an id in a sorted array or None."""
+  position = bisect.bisect_left(ids, id_)
+  if position < len(ids) and ids[position] == id_:
+    return position
+  return None
+
+
+class _RecentIds(object):
+  """Ids of rows loaded within CATCH_UP_WINDOW below the highest id."""
+
+  def __init__(self):
+    self.max_id = 0
+    self.ids = set()
+
+  def add(self, id_):
+    """Add an id, returns False if it was added before."""
+    if id_ in self.ids or id_ <= self.max_id - CATCH_UP_WINDOW:
+      return False
+    self.ids.add(id_)
+    self.max_id = max(self.max_id, id_)
+    if len(self.ids) > 2 * CATCH_UP_WINDOW:
+      self.trim()
+    return True
+
+  def trim(self):
+    self.ids = {id_ for id_ in self.ids
+                if id_ > self.max_id - CATCH_UP_WINDOW}
+
+  @property
+  def catch_up_id(self):
+    """Rows with greater ids are loaded by the next check."""
+    return max(self.max_id - CATCH_UP_WINDOW, 0)
+
+
+class GraphData(object):
+  """Neighbours of related objects and snapshot parents and children."""
+  # pylint: disable=too-many-instance-attributes
+
+  def __init__(self):
+    self.types = []
+    self.type_ids = {}
+    self.neighbours = {}
+    self.relationship_count = 0
+    self.relationship_ids = _RecentIds()
+    # Highest id of revisions checked for deleted rows
+    self.revision_id = 0
+    self.snapshots = _Snapshots(array.array("l"), array.array("l"),
+                                array.array("l"))
+    self.parent_snapshots = {}
+    self.child_snapshots = {}
+    self.snapshot_ids_loaded = _RecentIds()
+    self.snapshot_type_id = self._intern_type(Snapshot.__name__)
+
+  def _intern_type(self, type_):
+    type_id = self.type_ids.get(type_)
+    if type_id is None:
+      type_id = self.type_ids[type_] = len(self.types)
+      self.types.append(type_)
+    return type_id
+
+  def encode(self, type_, id_):
+    return (self._intern_type(type_) << ID_BITS) | id_
+
+  def decode(self, node):
+    return self.types[node >> ID_BITS], node & ID_MASK
+
+  def _get_nodes(self, type_, ids):
+    """Get encoded objects without interning unknown types."""
+    type_id = self.type_ids.get(type_)
+    if type_id is None:
+      return []
+    return [(type_id << ID_BITS) | id_ for id_ in ids]
+
+  def add_relationship(self, id_, src_type, src_id, dst_type, dst_id):
+    if not self.relationship_ids.add(id_):
+      return
+    src = self.encode(src_type, src_id)
+    dst = self.encode(dst_type, dst_id)
+    _append(self.neighbours, src, dst)
+    _append(self.neighbours, dst, src)
+    self.relationship_count += 1
+
+  def has_relationship(self, src_type, src_id, dst_type, dst_id):
+    src = self._get_nodes(src_type, [src_id])
+    dst = self._get_nodes(dst_type, [dst_id])
+    return bool(src and dst) and dst[0] in self.neighbours.get(src[0], ())
+
+  def remove_relationship(self, src_type, src_id, dst_type, dst_id):
+    """Remove a relationship, returns False if it was not found."""
+    src = self.encode(src_type, src_id)
+    dst = self.encode(dst_type, dst_id)
+    if not _remove(self.neighbours, src, dst):
+      return False
+    _remove(self.neighbours, dst, src)
+    self.relationship_count -= 1
+    return True
+
+  def add_snapshot(self, id_, parent_type, parent_id, child_type, child_id):
+    if not self.snapshot_ids_loaded.add(id_):
+      return
+    parent = self.encode(parent_type, parent_id)
+    child = self.encode(child_type, child_id)
+    snapshots = self.snapshots
+    position = bisect.bisect(snapshots.ids, id_)
+    if position == len(snapshots.ids):
+      # Lookups find positions by ids, so the id is appended last
+      snapshots.parents.append(parent)
+      snapshots.children.append(child)
+      snapshots.ids.append(id_)
+    else:
+      self.snapshots = _Snapshots(*(
+          values[:position] + array.array("l", [value]) + values[position:]
+          for values, value in zip(snapshots, (id_, parent, child))
+      ))
+    _append(self.parent_snapshots, parent, id_)
+    _append(self.child_snapshots, child, id_)
+
+  def remove_snapshots(self, ids):
+    """Remove snapshots, returns False if any of them was not found."""
+    snapshots = self.snapshots
+    positions = {_find_position(snapshots.ids, id_) for id_ in ids}
+    found = None not in positions
+    positions.discard(None)
+    if not positions:
+      return found
+    kept = [position for position in range(len(snapshots.ids))
+            if position not in positions]
+    self.snapshots = _Snapshots(*(
+        array.array("l", (values[position] for position in kept))
+        for values in snapshots
+    ))
+    for position in positions:
+      id_ = snapshots.ids[position]
+      _remove(self.parent_snapshots, snapshots.parents[position], id_)
+      _remove(self.child_snapshots, snapshots.children[position], id_)
+    return found
+
+  def remove_snapshot(self, id_):
+    """Remove a snapshot, returns False if it was not found."""
+    return self.remove_snapshots([id_])
+
+  @property
+  def snapshot_count(self):
+    return len(self.snapshots.ids)
+
+  def _filter_type(self, nodes, type_):
+    """Get ids of encoded objects of the given type."""
+    type_id = self.type_ids.get(type_)
+    return {node & ID_MASK for node in nodes if node >> ID_BITS == type_id}
+
+  def _snapshot_nodes(self, snapshot_ids):
+    return [(self.snapshot_type_id << ID_BITS) | id_ for id_ in snapshot_ids]
+
+  def _get_snapshot_attr(self, snapshot_ids, attr):
+    """Get encoded parents or children of snapshots."""
+    snapshots = self.snapshots
+    values = getattr(snapshots, attr)
+    result = []
+    for id_ in snapshot_ids:
+      position = _find_position(snapshots.ids, id_)
+      if position is not None:
+        result.append(values[position])
+    return result
+
+  def get_neighbours(self, type_, id_):
+    """Get (type, id) tuples of objects related to an object."""
+    return [self.decode(node)
+            for obj in self._get_nodes(type_, [id_])
+            for node in self.neighbours.get(obj, ())]
+
+  def get_related_ids(self, object_type, related_type, related_ids):
+    """Get ids of objects of object_type related to the given objects."""
+    return self._filter_type(
+        (node
+         for obj in self._get_nodes(related_type, related_ids)
+         for node in self.neighbours.get(obj, ())),
+        object_type,
+    )
+
+  def _get_child_snapshots(self, child_type, child_ids, parent_type=None):
+    snapshot_ids = [id_
+                    for obj in self._get_nodes(child_type, child_ids)
+                    for id_ in self.child_snapshots.get(obj, ())]
+    if parent_type is not None:
+      parent_type_id = self.type_ids.get(parent_type)
+      snapshot_ids = [
+          id_ for id_ in snapshot_ids
+          for parent in self._get_snapshot_attr([id_], "parents")
+          if parent >> ID_BITS == parent_type_id
+      ]
+    return snapshot_ids
+
+  def get_snapshot_related_ids(self, object_type, child_type, child_ids,
+                               parent_type=None):
+    """Get ids of objects related to snapshots of the given objects."""
+    snapshot_ids = self._get_child_snapshots(child_type, child_ids,
+                                             parent_type)
+    return self._filter_type(
+        (node
+         for obj in self._snapshot_nodes(snapshot_ids)
+         for node in self.neighbours.get(obj, ())),
+        object_type,
+    )
+
+  def get_snapshotted_ids(self, child_type, related_type, related_ids):
+    """Get ids of snapshotted objects of snapshots related to the objects."""
+    snapshot_ids = self.get_related_ids(Snapshot.__name__, related_type,
+                                        related_ids)
+    return self._filter_type(
+        self._get_snapshot_attr(snapshot_ids, "children"),
+        child_type,
+    )
+
+  def get_parent_ids(self, parent_type, child_type, child_ids):
+    """Get ids of parents of snapshots of the given objects."""
+    snapshot_ids = self._get_child_snapshots(child_type, child_ids)
+    return self._filter_type(
+        self._get_snapshot_attr(snapshot_ids, "parents"),
+        parent_type,
+    )
+
+  def get_child_ids(self, child_type, parent_type, parent_ids):
+    """Get ids of snapshotted objects of the given parents."""
+    snapshot_ids = [id_
+                    for obj in self._get_nodes(parent_type, parent_ids)
+                    for id_ in self.parent_snapshots.get(obj, ())]
+    return self._filter_type(
+        self._get_snapshot_attr(snapshot_ids, "children"),
+        child_type,
+    )
+
+
+def _load_rows(connection, table, columns, min_id, add):
+  """Load rows with ids greater than min_id in chunks ordered by id."""
+  query = sa.select([table.c.id] + columns).order_by(
+      table.c.id).limit(LOAD_CHUNK_SIZE)
+  while True:
+    rows = connection.execute(query.where(table.c.id > min_id)).fetchall()
+    for row in rows:
+      add(*row)
+    if len(rows) < LOAD_CHUNK_SIZE:
+      return
+    min_id = rows[-1][0]
+
+
+def load_relationships(connection, data, min_id=0):
+  table = Relationship.__table__
+  _load_rows(connection, table, [
+      table.c.source_type,
+      table.c.source_id,
+      table.c.destination_type,
+      table.c.destination_id,
+  ], min_id, data.add_relationship)
+
+
+def load_snapshots(connection, data, min_id=0):
+  table = Snapshot.__table__
+  _load_rows(connection, table, [
+      table.c.parent_type,
+      table.c.parent_id,
+      table.c.child_type,
+      table.c.child_id,
+  ], min_id, data.add_snapshot)
+
+
+def _get_max_id(connection, table):
+  return connection.execute(sa.select([sa.func.max(table.c.id)])).scalar() or 0
+
+
+def _get_missing_relationships(connection, pairs):
+  """Get relationship pairs that are not in the database."""
+  table = Relationship.__table__
+  existing = set()
+  for chunk in list_chunks(list(pairs), 100):
+    existing.update(tuple(row) for row in connection.execute(sa.select([
+        table.c.source_type,
+        table.c.source_id,
+        table.c.destination_type,
+        table.c.destination_id,
+    ]).where(sa.or_(*[
+        sa.and_(
+            table.c.source_type == src_type,
+            table.c.source_id == src_id,
+            table.c.destination_type == dst_type,
+            table.c.destination_id == dst_id,
+        )
+        for src_type, src_id, dst_type, dst_id in chunk
+    ]))))
+  return set(pairs) - existing
+
+
+def remove_deleted(connection, data):
+  """Remove rows logged as deleted by revisions since the previous check.
+
+  Revisions within CATCH_UP_WINDOW below the previous highest id are read
+  again, as they can be committed out of id order. Removing them again has no
+  effect: snapshot ids are never reused and relationships are removed only if
+  their pair is not in the database anymore.
+  """
+  table = Revision.__table__
+  max_id = _get_max_id(connection, table)
+  rows = connection.execute(sa.select([
+      table.c.resource_type,
+      table.c.resource_id,
+      table.c.source_type,
+      table.c.source_id,
+      table.c.destination_type,
+      table.c.destination_id,
+  ]).where(sa.and_(
+      table.c.id > max(data.revision_id - CATCH_UP_WINDOW, 0),
+      table.c.id <= max_id,
+      table.c.action == u"deleted",
+      table.c.resource_type.in_([Relationship.__name__, Snapshot.__name__]),
+  ))).fetchall()
+  snapshot_ids = []
+  pairs = set()
+  for row in rows:
+    if row.resource_type == Snapshot.__name__:
+      snapshot_ids.append(row.resource_id)
+    else:
+      pair = (row.source_type, row.source_id,
+              row.destination_type, row.destination_id)
+      if data.has_relationship(*pair):
+        pairs.add(pair)
+  data.remove_snapshots(snapshot_ids)
+  for pair in _get_missing_relationships(connection, pairs):
+    data.remove_relationship(*pair)
+  data.revision_id = max_id
+
+
+class RelationshipGraph(object):
+  """Relationship graph of a worker that is kept up to date."""
+
+  def __init__(self, engine, check_interval):
+    self.engine = engine
+    self.check_interval = check_interval
+    self.data = None
+    self.stale = True
+    self.checked_at = 0
+    self._loading = False
+    self._lock = threading.Lock()
+
+  def load(self):
+    """Load all relationships and snapshots."""
+    data = GraphData()
+    start = time.time()
+    connection = self.engine.connect()
+    try:
+      # Rows deleted while loading are removed by the next check
+      data.revision_id = _get_max_id(connection, Revision.__table__)
+      load_relationships(connection, data)
+      load_snapshots(connection, data)
+    finally:
+      connection.close()
+    logger.info("Loaded %s relationships and %s snapshots in %.2fs",
+                data.relationship_count, data.snapshot_count,
+                time.time() - start)
+    with self._lock:
+      self.data = data
+      self.stale = False
+      # Rows committed while loading are picked up by the next check
+      self.checked_at = 0
+
+  def _load_in_background(self):
+    """Start loading the graph unless it is already being loaded."""
+    if self._loading:
+      return
+    self._loading = True
+
+    def _load():
+      try:
+        self.load()
+      except Exception:  # pylint: disable=broad-except
+        logger.exception("Failed to load relationship graph")
+      finally:
+        self._loading = False
+
+    thread = threading.Thread(target=_load, name="relationship-graph")
+    thread.daemon = True
+    thread.start()
+
+  def _catch_up(self):
+    """Load rows inserted and remove rows deleted since the last check."""
+    connection = self.engine.connect()
+    try:
+      load_relationships(connection, self.data,
+                         self.data.relationship_ids.catch_up_id)
+      load_snapshots(connection, self.data,
+                     self.data.snapshot_ids_loaded.catch_up_id)
+      remove_deleted(connection, self.data)
+    finally:
+      connection.close()
+
+  def check(self):
+    """Check the graph against the database if the check interval passed.
+
+    Returns:
+      True if the graph can be used for lookups.
+    """
+    if time.time() - self.checked_at < self.check_interval:
+      return not self.stale
+    if not self._lock.acquire(False):
+      # Another thread is checking the graph
+      return not self.stale
+    try:
+      self.checked_at = time.time()
+      if self.data is not None and not self.stale:
+        self._catch_up()
+    except Exception:  # pylint: disable=broad-except
+      logger.exception("Failed to check relationship graph")
+      self.stale = True
+    finally:
+      self._lock.release()
+    if self.data is None or self.stale:
+      self._load_in_background()
+    return not self.stale
+
+  def expire(self):
+    """Make the next lookup check the graph regardless of the interval."""
+    self.checked_at = 0
+
+  def apply(self, changes):
+    """Apply committed changes collected from session events."""
+    with self._lock:
+      if self.data is None or self.stale:
+        return
+      # Removed snapshots are collected so that arrays are copied only once
+      removed_snapshots = []
+      for action, model_name, values in changes:
+        if None in values:
+          self.stale = True
+        elif (action, model_name) == ("add", Relationship.__name__):
+          self.data.add_relationship(*values)
+        elif action == "add":
+          self.data.add_snapshot(*values)
+        elif model_name == Relationship.__name__:
+          self.stale |= not self.data.remove_relationship(*values)
+        else:
+          removed_snapshots.extend(values)
+      if removed_snapshots:
+        self.stale |= not self.data.remove_snapshots(removed_snapshots)
+    if self.stale:
+      self._load_in_background()
+
+
+_graph = None
+
+
+def get_graph():
+  """Get the graph data if it can be used by the current session.
+
+  Returns:
+    GraphData or None if the graph is disabled, not loaded, stale or the
+    session has flushed changes that are not committed yet.
+  """
+  if _graph is None or db.session().info.get(_FLUSHED_KEY):
+    return None
+  if not _graph.check():
+    return None
+  return _graph.data
+
+
+# Attributes of inserted and deleted objects passed to GraphData methods
+_ATTRS = {
+    ("add", Relationship.__name__): ("id", "source_type", "source_id",
+                                     "destination_type", "destination_id"),
+    ("remove", Relationship.__name__): ("source_type", "source_id",
+                                        "destination_type", "destination_id"),
+    ("add", Snapshot.__name__): ("id", "parent_type", "parent_id",
+                                 "child_type", "child_id"),
+    ("remove", Snapshot.__name__): ("id",),
+}
+
+
+def _track(action):
+  """Make a mapper event listener that collects changes of the session."""
+  def listener(mapper, connection, target):
+    # pylint: disable=unused-argument
+    session = object_session(target)
+    if session is None:
+      return
+    model_name = target.__class__.__name__
+    # Use loaded values only, deleted rows can not be loaded anymore
+    state = sa.inspect(target).dict
+    values = tuple(state.get(attr) for attr in _ATTRS[action, model_name])
+    _add_pending(session, (action, model_name, values))
+  return listener
+
+
+def _get_savepoint(transaction):
+  """Get the savepoint or the outermost transaction of a transaction."""
+  while transaction.parent is not None and not transaction.nested:
+    transaction = transaction.parent
+  return transaction
+
+
+def _add_pending(session, change):
+  """Store a change until the savepoint it belongs to ends."""
+  pending = session.info.setdefault(_PENDING_KEY, {})
+  pending.setdefault(_get_savepoint(session.transaction), []).append(change)
+
+
+def mark_changed(session=None):
+  """Make the next lookup load relationships and snapshots written by core.
+
+  Args:
+    session: session that wrote the rows in its current transaction, the
+      graph is checked after the session commits. Rows written outside of a
+      session transaction must be committed before this is called.
+  """
+  if session is None:
+    if _graph is not None:
+      _graph.expire()
+    return
+  session.info[_FLUSHED_KEY] = True
+  session.info[_CHANGED_KEY] = True
+
+
+def _mark_flushed(session, flush_context, instances):
+  # pylint: disable=unused-argument
+  session.info[_FLUSHED_KEY] = True
+
+
+def _apply_pending(session):
+  """Apply changes when the outermost transaction commits."""
+  transaction = session.transaction
+  pending = session.info.get(_PENDING_KEY, {})
+  changes = pending.pop(transaction, None)
+  if transaction.nested:
+    # Changes of a released savepoint are committed with its parent
+    if changes:
+      pending.setdefault(_get_savepoint(transaction.parent),
+                         []).extend(changes)
+    return
+  if changes and _graph is not None:
+    _graph.apply(changes)
+  if session.info.pop(_CHANGED_KEY, None) and _graph is not None:
+    _graph.expire()
+
+
+def _end_transaction(session, transaction):
+  """Drop changes of rolled back transactions."""
+  session.info.get(_PENDING_KEY, {}).pop(transaction, None)
+  if transaction.parent is None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_FLUSHED_KEY, None)
+    session.info.pop(_CHANGED_KEY, None)
+
+
+_track_insert = _track("add")
+_track_delete = _track("remove")
+
+
+def register_listeners():
+  """Register listeners that keep the graph up to date."""
+  if sa.event.contains(Session, "before_flush", _mark_flushed):
+    return
+  for model in (Relationship, Snapshot):
+    sa.event.listen(model, "after_insert", _track_insert)
+    sa.event.listen(model, "after_delete", _track_delete)
+  sa.event.listen(Session, "before_flush", _mark_flushed)
+  sa.event.listen(Session, "after_commit", _apply_pending)
+  sa.event.listen(Session, "after_transaction_end", _end_transaction)
+
+
+def init_graph(app):
+  """Start loading the graph of this worker if it is enabled."""
+  # pylint: disable=global-statement
+  global _graph
+  if not getattr(settings, "RELATIONSHIP_GRAPH", 0) or _graph is not None:
+    return
+  if getattr(settings, "APP_ENGINE", False):
+    logger.warning("Relationship graph is not used on App Engine")
+    return
+  with app.app_context():
+    engine = db.engine
+  _graph = RelationshipGraph(engine,
+                             settings.RELATIONSHIP_GRAPH_CHECK_INTERVAL)
+  register_listeners()
+  _graph.check()
@@ -0,0 +1,79 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hit rate and latency counters of the resource cache.
+
+Counters are kept per resource type for the lifetime of the worker process
+and logged by the benchmarks logger, see ``ggrc.utils.benchmarks``.
+"""
+
+from collections import defaultdict
+
+from ggrc.utils import benchmarks
+
+
+class ResourceCacheStats(object):
+  """Resource cache counters for a single resource type."""
+
+  def __init__(self):
+    self.hits = 0
+    self.misses = 0
+    self.reads = 0
+    self.read_time = 0.0
+    self.writes = 0
+    self.write_time = 0.0
+
+  @property
+  def hit_rate(self):
+    total = self.hits + self.misses
+    return float(self.hits) / total if total else 0.0
+
+  def as_dict(self):
+    return {
+        "hits": self.hits,
+        "misses": self.misses,
+        "hit_rate": self.hit_rate,
+        "reads": self.reads,
+        "read_time": self.read_time,
+        "writes": self.writes,
+        "write_time": self.write_time,
+    }
+
+
+_STATS = defaultdict(ResourceCacheStats)
+
+
+def record_read(resource_type, hits, misses, elapsed):
+  """Count a batched cache read of resources of a single type."""
+  stats = _STATS[resource_type]
+  stats.hits += hits
+  stats.misses += misses
+  stats.reads += 1
+  stats.read_time += elapsed
+  benchmarks.logger.debug(
+      "Resource cache read %s: %s hits, %s misses in %.4fs "
+      "(hit rate %.2f, average read %.4fs)",
+      resource_type, hits, misses, elapsed, stats.hit_rate,
+      stats.read_time / stats.reads,
+  )
+
+
+def record_write(resource_type, count, elapsed):
+  """Count a batched cache write of resources of a single type."""
+  stats = _STATS[resource_type]
+  stats.writes += 1
+  stats.write_time += elapsed
+  benchmarks.logger.debug(
+      "Resource cache write %s: %s resources in %.4fs (average write %.4fs)",
+      resource_type, count, elapsed, stats.write_time / stats.writes,
+  )
+
+
+def get_stats():
+  """Get counters of all resource types as a dict."""
+  return {resource_type: stats.as_dict()
+          for resource_type, stats in _STATS.iteritems()}
+
+
+def reset_stats():
+  _STATS.clear()
@@ -0,0 +1,166 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""In-process LRU tier in front of memcache for serialized resources.
+
+Every worker process keeps a bounded number of serialized resources keyed by
+``get_cache_key``, so hot objects are served without memcache round trips
+and unpickling.
+
+A worker can only remove its own entries, so every resource type has a
+generation counter stored in memcache. It is incremented whenever resources
+of the type are invalidated. Entries are stored with the generation read
+before their values were fetched and entries with an older generation are
+treated as missing. Entries also expire after ``RESOURCE_CACHE_TTL``
+seconds.
+
+The cache is shared by all threads of the worker, so its entries are only
+accessed under a lock.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from ggrc import settings
+from ggrc.utils import benchmarks
+
+
+GENERATION_KEY = "resource_generation:{}"
+
+
+def get_key_type(key):
+  """Get resource table plural from key 'collection:<type>:<id>'."""
+  return key.split(":")[1]
+
+
+def _generation_keys(keys):
+  return {GENERATION_KEY.format(get_key_type(key)) for key in keys}
+
+
+def get_generations(memcache_client, keys):
+  """Get current generations of resource types of the keys.
+
+  Missing generations are initialized with the current time, so entries
+  stored before the generation got evicted from memcache can not match it.
+
+  Returns:
+    dict of generation keys and their values.
+  """
+  generation_keys = list(_generation_keys(keys))
+  generations = memcache_client.get_multi(generation_keys)
+  missing = [key for key in generation_keys if key not in generations]
+  if missing:
+    initial = int(time.time() * 1000)
+    memcache_client.add_multi({key: initial for key in missing})
+    generations.update(memcache_client.get_multi(missing))
+  return generations
+
+
+def invalidate(memcache_client, keys):
+  """Remove keys from this worker and outdate them in all other workers.
+
+  Keys must be deleted from memcache first. Otherwise a worker could read the
+  new generation and the old memcache value and store them as a fresh entry.
+  """
+  cache = get_resource_cache()
+  if cache is None or not keys:
+    return
+  cache.delete_multi(keys)
+  memcache_client.offset_multi(
+      {key: 1 for key in _generation_keys(keys)},
+      initial_value=int(time.time() * 1000),
+  )
+
+
+class WorkerCache(object):
+  """Size and TTL limited LRU cache of serialized resources.
+
+  Cached values are shared by all requests of the worker and must not be
+  changed in place.
+  """
+
+  def __init__(self, max_size, ttl):
+    self.max_size = max_size
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self.stale = 0
+    self.evictions = 0
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get_multi(self, keys, generations):
+    """Get fresh values of the keys.
+
+    Args:
+      keys: list of resource cache keys.
+      generations: dict of current generations, see get_generations.
+
+    Returns:
+      dict of found keys and their values.
+    """
+    now = time.time()
+    result = {}
+    with self._lock:
+      for key in keys:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+          self.misses += 1
+          continue
+        value, generation, expires_at = entry
+        current = generations.get(GENERATION_KEY.format(get_key_type(key)))
+        if expires_at <= now or generation is None or generation != current:
+          self.stale += 1
+          self.misses += 1
+          continue
+        self._entries[key] = entry
+        self.hits += 1
+        result[key] = value
+    return result
+
+  def set_multi(self, mapping, generations):
+    """Store values with generations that were read before the values."""
+    expires_at = time.time() + self.ttl
+    with self._lock:
+      for key, value in mapping.iteritems():
+        generation = generations.get(
+            GENERATION_KEY.format(get_key_type(key)))
+        self._entries.pop(key, None)
+        self._entries[key] = (value, generation, expires_at)
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+  def delete_multi(self, keys):
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+  def log_stats(self):
+    benchmarks.logger.debug(
+        "Worker resource cache: %s hits, %s misses, %s stale, %s evictions, "
+        "%s items", self.hits, self.misses, self.stale, self.evictions,
+        len(self._entries))
+
+
+_resource_cache = None
+_resource_cache_lock = threading.Lock()
+
+
+def get_resource_cache():
+  """Get the resource cache of this worker or None if it is disabled."""
+  # pylint: disable=global-statement
+  global _resource_cache
+  max_size = getattr(settings, "RESOURCE_CACHE_SIZE", 0)
+  if max_size <= 0:
+    return None
+  if _resource_cache is None:
+    with _resource_cache_lock:
+      if _resource_cache is None:
+        _resource_cache = WorkerCache(max_size, settings.RESOURCE_CACHE_TTL)
+  return _resource_cache
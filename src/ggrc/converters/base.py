@@ -3,6 +3,7 @@
 
 """Base objects for csv file converters."""
 
+import itertools
 from collections import defaultdict
 
 from ggrc import settings
@@ -65,6 +66,7 @@ class Converter(object):
     self.response_data = []
     self.exportable = get_exportables()
     self.indexer = get_indexer()
+    self.progress_callback = kwargs.get("progress_callback")
 
   def to_array(self):
     with benchmark("Create block converters"):
@@ -80,16 +82,69 @@ class Converter(object):
     csv_data = []
     for block_converter in self.block_converters:
       csv_header, csv_body = block_converter.row_data_to_array()
-      # multi block csv must have first column empty
-      two_empty_lines = [[], []]
-      block_data = csv_header + csv_body + two_empty_lines
-      for line in block_data:
-        line.insert(0, "")
-      block_data[0][0] = "Object type"
-      block_data[1][0] = block_converter.name
-      csv_data.extend(block_data)
+      csv_data.extend(
+          self._block_lines(block_converter.name, csv_header, csv_body))
     return csv_data
 
+  @staticmethod
+  def _block_lines(name, csv_header, csv_body):
+    """Generate csv lines of a single block followed by two empty lines.
+
+    Multi block csv must have the first column empty except for the block
+    header lines that contain the object type.
+    """
+    first_column = ["Object type", name]
+    block_lines = itertools.chain(csv_header, csv_body, [[], []])
+    for index, line in enumerate(block_lines):
+      yield [first_column[index] if index < 2 else ""] + line
+
+  def to_stream(self):
+    """Generate csv lines for export without building the whole 2d array.
+
+    Block converters and headers are created eagerly, so that errors in the
+    export request are raised before the first line is generated. Object rows
+    are then generated lazily, block by block, and all lines are padded to the
+    same length.
+
+    Returns:
+      generator of csv lines, where each line is a list of strings.
+    """
+    with benchmark("Create block converters"):
+      self.block_converters_from_ids()
+    blocks = [(block_converter, block_converter.generate_csv_header())
+              for block_converter in self.block_converters
+              if not getattr(block_converter, "ignore", False)]
+    width = max([len(line) + 1 for _, csv_header in blocks
+                 for line in csv_header] or [0])
+    return self._generate_stream_lines(blocks, width)
+
+  def _generate_stream_lines(self, blocks, width):
+    for index, (block_converter, csv_header) in enumerate(blocks):
+      with benchmark("Generate CSV lines for %s" % block_converter.name):
+        block_lines = self._block_lines(block_converter.name, csv_header,
+                                        block_converter.generate_row_data())
+        for line in block_lines:
+          line.extend([""] * (width - len(line)))
+          yield line
+      self._report_progress("export", [b.name for b, _ in blocks], index + 1)
+
+  def _report_progress(self, stage, block_names, done):
+    """Pass the number of handled blocks to the progress callback.
+
+    Args:
+      stage: name of the running operation, "import" or "export".
+      block_names: names of all blocks in the order they are handled.
+      done: number of handled blocks.
+    """
+    if self.progress_callback is None:
+      return
+    self.progress_callback({
+        "stage": stage,
+        "blocks": block_names,
+        "done": done,
+        "total": len(block_names),
+    })
+
   def _start_compute_attributes_job(self):
     from ggrc import views
     revision_ids = []
@@ -161,9 +216,18 @@ class Converter(object):
     self.block_converters.sort(key=lambda x: order[x.name])
 
   def import_objects(self):
-    for converter in self.block_converters:
+    """Import objects block by block.
+
+    Each block is committed separately, so progress is reported after every
+    block. A dry run keeps uncommitted objects of all blocks in the session
+    and must not commit them, so its progress is not reported.
+    """
+    block_names = self.get_object_names()
+    for index, converter in enumerate(self.block_converters):
       converter.handle_row_data()
       converter.import_objects()
+      if not self.dry_run:
+        self._report_progress("import", block_names, index + 1)
 
   def import_secondary_objects(self):
     for converter in self.block_converters:
@@ -20,8 +20,10 @@ from sqlalchemy.orm.exc import UnmappedInstanceError
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.cache import Cache
 from ggrc.rbac import permissions
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 from ggrc.utils import structures
 from ggrc.converters import errors
 from ggrc.converters import get_shared_unique_rules
@@ -80,6 +82,12 @@ class BlockConverter(object):
 
   BLOCK_OFFSET = 3
 
+  # number of objects loaded at once while exporting
+  EXPORT_CHUNK_SIZE = 500
+
+  # number of rows flushed at once while importing
+  IMPORT_BATCH_SIZE = 100
+
   def get_unique_counts_dict(self, object_class):
     """ get a the varible for storing unique counts
 
@@ -424,27 +432,37 @@ class BlockConverter(object):
       self.row_converters.append(row)
 
   def row_converters_from_ids(self):
-    """ Generate a row converter object for every csv row """
+    """ Generate a row converter object for every csv row
+
+    Objects are loaded in chunks of EXPORT_CHUNK_SIZE, so that only a single
+    chunk of objects is held in memory at a time.
+    """
     if self.ignore or not self.object_ids:
       return
     self.row_converters = []
-    objects = self.object_class.eager_query().filter(
-        self.object_class.id.in_(self.object_ids))
-    for i, obj in enumerate(objects):
-      row = RowConverter(self, self.object_class, obj=obj,
-                         headers=self.headers, index=i)
-      yield row
+    index = 0
+    for ids_chunk in list_chunks(self.object_ids, self.EXPORT_CHUNK_SIZE):
+      objects = self.object_class.eager_query().filter(
+          self.object_class.id.in_(ids_chunk))
+      for obj in objects:
+        row = RowConverter(self, self.object_class, obj=obj,
+                           headers=self.headers, index=index)
+        index += 1
+        yield row
+
+  def generate_row_data(self):
+    """Generate csv body lines for all exported objects."""
+    for row_converter in self.row_converters_from_ids():
+      row_converter.handle_obj_row_data()
+      yield row_converter.to_array(self.fields)
 
   def row_data_to_array(self):
     """Get row data from all row converters while exporting.
     """
     if self.ignore:
       return
-    csv_body = []
     csv_header = self.generate_csv_header()
-    for row_converter in self.row_converters_from_ids():
-      row_converter.handle_obj_row_data()
-      csv_body.append(row_converter.to_array(self.fields))
+    csv_body = list(self.generate_row_data())
     return csv_header, csv_body
 
   def handle_row_data(self, field_list=None):
@@ -546,25 +564,71 @@ class BlockConverter(object):
     self._import_objects_prepare()
 
     if not self.converter.dry_run:
-      new_objects = []
       for row_converter in self.row_converters:
         row_converter.send_pre_commit_signals()
-      for row_converter in self.row_converters:
-        try:
-          row_converter.insert_object()
-          db.session.flush()
-        except exc.SQLAlchemyError as err:
-          db.session.rollback()
-          logger.exception("Import failed with: %s", err.message)
-          row_converter.add_error(errors.UNKNOWN_ERROR)
-        else:
-          if row_converter.is_new and not row_converter.ignore:
-            new_objects.append(row_converter.obj)
+      for row_batch in list_chunks(self.row_converters,
+                                   self.IMPORT_BATCH_SIZE):
+        self._insert_batch(row_batch)
+      new_objects = [row_converter.obj
+                     for row_converter in self.row_converters
+                     if row_converter.is_new and not row_converter.ignore]
       self.send_collection_post_signals(new_objects)
       import_event = self.save_import()
       for row_converter in self.row_converters:
         row_converter.send_post_commit_signals(event=import_event)
 
+  def _insert_batch(self, row_converters):
+    """Add objects of a batch of rows to the database with a single flush.
+
+    The batch is flushed inside a savepoint. If the flush fails, the savepoint
+    is rolled back and the rows are flushed one by one, so that only the
+    failing rows get an error.
+    """
+    cache = Cache.get_cache()
+    cache_snapshot = cache.copy() if cache else None
+    db.session.begin_nested()
+    try:
+      for row_converter in row_converters:
+        row_converter.insert_object()
+      db.session.commit()
+    except exc.SQLAlchemyError as err:
+      db.session.rollback()
+      if cache:
+        cache.restore(cache_snapshot)
+      logger.warning("Import batch failed with: %s, inserting rows one by "
+                     "one", err.message)
+      self._insert_rows(row_converters)
+
+  def _insert_rows(self, row_converters):
+    """Flush objects of each row in a separate savepoint.
+
+    This is used only after a batch flush failed and its savepoint was rolled
+    back. New objects have been expunged by the rollback together with the
+    objects created by attribute handlers, so all of them are inserted again.
+    Handlers mark themselves as done with the dry_run flag, so the flag is
+    reset first. Updated objects have been expired, so they are also set up
+    again.
+    """
+    cache = Cache.get_cache()
+    for row_converter in row_converters:
+      if row_converter.ignore or row_converter.is_delete:
+        continue
+      for handler in row_converter.attrs.values():
+        handler.dry_run = self.converter.dry_run
+      cache_snapshot = cache.copy() if cache else None
+      db.session.begin_nested()
+      try:
+        if not row_converter.is_new:
+          row_converter.setup_object()
+        row_converter.insert_object()
+        db.session.commit()
+      except exc.SQLAlchemyError as err:
+        db.session.rollback()
+        if cache:
+          cache.restore(cache_snapshot)
+        logger.exception("Import failed with: %s", err.message)
+        row_converter.add_error(errors.UNKNOWN_ERROR)
+
   def clean_session_from_ignored_objs(self):
     """Clean DB session from ignored objects.
 
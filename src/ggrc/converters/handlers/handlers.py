@@ -14,6 +14,7 @@ from sqlalchemy import or_
 from ggrc import db
 from ggrc.converters import errors
 from ggrc.converters import get_exportables
+from ggrc.fulltext import shadow
 from ggrc.login import get_current_user
 from ggrc.models import Audit
 from ggrc.models import CategoryBase
@@ -180,6 +181,8 @@ class DeleteColumnHandler(ColumnHandler):
       else:
         indexer = self.row_converter.block_converter.converter.indexer
         if indexer is not None:
+          shadow.record_changes((o.__class__.__name__, o.id)
+                                for o in tr.session.deleted)
           for o in tr.session.deleted:
             indexer.delete_record(o.id, o.__class__.__name__, commit=False)
         tr.commit()
@@ -67,6 +67,29 @@ def generate_csv_string(csv_data):
   return body
 
 
+def generate_csv_parts(csv_lines, part_size=1000):
+  """Generate a csv file string in parts from an iterable of csv lines.
+
+  Args:
+    csv_lines: iterable of lists with unicode cell values.
+    part_size: number of csv lines in a single generated part.
+
+  Yields:
+    utf-8 encoded strings that together make the csv file.
+  """
+  output_buffer = StringIO()
+  writer = csv.writer(output_buffer)
+  for index, line in enumerate(csv_lines, 1):
+    writer.writerow([val.encode("utf-8") for val in line])
+    if index % part_size == 0:
+      yield output_buffer.getvalue()
+      output_buffer.truncate(0)
+  body = output_buffer.getvalue()
+  output_buffer.close()
+  if body:
+    yield body
+
+
 def extract_relevant_data(csv_data):
   """ Split csv data into data and metadata """
   striped_data = [[unicode.strip(c) for c in line]
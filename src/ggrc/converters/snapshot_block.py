@@ -333,10 +333,18 @@ class SnapshotBlockConverter(object):
   @property
   def _body_list(self):
     """Get 2D representation of CSV content."""
-    return [
-        self._content_line_list(snapshot)
-        for snapshot in self.snapshots
-    ] or [[]]
+    return list(self.generate_row_data())
+
+  def generate_csv_header(self):
+    """Get 2D list with csv header lines."""
+    return self._header_list
+
+  def generate_row_data(self):
+    """Generate csv body lines for all exported snapshots."""
+    if not self.snapshots:
+      yield []
+    for snapshot in self.snapshots:
+      yield self._content_line_list(snapshot)
 
   def row_data_to_array(self):
     """Get 2D list representing the CSV file."""
@@ -23,6 +23,8 @@ import sqlalchemy as sa
 
 from ggrc import db
 from ggrc import login
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext import shadow
 from ggrc.utils import revisions as revision_utils
 from ggrc.utils import benchmark
 from ggrc.models import all_models as models
@@ -554,12 +556,25 @@ def get_index_data(computed_values, snapshot_tag_map):
   return data
 
 
+def update_index_tokens(index_data):
+  """Update search tokens of the replaced computed value records."""
+  rows_by_property = collections.defaultdict(list)
+  for row in index_data:
+    rows_by_property[(row["type"], row["property"])].append(row)
+  indexer = get_indexer()
+  for (type_, property_), rows in rows_by_property.iteritems():
+    indexer.update_tokens(type_, {row["key"] for row in rows}, rows,
+                          properties=[property_])
+
+
 def store_data(attributes_data, index_data):
   """Store new computed values to the database."""
   if attributes_data:
     db.session.execute(ATTRIBUTE_REPLACE_STATEMENT, attributes_data)
   if index_data:
+    shadow.record_changes((row["type"], row["key"]) for row in index_data)
     db.session.execute(INDEX_REPLACE_STATEMENT, index_data)
+    update_index_tokens(index_data)
   db.session.commit()
 
 
@@ -30,39 +30,73 @@ class Indexed(object):
     return (self.__class__.__name__, self.id)
 
   @classmethod
-  def get_insert_query_for(cls, ids):
-    """Return insert class record query. It will return None, if it's empty."""
+  def get_record_values_for(cls, ids):
+    """Return a list of dicts with values of full text records of objects."""
     if not ids:
-      return
+      return []
     instances = cls.indexed_query().filter(cls.id.in_(ids))
     indexer = fulltext.get_indexer()
     keys = inspect(indexer.record_type).c
     records = (indexer.fts_record_for(i) for i in instances)
     rows = itertools.chain(*[indexer.records_generator(i) for i in records])
-    values = [{c.name: getattr(r, a) for a, c in keys.items()} for r in rows]
+    return [{c.name: getattr(r, a) for a, c in keys.items()} for r in rows]
+
+  @classmethod
+  def get_insert_query_for(cls, ids, table=None, values=None):
+    """Return insert class record query. It will return None, if it's empty.
+
+    Args:
+      ids: ids of objects whose records should be inserted.
+      table: table for the records, the indexer record table by default.
+      values: record values of the objects if they are already computed.
+    """
+    if values is None:
+      values = cls.get_record_values_for(ids)
     if values:
-      return indexer.record_type.__table__.insert().values(values)
+      indexer = fulltext.get_indexer()
+      if table is None:
+        table = indexer.record_type.__table__
+      return table.insert().values(values)
 
   @classmethod
-  def get_delete_query_for(cls, ids):
-    """Return delete class record query. If ids are empty, will return None."""
+  def get_delete_query_for(cls, ids, table=None):
+    """Return delete class record query. If ids are empty, will return None.
+
+    Args:
+      ids: ids of objects whose records should be deleted.
+      table: table for the records, the indexer record table by default.
+    """
     if not ids:
       return
-    indexer = fulltext.get_indexer()
-    return indexer.record_type.__table__.delete().where(
-        indexer.record_type.type == cls.__name__
+    if table is None:
+      table = fulltext.get_indexer().record_type.__table__
+    return table.delete().where(
+        table.c.type == cls.__name__
     ).where(
-        indexer.record_type.key.in_(ids)
+        table.c.key.in_(ids)
     )
 
   @classmethod
-  def bulk_record_update_for(cls, ids):
-    """Bulky update index records for current class"""
-    delete_query = cls.get_delete_query_for(ids)
-    insert_query = cls.get_insert_query_for(ids)
+  def bulk_record_update_for(cls, ids, table=None, token_table=None):
+    """Bulky update index records for current class
+
+    Args:
+      ids: ids of objects whose records should be replaced.
+      table: table for the records, the indexer record table by default.
+      token_table: table for the search tokens of the indexer, the indexer
+        token table by default.
+    """
+    if table is None:
+      from ggrc.fulltext import shadow
+      shadow.record_changes((cls.__name__, id_) for id_ in ids)
+    values = cls.get_record_values_for(ids)
+    delete_query = cls.get_delete_query_for(ids, table)
+    insert_query = cls.get_insert_query_for(ids, table, values)
     for query in [delete_query, insert_query]:
       if query is not None:
         db.session.execute(query)
+    fulltext.get_indexer().update_tokens(cls.__name__, ids, values,
+                                         token_table)
 
   @classmethod
   def indexed_query(cls):
@@ -62,6 +62,13 @@ class MysqlIndexer(SqlIndexer):
     elif terms:
       return and_(whitelist, MysqlRecordProperty.content.contains(terms))
 
+  def get_text_search_query(self, type_name, text):
+    """Get a query for ids of objects with indexed content containing text."""
+    return db.session.query(self.record_type.key).filter(
+        self.record_type.type == type_name,
+        self.record_type.content.ilike(u"%{}%".format(text)),
+    )
+
   @staticmethod
   def get_permissions_query(model_names, permission_type='read',
                             permission_model=None):
@@ -69,12 +76,13 @@ class MysqlIndexer(SqlIndexer):
      each of the required objects(models).
     """
     type_queries = []
+    context_resources = permissions.get_context_resources(
+        model_names,
+        permission_type=permission_type,
+        permission_model=permission_model
+    )
     for model_name in model_names:
-      contexts, resources = permissions.get_context_resource(
-          model_name=model_name,
-          permission_type=permission_type,
-          permission_model=permission_model
-      )
+      contexts, resources = context_resources[model_name]
       statement = and_(
           MysqlRecordProperty.type == model_name,
           context_query_filter(MysqlRecordProperty.context_id, contexts)
@@ -224,10 +232,13 @@ Indexer = MysqlIndexer
 
 
 @event.listens_for(db.session.__class__, 'before_commit')
-def update_indexer(session):  # pylint:disable=unused-argument
+def update_indexer(session):
   """General function to update index
 
   for all updated related instance before commit"""
+  if session.transaction is not None and session.transaction.nested:
+    # Releasing a savepoint is not a real commit, reindex on the outer one.
+    return
   models_ids_to_reindex = defaultdict(set)
   db.session.flush()
   for for_index in getattr(db.session, 'reindex_set', set()):
@@ -0,0 +1,391 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Resumable full text reindex engine.
+
+A full reindex is split into chunks of object ids for every indexed model and
+for snapshots. Each finished chunk is stored as a ``ReindexCheckpoint`` of the
+current ``ReindexLog`` run, so if the reindex task dies, the next reindex
+resumes the unfinished run and skips all chunks that were already indexed.
+
+Chunks can be processed by a pool of worker processes, each with its own
+database connections, by setting ``FULLTEXT_REINDEX_WORKERS`` above 1. Worker
+processes are never used on App Engine.
+
+Two reindex modes are supported:
+  in_place - records are deleted and inserted directly in the live record
+      table, so search returns partial results during the reindex.
+  swap - records are loaded into a shadow table that replaces the live table
+      once the reindex is done, see ``ggrc.fulltext.shadow``. Objects that
+      are reindexed in the live table during the rebuild are reindexed into
+      the shadow table again right before the swap.
+"""
+
+import bisect
+import logging
+import multiprocessing
+from collections import defaultdict
+from collections import OrderedDict
+
+from ggrc import db
+from ggrc import settings
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext import mixin
+from ggrc.fulltext import shadow
+from ggrc.models import all_models
+from ggrc.models.maintenance import ReindexCheckpoint
+from ggrc.models.maintenance import ReindexLog
+from ggrc.snapshotter.indexer import IndexCache
+from ggrc.snapshotter.indexer import reindex_snapshots
+from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT = "Snapshot"
+
+IN_PLACE = "in_place"
+SWAP = shadow.SWAP_MODE
+MODES = (IN_PLACE, SWAP)
+
+
+def get_indexed_models():
+  """Get all models that should be reindexed by the full reindex."""
+  return {
+      m.__name__: m for m in all_models.all_models
+      if issubclass(m, mixin.Indexed) and m.REQUIRED_GLOBAL_REINDEX
+  }
+
+
+def _get_model(model_name):
+  if model_name == SNAPSHOT:
+    return all_models.Snapshot
+  return get_indexed_models()[model_name]
+
+
+def _clear_checkpoints(reindex_log_id):
+  ReindexCheckpoint.query.filter(
+      ReindexCheckpoint.reindex_log_id == reindex_log_id
+  ).delete(synchronize_session=False)
+
+
+def _get_reindex_log(mode):
+  """Get the last unfinished reindex run or start a new one.
+
+  An unfinished run with a different mode can not be resumed, so it is
+  closed and a new run is started.
+  """
+  reindex_log = ReindexLog.query.filter(
+      ReindexLog.is_reindex_complete.is_(False)
+  ).order_by(
+      ReindexLog.id.desc()
+  ).first()
+  if reindex_log is not None and reindex_log.mode != mode:
+    logger.info("Closing %s reindex run %s", reindex_log.mode, reindex_log.id)
+    reindex_log.is_reindex_complete = True
+    reindex_log.log = "Superseded by {} reindex".format(mode)
+    _clear_checkpoints(reindex_log.id)
+    reindex_log = None
+  if reindex_log is None:
+    reindex_log = ReindexLog(
+        is_reindex_complete=False,
+        mode=mode,
+        started_at=db.func.now(),
+    )
+    db.session.add(reindex_log)
+  else:
+    logger.info("Resuming reindex run %s", reindex_log.id)
+  db.session.commit()
+  return reindex_log
+
+
+def _get_done_ranges(reindex_log_id):
+  """Get sorted lists of indexed id ranges for every model of the run."""
+  ranges = defaultdict(list)
+  query = db.session.query(
+      ReindexCheckpoint.model_name,
+      ReindexCheckpoint.first_id,
+      ReindexCheckpoint.last_id,
+  ).filter(
+      ReindexCheckpoint.reindex_log_id == reindex_log_id
+  )
+  for model_name, first_id, last_id in query:
+    ranges[model_name].append((first_id, last_id))
+  for model_ranges in ranges.itervalues():
+    model_ranges.sort()
+  return ranges
+
+
+def _is_done(id_, ranges):
+  """Check if id is in one of the sorted inclusive ranges."""
+  pos = bisect.bisect_right(ranges, (id_, float("inf")))
+  return pos > 0 and ranges[pos - 1][0] <= id_ <= ranges[pos - 1][1]
+
+
+def _get_model_names():
+  return sorted(get_indexed_models().keys()) + [SNAPSHOT]
+
+
+def generate_chunks(reindex_log_id, chunk_size):
+  """Generate chunks of ids that still have to be indexed.
+
+  Args:
+    reindex_log_id: id of the reindex run.
+    chunk_size: maximal number of ids in a single chunk.
+
+  Returns:
+    tuple of a list of (model_name, ids) chunks and an ordered dict with
+    total and already indexed object counts for each model.
+  """
+  done_ranges = _get_done_ranges(reindex_log_id)
+  chunks = []
+  progress = OrderedDict()
+  for model_name in _get_model_names():
+    model = _get_model(model_name)
+    ranges = done_ranges[model_name]
+    ids = [row.id for row in db.session.query(model.id).order_by(model.id)]
+    pending = [id_ for id_ in ids if not _is_done(id_, ranges)]
+    progress[model_name] = {
+        "total": len(ids),
+        "done": len(ids) - len(pending),
+    }
+    chunks.extend((model_name, ids_chunk)
+                  for ids_chunk in list_chunks(pending, chunk_size))
+  return chunks, progress
+
+
+def _get_tables(mode):
+  """Get the tables that receive records and tokens in the given mode.
+
+  Returns:
+    tuple of the record table and the token table, None stands for the live
+    table of the indexer.
+  """
+  if mode == SWAP:
+    return shadow.get_shadow_table(), shadow.get_shadow_token_table()
+  return None, None
+
+
+# Snapshot indexing lookups shared by all snapshot chunks of the process.
+_snapshot_cache = None
+
+
+def _get_snapshot_cache():
+  # pylint: disable=global-statement
+  global _snapshot_cache
+  if _snapshot_cache is None:
+    _snapshot_cache = IndexCache()
+  return _snapshot_cache
+
+
+def _clear_snapshot_cache():
+  # pylint: disable=global-statement
+  global _snapshot_cache
+  _snapshot_cache = None
+
+
+def _reindex_ids(model_name, ids, tables):
+  table, token_table = tables
+  if model_name == SNAPSHOT:
+    reindex_snapshots(ids, table, _get_snapshot_cache(), token_table)
+  else:
+    _get_model(model_name).bulk_record_update_for(ids, table, token_table)
+
+
+def reindex_chunk(reindex_log_id, model_name, ids, mode=IN_PLACE):
+  """Reindex a single chunk and store its checkpoint.
+
+  Reindexing a chunk is idempotent, so a chunk that was interrupted before its
+  checkpoint got committed is simply reindexed again on resume.
+  """
+  _reindex_ids(model_name, ids, _get_tables(mode))
+  db.session.add(ReindexCheckpoint(
+      reindex_log_id=reindex_log_id,
+      model_name=model_name,
+      first_id=ids[0],
+      last_id=ids[-1],
+      count=len(ids),
+  ))
+  db.session.commit()
+  return model_name, len(ids)
+
+
+def _init_worker():
+  """Make sure a forked worker opens its own database connections."""
+  db.session.remove()
+  db.engine.dispose()
+
+
+def _reindex_chunk_worker(args):
+  """Process pool entry point for reindexing a single chunk."""
+  try:
+    return reindex_chunk(*args)
+  finally:
+    db.session.remove()
+
+
+def _warm_indexer_cache():
+  """Cache people and roles that are used by most record builders."""
+  indexer = get_indexer()
+  people_query = db.session.query(all_models.Person.id,
+                                  all_models.Person.name,
+                                  all_models.Person.email)
+  indexer.cache["people_map"] = {p.id: (p.name, p.email) for p in people_query}
+  indexer.cache["ac_role_map"] = dict(db.session.query(
+      all_models.AccessControlRole.id,
+      all_models.AccessControlRole.name,
+  ))
+
+
+def _get_workers_count():
+  if getattr(settings, "APP_ENGINE", False):
+    return 1
+  return max(getattr(settings, "FULLTEXT_REINDEX_WORKERS", 1), 1)
+
+
+def _report_progress(task, progress):
+  """Store reindex progress to the background task if there is one."""
+  if task is None:
+    return
+  done = sum(p["done"] for p in progress.itervalues())
+  total = sum(p["total"] for p in progress.itervalues())
+  task.update_progress({
+      "done": done,
+      "total": total,
+      "models": progress,
+  })
+
+
+def _run_serial(reindex_log_id, chunks, progress, task, mode):
+  for model_name, ids in chunks:
+    with benchmark("Create records for %s" % model_name):
+      reindex_chunk(reindex_log_id, model_name, ids, mode)
+    progress[model_name]["done"] += len(ids)
+    _report_progress(task, progress)
+
+
+def _run_parallel(reindex_log_id, chunks, progress, task, mode, workers):
+  """Reindex chunks with a pool of worker processes."""
+  # Connections must not be shared between the parent and forked workers.
+  db.session.remove()
+  db.engine.dispose()
+  pool = multiprocessing.Pool(workers, initializer=_init_worker)
+  try:
+    results = pool.imap_unordered(
+        _reindex_chunk_worker,
+        [(reindex_log_id, model_name, ids, mode)
+         for model_name, ids in chunks],
+    )
+    for model_name, count in results:
+      progress[model_name]["done"] += count
+      _report_progress(task, progress)
+    pool.close()
+  except Exception:
+    pool.terminate()
+    raise
+  finally:
+    pool.join()
+
+
+def _prepare_shadow_table(reindex_log_id):
+  """Create the shadow table unless an unfinished run already loads it."""
+  if shadow.shadow_table_exists():
+    return
+  _clear_checkpoints(reindex_log_id)
+  shadow.clear_changes()
+  db.session.commit()
+  shadow.create_shadow_table()
+
+
+def _catch_up_shadow_table(chunk_size):
+  """Reindex recorded changes into the shadow table.
+
+  Objects reindexed in the live table since the run started are reindexed
+  into the shadow table again, recorded objects of types that are not part
+  of the full reindex are skipped.
+  """
+  tables = _get_tables(SWAP)
+  model_names = set(_get_model_names())
+  for model_name, ids in shadow.pop_changes().iteritems():
+    if model_name not in model_names:
+      continue
+    for ids_chunk in list_chunks(sorted(ids), chunk_size):
+      _reindex_ids(model_name, ids_chunk, tables)
+      db.session.commit()
+
+
+def _delete_missing_objects():
+  for model_name in _get_model_names():
+    shadow.delete_missing_objects(model_name, _get_model(model_name))
+  db.session.commit()
+
+
+def _finish_swap(reindex_log_id, chunk_size):
+  """Index the loaded shadow table, catch up and swap it in.
+
+  Most changes are caught up while changes are still recorded, the rest is
+  caught up while recording is blocked, so changes committed before the
+  swap can not be missed.
+  """
+  shadow.drop_old_tables()
+  with benchmark("Create shadow table indexes"):
+    shadow.create_shadow_indexes()
+  with benchmark("Catch up shadow table"):
+    _catch_up_shadow_table(chunk_size)
+  with shadow.lock_changes(reindex_log_id):
+    with benchmark("Catch up locked shadow table"):
+      _catch_up_shadow_table(chunk_size)
+      _delete_missing_objects()
+    with benchmark("Swap shadow table"):
+      shadow.swap_shadow_table()
+
+
+def reindex_all(task=None, chunk_size=None, workers=None, mode=None):
+  """Reindex all indexed objects and snapshots.
+
+  Args:
+    task: optional BackgroundTask that receives progress updates.
+    chunk_size: number of objects reindexed and committed at once.
+    workers: number of worker processes used for reindexing.
+    mode: one of MODES, FULLTEXT_REINDEX_MODE setting by default.
+  """
+  chunk_size = chunk_size or settings.FULLTEXT_REINDEX_CHUNK_SIZE
+  workers = workers or _get_workers_count()
+  mode = mode or settings.FULLTEXT_REINDEX_MODE
+  if mode not in MODES:
+    raise ValueError("Invalid reindex mode: {}".format(mode))
+  reindex_log = _get_reindex_log(mode)
+  reindex_log_id = reindex_log.id
+  indexer = get_indexer()
+  _warm_indexer_cache()
+  try:
+    if mode == SWAP:
+      _prepare_shadow_table(reindex_log_id)
+    with benchmark("Generate reindex chunks"):
+      chunks, progress = generate_chunks(reindex_log_id, chunk_size)
+    _report_progress(task, progress)
+    logger.info("Reindexing %s chunks with %s workers", len(chunks), workers)
+    if workers > 1 and len(chunks) > 1:
+      _run_parallel(reindex_log_id, chunks, progress, task, mode, workers)
+    else:
+      _run_serial(reindex_log_id, chunks, progress, task, mode)
+    if mode == SWAP:
+      _finish_swap(reindex_log_id, chunk_size)
+  except Exception as error:
+    db.session.rollback()
+    reindex_log = ReindexLog.query.get(reindex_log_id)
+    reindex_log.log = unicode(error)[:250]
+    db.session.commit()
+    raise
+  finally:
+    indexer.invalidate_cache()
+    _clear_snapshot_cache()
+
+  reindex_log = ReindexLog.query.get(reindex_log_id)
+  reindex_log.is_reindex_complete = True
+  reindex_log.log = None
+  _clear_checkpoints(reindex_log_id)
+  if mode == SWAP:
+    shadow.clear_changes()
+  db.session.commit()
@@ -0,0 +1,259 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Shadow copy of the full text record table.
+
+A shadow table is used by the swap reindex mode. The table is created with
+the same structure as the live record table but without its secondary
+indexes, so bulk loading does not have to maintain them for every row. The
+indexes are added in a single statement once the table is loaded, and the
+shadow table then replaces the live table with an atomic ``RENAME TABLE``.
+Search keeps reading complete results from the live table during the whole
+rebuild.
+
+Indexers with a token table (see ``MysqlTrigramIndexer``) get a shadow token
+table as well. It is loaded together with the shadow record table and both
+are swapped in by the same ``RENAME TABLE``, so tokens always match the live
+records.
+
+Objects reindexed in the live tables while a swap run is unfinished are
+recorded in the ``reindex_changes`` table with ``record_changes``. They are
+reindexed into the shadow tables before the swap, the last time while
+``lock_changes`` blocks recording of new changes, so no change committed
+during the rebuild is lost by the ``RENAME TABLE``.
+"""
+
+import collections
+import contextlib
+import logging
+
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc.fulltext import get_indexer
+from ggrc.models.maintenance import ReindexChange
+from ggrc.models.maintenance import ReindexLog
+from ggrc.utils import list_chunks
+
+
+logger = logging.getLogger(__name__)
+
+SHADOW_SUFFIX = "_shadow"
+OLD_SUFFIX = "_old"
+
+SWAP_MODE = "swap"
+
+
+def _live_table_name():
+  return get_indexer().record_type.__tablename__
+
+
+def _get_live_tables():
+  """Get live tables that are rebuilt in shadow tables."""
+  indexer = get_indexer()
+  tables = [indexer.record_type.__table__]
+  token_type = getattr(indexer, "token_type", None)
+  if token_type is not None:
+    tables.append(token_type.__table__)
+  return tables
+
+
+def _get_shadow_table_clause(live_table):
+  return sa.table(
+      live_table.name + SHADOW_SUFFIX,
+      *[sa.column(column.name) for column in live_table.columns]
+  )
+
+
+def get_shadow_table_name():
+  return _live_table_name() + SHADOW_SUFFIX
+
+
+def get_shadow_table():
+  """Get a table clause that can be used for inserts into the shadow table."""
+  return _get_shadow_table_clause(get_indexer().record_type.__table__)
+
+
+def get_shadow_token_table():
+  """Get a table clause of the shadow token table or None.
+
+  Returns None if the indexer has no token table.
+  """
+  token_type = getattr(get_indexer(), "token_type", None)
+  if token_type is None:
+    return None
+  return _get_shadow_table_clause(token_type.__table__)
+
+
+def shadow_table_exists():
+  """Check if shadow tables of all rebuilt tables exist."""
+  return all(
+      db.engine.dialect.has_table(db.engine, table.name + SHADOW_SUFFIX)
+      for table in _get_live_tables()
+  )
+
+
+def _get_secondary_indexes(table_name):
+  return sa.inspect(db.engine).get_indexes(table_name)
+
+
+def create_shadow_table():
+  """Create empty shadow tables without secondary indexes."""
+  for live_table in _get_live_tables():
+    live_name = live_table.name
+    shadow_name = live_name + SHADOW_SUFFIX
+    db.engine.execute("DROP TABLE IF EXISTS `{}`".format(shadow_name))
+    db.engine.execute("CREATE TABLE `{}` LIKE `{}`".format(shadow_name,
+                                                           live_name))
+    indexes = _get_secondary_indexes(shadow_name)
+    if indexes:
+      db.engine.execute("ALTER TABLE `{}` {}".format(
+          shadow_name,
+          ", ".join("DROP INDEX `{}`".format(i["name"]) for i in indexes),
+      ))
+    logger.info("Created shadow table %s", shadow_name)
+
+
+def create_shadow_indexes():
+  """Add secondary indexes of the live tables to the loaded shadow tables."""
+  for live_table in _get_live_tables():
+    live_name = live_table.name
+    shadow_name = live_name + SHADOW_SUFFIX
+    existing = {i["name"] for i in _get_secondary_indexes(shadow_name)}
+    statements = []
+    for index in _get_secondary_indexes(live_name):
+      if index["name"] in existing:
+        continue
+      statements.append("ADD {unique}INDEX `{name}` ({columns})".format(
+          unique="UNIQUE " if index["unique"] else "",
+          name=index["name"],
+          columns=", ".join("`{}`".format(c) for c in index["column_names"]),
+      ))
+    if statements:
+      db.engine.execute("ALTER TABLE `{}` {}".format(
+          shadow_name, ", ".join(statements)))
+
+
+def drop_old_tables():
+  """Drop live tables left over by an interrupted swap."""
+  for live_table in _get_live_tables():
+    db.engine.execute("DROP TABLE IF EXISTS `{}`".format(
+        live_table.name + OLD_SUFFIX))
+
+
+def swap_shadow_table():
+  """Atomically replace the live tables with the shadow tables.
+
+  Old tables must not exist, see drop_old_tables.
+  """
+  live_names = [table.name for table in _get_live_tables()]
+  db.session.commit()
+  db.engine.execute("RENAME TABLE {}".format(", ".join(
+      "`{live}` TO `{old}`, `{shadow}` TO `{live}`".format(
+          live=live_name,
+          old=live_name + OLD_SUFFIX,
+          shadow=live_name + SHADOW_SUFFIX,
+      ) for live_name in live_names
+  )))
+  for live_name in live_names:
+    db.engine.execute("DROP TABLE `{}`".format(live_name + OLD_SUFFIX))
+    logger.info("Swapped shadow table into %s", live_name)
+
+
+def delete_missing_objects(model_name, model):
+  """Remove shadow records of objects that were deleted during the rebuild.
+
+  Args:
+    model_name: name of the indexed type.
+    model: model class whose ids are checked.
+  """
+  for live_table in _get_live_tables():
+    table = _get_shadow_table_clause(live_table)
+    db.session.execute(
+        table.delete().where(
+            table.c.type == model_name
+        ).where(
+            ~table.c.key.in_(sa.select([model.id]))
+        )
+    )
+
+
+def _running_swap_query():
+  return db.session.query(ReindexLog.id).filter(
+      ReindexLog.mode == SWAP_MODE,
+      ReindexLog.is_reindex_complete.is_(False),
+  )
+
+
+def record_changes(pairs):
+  """Record objects whose live records are replaced during a swap run.
+
+  Must be called before the live tables are changed. The locking read of
+  the unfinished swap run is held until the session commits, so
+  lock_changes waits for the change to be committed.
+
+  Args:
+    pairs: iterable of (type, id) tuples of the reindexed objects.
+  """
+  pairs = set(pairs)
+  if not pairs:
+    return
+  if _running_swap_query().with_for_update(read=True).first() is None:
+    return
+  insert = ReindexChange.__table__.insert().prefix_with("IGNORE")
+  for chunk in list_chunks(sorted(pairs)):
+    db.session.execute(insert, [
+        {"object_type": type_, "object_id": id_} for type_, id_ in chunk
+    ])
+
+
+def pop_changes():
+  """Get and remove recorded changes.
+
+  Removing a change waits for sessions that recorded it again to commit, so
+  objects read after this are up to date.
+
+  Returns:
+    dict of object types and lists of ids.
+  """
+  table = ReindexChange.__table__
+  rows = db.session.execute(
+      sa.select([table.c.object_type, table.c.object_id])
+  ).fetchall()
+  changes = collections.defaultdict(list)
+  for chunk in list_chunks(rows):
+    db.session.execute(table.delete().where(
+        sa.tuple_(table.c.object_type, table.c.object_id).in_(
+            [tuple(row) for row in chunk])
+    ))
+    for type_, id_ in chunk:
+      changes[type_].append(id_)
+  db.session.commit()
+  return changes
+
+
+def clear_changes():
+  """Remove all recorded changes."""
+  db.session.execute(ReindexChange.__table__.delete())
+
+
+@contextlib.contextmanager
+def lock_changes(reindex_log_id):
+  """Block record_changes until the context exits.
+
+  The reindex run is locked on a separate connection after all sessions that
+  already recorded changes have committed, so the changes can be reindexed
+  and the shadow tables swapped with the session in several transactions.
+  """
+  connection = db.engine.connect()
+  transaction = connection.begin()
+  try:
+    connection.execute(
+        sa.select([ReindexLog.id]).where(
+            ReindexLog.id == reindex_log_id
+        ).with_for_update()
+    )
+    yield
+  finally:
+    transaction.rollback()
+    connection.close()
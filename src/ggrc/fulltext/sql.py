@@ -38,6 +38,21 @@ class SqlIndexer(object):
   def search(self, terms):
     raise NotImplementedError()
 
+  def update_tokens(self, type_, keys, rows, table=None, properties=None):
+    """Update search tokens after records of objects were replaced.
+
+    Records are searched by their contents, so there are no tokens to update.
+    Indexers with additional search structures override this.
+
+    Args:
+      type_: type of the objects.
+      keys: ids of the objects whose records were replaced.
+      rows: dicts with key, type, property and content of the new records.
+      table: table for the tokens, the indexer token table by default.
+      properties: names of the replaced properties if only some properties
+        of the records were replaced.
+    """
+
   def records_generator(self, record):
     """Record generator method."""
     for prop, value in record.properties.items():
@@ -0,0 +1,192 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Full text index engine with a trigram inverted index.
+
+MysqlTrigramIndexer stores full text records the same way MysqlIndexer does
+and additionally keeps every distinct lower case trigram of record contents
+in ``fulltext_record_trigrams`` table. A record containing a search term must
+contain all trigrams of the term, so searches select candidate records with
+index lookups of those trigrams and check contents of the candidates only.
+This works for substrings as well as prefixes. Terms shorter than a trigram
+are matched against all records.
+
+The indexer is enabled with FULLTEXT_INDEXER setting
+"ggrc.fulltext.trigram.MysqlTrigramIndexer". The trigram table is filled by a
+full reindex. In swap reindex mode trigrams are loaded into a shadow copy of
+the trigram table that is swapped in together with the record table.
+"""
+
+from sqlalchemy import func
+from sqlalchemy import tuple_
+from sqlalchemy import and_
+
+from ggrc import db
+from ggrc.fulltext.mysql import MysqlIndexer
+from ggrc.fulltext.mysql import MysqlRecordProperty
+from ggrc.utils import list_chunks
+
+
+TRIGRAM_SIZE = 3
+
+# Maximal number of trigram rows inserted by a single statement
+INSERT_CHUNK_SIZE = 10000
+
+
+def get_trigrams(text):
+  """Get a set of all distinct lower case trigrams of the text."""
+  text = text.lower()
+  return {text[i:i + TRIGRAM_SIZE]
+          for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+# pylint: disable=too-few-public-methods
+class MysqlRecordTrigram(db.Model):
+  """Trigram of a full text record property."""
+  __tablename__ = "fulltext_record_trigrams"
+
+  trigram = db.Column(db.String(TRIGRAM_SIZE, collation="utf8_bin"),
+                      primary_key=True)
+  type = db.Column(db.String(64), primary_key=True)
+  key = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  property = db.Column(db.String(250), primary_key=True)
+
+  __table_args__ = (
+      db.Index("ix_fulltext_record_trigrams_type_key", "type", "key"),
+  )
+
+
+def get_candidates_filter(text):
+  """Get a filter of full text records that can contain the text.
+
+  Returns:
+    filter on MysqlRecordProperty or None if the text is too short to have
+    trigrams.
+  """
+  trigrams = get_trigrams(text)
+  if not trigrams:
+    return None
+  candidates = db.session.query(
+      MysqlRecordTrigram.type,
+      MysqlRecordTrigram.key,
+      MysqlRecordTrigram.property,
+  ).filter(
+      MysqlRecordTrigram.trigram.in_(trigrams)
+  ).group_by(
+      MysqlRecordTrigram.type,
+      MysqlRecordTrigram.key,
+      MysqlRecordTrigram.property,
+  ).having(
+      func.count(MysqlRecordTrigram.trigram) == len(trigrams)
+  )
+  return tuple_(
+      MysqlRecordProperty.type,
+      MysqlRecordProperty.key,
+      MysqlRecordProperty.property,
+  ).in_(candidates)
+
+
+class MysqlTrigramIndexer(MysqlIndexer):
+  """Mysql indexer with a trigram inverted index of record contents."""
+
+  token_type = MysqlRecordTrigram
+
+  @staticmethod
+  def _get_filter_query(terms):
+    """Get the whitelist of fields to filter in full text table."""
+    query = MysqlIndexer._get_filter_query(terms)
+    candidates = get_candidates_filter(terms) if terms else None
+    if candidates is None:
+      return query
+    return and_(query, candidates)
+
+  def get_text_search_query(self, type_name, text):
+    query = super(MysqlTrigramIndexer, self).get_text_search_query(
+        type_name, text)
+    candidates = get_candidates_filter(text)
+    if candidates is None:
+      return query
+    return query.filter(candidates)
+
+  def _delete_tokens(self, type_=None, keys=None, properties=None,
+                     table=None):
+    """Delete trigrams of records matching all given arguments."""
+    if table is None:
+      table = self.token_type.__table__
+    query = table.delete()
+    if type_ is not None:
+      query = query.where(table.c.type == type_)
+    if keys is not None:
+      query = query.where(table.c.key.in_(keys))
+    if properties is not None:
+      query = query.where(table.c.property.in_(properties))
+    db.session.execute(query)
+
+  def _insert_tokens(self, rows, table=None):
+    """Insert trigrams of contents of records rows."""
+    if table is None:
+      table = self.token_type.__table__
+    values = [
+        {
+            "trigram": trigram,
+            "type": row["type"],
+            "key": row["key"],
+            "property": row["property"],
+        }
+        for row in rows
+        for trigram in get_trigrams(unicode(row["content"] or u""))
+    ]
+    # Subproperties of a single property can share trigrams
+    insert = table.insert().prefix_with("IGNORE")
+    for chunk in list_chunks(values, INSERT_CHUNK_SIZE):
+      db.session.execute(insert, chunk)
+
+  def update_tokens(self, type_, keys, rows, table=None, properties=None):
+    if not keys:
+      return
+    self._delete_tokens(type_, list(keys),
+                        list(properties) if properties else None, table)
+    self._insert_tokens(rows, table)
+
+  def create_record(self, record, commit=True):
+    self._insert_tokens(
+        {
+            "type": record.type,
+            "key": record.key,
+            "property": prop,
+            "content": content,
+        }
+        for prop, value in record.properties.items()
+        for content in value.values()
+        if content is not None
+    )
+    super(MysqlTrigramIndexer, self).create_record(record, commit)
+
+  def update_record(self, record, commit=True):
+    if record.properties:
+      self._delete_tokens(record.type, [record.key],
+                          list(record.properties.keys()))
+    super(MysqlTrigramIndexer, self).update_record(record, commit)
+
+  def delete_record(self, key, type, commit=True):
+    # pylint: disable=redefined-builtin
+    self._delete_tokens(type, [key])
+    super(MysqlTrigramIndexer, self).delete_record(key, type, commit)
+
+  def delete_records_by_ids(self, type, keys, commit=True):
+    # pylint: disable=redefined-builtin
+    if keys:
+      self._delete_tokens(type, keys)
+    super(MysqlTrigramIndexer, self).delete_records_by_ids(type, keys, commit)
+
+  def delete_all_records(self, commit=True):
+    self._delete_tokens()
+    super(MysqlTrigramIndexer, self).delete_all_records(commit)
+
+  def delete_records_by_type(self, type, commit=True):
+    # pylint: disable=redefined-builtin
+    self._delete_tokens(type)
+    super(MysqlTrigramIndexer, self).delete_records_by_type(type, commit)
+
+
+Indexer = MysqlTrigramIndexer
@@ -0,0 +1,45 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add reindex checkpoints table
+
+Create Date: 2017-12-11 10:15:30.412031
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2bb8a9f1c0d4'
+down_revision = '4f01efeeba4d'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'reindex_checkpoints',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('reindex_log_id', sa.Integer(), nullable=False),
+      sa.Column('model_name', sa.String(length=250), nullable=False),
+      sa.Column('first_id', sa.Integer(), nullable=False),
+      sa.Column('last_id', sa.Integer(), nullable=False),
+      sa.Column('count', sa.Integer(), nullable=False),
+      sa.PrimaryKeyConstraint('id'),
+      sa.ForeignKeyConstraint(['reindex_log_id'], ['reindex_log.id'],
+                              ondelete='CASCADE'),
+  )
+  op.create_index(
+      'ix_reindex_checkpoints_log_model',
+      'reindex_checkpoints',
+      ['reindex_log_id', 'model_name'],
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('reindex_checkpoints')
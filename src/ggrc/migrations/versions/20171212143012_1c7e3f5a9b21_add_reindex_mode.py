@@ -0,0 +1,38 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add mode and start time to reindex log
+
+Create Date: 2017-12-12 14:30:12.553829
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1c7e3f5a9b21'
+down_revision = '2bb8a9f1c0d4'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.add_column(
+      'reindex_log',
+      sa.Column('mode', sa.String(length=50), nullable=False,
+                server_default='in_place'),
+  )
+  op.add_column(
+      'reindex_log',
+      sa.Column('started_at', sa.DateTime(), nullable=True),
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_column('reindex_log', 'started_at')
+  op.drop_column('reindex_log', 'mode')
@@ -0,0 +1,39 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add full text record trigrams table
+
+Create Date: 2017-12-18 09:30:15.482913
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8d4c1a73'
+down_revision = '3a7d5c1e9f42'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'fulltext_record_trigrams',
+      sa.Column('trigram', sa.String(length=3, collation='utf8_bin'),
+                nullable=False),
+      sa.Column('type', sa.String(length=64), nullable=False),
+      sa.Column('key', sa.Integer(), autoincrement=False, nullable=False),
+      sa.Column('property', sa.String(length=250), nullable=False),
+      sa.PrimaryKeyConstraint('trigram', 'type', 'key', 'property'),
+  )
+  op.create_index('ix_fulltext_record_trigrams_type_key',
+                  'fulltext_record_trigrams', ['type', 'key'])
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('fulltext_record_trigrams')
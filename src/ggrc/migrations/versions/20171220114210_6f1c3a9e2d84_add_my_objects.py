@@ -0,0 +1,53 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add my objects tables
+
+Create Date: 2017-12-20 11:42:10.318426
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1c3a9e2d84'
+down_revision = '5b2e8d4c1a73'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'my_objects',
+      sa.Column('person_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column('object_type', sa.String(length=250), nullable=False),
+      sa.Column('object_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column('via_mapping', sa.Boolean(), nullable=False),
+      sa.ForeignKeyConstraint(['person_id'], ['people.id'],
+                              ondelete='CASCADE'),
+      sa.PrimaryKeyConstraint('person_id', 'object_type', 'object_id',
+                              'via_mapping'),
+  )
+  op.create_index('ix_my_objects_object', 'my_objects',
+                  ['object_type', 'object_id'])
+  # Rows of people missing in this table are built on their first lookup
+  op.create_table(
+      'my_objects_people',
+      sa.Column('person_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.ForeignKeyConstraint(['person_id'], ['people.id'],
+                              ondelete='CASCADE'),
+      sa.PrimaryKeyConstraint('person_id'),
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('my_objects_people')
+  op.drop_table('my_objects')
@@ -0,0 +1,38 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add background task checkpoints table
+
+Create Date: 2017-12-21 14:10:45.527361
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3b5a7c6d21'
+down_revision = '2c7d4e1f9a35'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'background_task_checkpoints',
+      sa.Column('task_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column('state', mysql.MEDIUMBLOB(), nullable=False),
+      sa.ForeignKeyConstraint(['task_id'], ['background_tasks.id'],
+                              ondelete='CASCADE'),
+      sa.PrimaryKeyConstraint('task_id'),
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('background_task_checkpoints')
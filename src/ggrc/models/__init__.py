@@ -136,6 +136,10 @@ def init_session_monitor_cache():
       cache.update_after_flush(session, flush_context)
 
   def clear_cache(session):
+    if session.transaction is not None and session.transaction.nested:
+      # Objects tracked before a savepoint still belong to the outer
+      # transaction, so the cache is kept until it is finished.
+      return
     cache = Cache.get_cache()
     if cache:
       cache.clear()
@@ -3,8 +3,10 @@
 
 """Module for ggrc background tasks."""
 
+import json
 import traceback
 from logging import getLogger
+from functools import partial
 from functools import wraps
 from time import time
 
@@ -24,6 +26,13 @@ from ggrc.models import reflection
 
 logger = getLogger(__name__)
 
+DEFAULT_QUEUE = "ggrc"
+# Queue for tasks that resume from their checkpoint when they are retried.
+RETRY_QUEUE = "ggrc-retry"
+# Retries of retryable tasks that run without a task queue, the same as the
+# task_retry_limit of RETRY_QUEUE in queue.yaml.
+INLINE_RETRY_LIMIT = 3
+
 
 class BackgroundTask(Base, Stateful, db.Model):
   """Background task model."""
@@ -55,6 +64,21 @@ class BackgroundTask(Base, Stateful, db.Model):
     db.session.add(self)
     db.session.commit()
 
+  def update_progress(self, progress):
+    """Store the progress of the running task.
+
+    The progress is stored as a task result with 202 status code so that the
+    task status response reports it until the task is finished.
+
+    Args:
+      progress: json serializable object describing the task progress.
+    """
+    self.result = {'content': json.dumps(progress),
+                   'status_code': 202,
+                   'headers': [('Content-Type', 'application/json')]}
+    db.session.add(self)
+    db.session.commit()
+
   def finish(self, status, result):
     """Finish the current bg task."""
     # Ensure to not commit any not-yet-committed changes
@@ -81,9 +105,113 @@ class BackgroundTask(Base, Stateful, db.Model):
                               self.result['status_code'],
                               self.result['headers']))
 
+  def get_checkpoint(self):
+    """Get the checkpoint stored by a previous run of the task or None."""
+    checkpoint = BackgroundTaskCheckpoint.query.get(self.id)
+    return checkpoint.state if checkpoint else None
+
+  def save_checkpoint(self, state):
+    """Store and commit the state a retried run of the task resumes from.
+
+    Unlike the task result, the checkpoint is kept when the task fails.
+    """
+    db.session.merge(BackgroundTaskCheckpoint(task_id=self.id, state=state))
+    db.session.commit()
+
+
+class BackgroundTaskCheckpoint(db.Model):
+  """Resumable state of a background task."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = 'background_task_checkpoints'
+
+  task_id = db.Column(
+      db.Integer,
+      db.ForeignKey('background_tasks.id', ondelete='CASCADE'),
+      primary_key=True,
+      autoincrement=False,
+  )
+  state = db.Column(CompressedType, nullable=False)
+
+
+class BackgroundTaskFile(db.Model):
+  """Part of a file used or produced by a background task.
+
+  Task parameters and results are limited to a single CompressedType value,
+  so large files such as import and export csv files are stored here in
+  parts, see write_task_file and read_task_file.
+  """
+  # pylint: disable=too-few-public-methods
+  __tablename__ = 'background_task_files'
 
-def create_task(name, url, queued_callback=None, parameters=None, method=None):
-  """Create a enqueue a bacground task."""
+  # Max length of a single string part and approximate max size of a part
+  # made of csv rows
+  PART_SIZE = 1024 * 1024
+
+  task_id = db.Column(
+      db.Integer,
+      db.ForeignKey('background_tasks.id', ondelete='CASCADE'),
+      primary_key=True,
+      autoincrement=False,
+  )
+  name = db.Column(db.String(32), primary_key=True)
+  position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  content = db.Column(CompressedType, nullable=False)
+
+
+def _split_part(part):
+  """Split a string part into pieces of at most PART_SIZE characters."""
+  size = BackgroundTaskFile.PART_SIZE
+  if not isinstance(part, basestring) or len(part) <= size:
+    return [part]
+  return [part[offset:offset + size] for offset in range(0, len(part), size)]
+
+
+def write_task_file(task_id, name, parts):
+  """Store parts of a task file and commit them.
+
+  Args:
+    task_id: id of the task that owns the file.
+    name: name of the file, unique within the task.
+    parts: iterable of picklable parts of the file. Strings longer than
+      PART_SIZE are split into several parts.
+  """
+  table = BackgroundTaskFile.__table__
+  position = 0
+  for part in parts:
+    for piece in _split_part(part):
+      db.session.execute(table.insert(), {
+          "task_id": task_id,
+          "name": name,
+          "position": position,
+          "content": piece,
+      })
+      position += 1
+  db.session.commit()
+
+
+def read_task_file(task_id, name):
+  """Generate parts of a task file, loading one part at a time."""
+  file_filter = db.and_(BackgroundTaskFile.task_id == task_id,
+                        BackgroundTaskFile.name == name)
+  positions = db.session.query(BackgroundTaskFile.position).filter(
+      file_filter).order_by(BackgroundTaskFile.position).all()
+  for position, in positions:
+    yield db.session.query(BackgroundTaskFile.content).filter(
+        file_filter,
+        BackgroundTaskFile.position == position,
+    ).scalar()
+
+
+def create_task(name, url, queued_callback=None, parameters=None, method=None,
+                files=None, queue_name=DEFAULT_QUEUE):
+  """Create a enqueue a bacground task.
+
+  Args:
+    files: optional dict with iterables of parts of files stored for the task
+      before it is scheduled, see write_task_file.
+    queue_name: App Engine task queue of the task, RETRY_QUEUE for tasks
+      that can be retried.
+  """
   if not method:
     method = request.method
 
@@ -95,6 +223,8 @@ def create_task(name, url, queued_callback=None, parameters=None, method=None):
   task.modified_by = get_current_user()
   db.session.add(task)
   db.session.commit()
+  for file_name, parts in (files or {}).iteritems():
+    write_task_file(task.id, file_name, parts)
   banned = {
       "X-Appengine-Country",
       "X-Appengine-Queuename",
@@ -112,7 +242,7 @@ def create_task(name, url, queued_callback=None, parameters=None, method=None):
     headers = Headers({k: v for k, v in request.headers if k not in banned})
     headers.add('X-Task-Id', task.id)
     taskqueue.add(
-        queue_name="ggrc",
+        queue_name=queue_name,
         url=url,
         name="{}_{}".format(task.name, task.id),
         params={'task_id': task.id},
@@ -130,9 +260,38 @@ def make_task_response(id_):
   return task.make_response()
 
 
-def queued_task(func):
-  """Decorator for task queues."""
+def _run_task(func, task, retry):
+  """Run the task function and store its result in the task."""
   from ggrc.app import app
+  task.start()
+  try:
+    result = func(task)
+  except:  # pylint: disable=bare-except
+    # Bare except is allowed here so that we can respond with the correct
+    # message to all exceptions.
+    logger.exception("Task failed")
+    task.finish("Failure", app.make_response((
+        traceback.format_exc(), 200, [('Content-Type', 'text/html')])))
+
+    # Return 200 so that the task is not retried unless it is retryable
+    return app.make_response((
+        'failure', 500 if retry else 200, [('Content-Type', 'text/html')]))
+  task.finish("Success", result)
+  return result
+
+
+def queued_task(func=None, retry=False):
+  """Decorator for task queues.
+
+  Args:
+    retry: if set, a failed task responds with an error status so that the
+      task queue retries it, and a task that runs without a task queue is
+      retried up to INLINE_RETRY_LIMIT times. Such tasks should be created
+      in RETRY_QUEUE and resume from their checkpoint, see
+      BackgroundTask.save_checkpoint.
+  """
+  if func is None:
+    return partial(queued_task, retry=retry)
 
   @wraps(func)
   def decorated_view(*args, **_):
@@ -141,24 +300,18 @@ def queued_task(func):
     This runner makes sure that the task is called with the task model as
     the parameter.
     """
+    retries = 0
     if args and isinstance(args[0], BackgroundTask):
       task = args[0]
+      if retry:
+        retries = INLINE_RETRY_LIMIT
     else:
       task_id = request.headers.get("X-Task-Id", request.values.get("task_id"))
       task = BackgroundTask.query.get(task_id)
-    task.start()
-    try:
-      result = func(task)
-    except:  # pylint: disable=bare-except
-      # Bare except is allowed here so that we can respond with the correct
-      # message to all exceptions.
-      logger.exception("Task failed")
-      task.finish("Failure", app.make_response((
-          traceback.format_exc(), 200, [('Content-Type', 'text/html')])))
-
-      # Return 200 so that the task is not retried
-      return app.make_response((
-          'failure', 200, [('Content-Type', 'text/html')]))
-    task.finish("Success", result)
-    return result
+    response = _run_task(func, task, retry)
+    while retries and task.status == "Failure":
+      retries -= 1
+      logger.info("Retrying task %s", task.id)
+      response = _run_task(func, task, retry)
+    return response
   return decorated_view
@@ -50,6 +50,12 @@ class Cache:
     self.dirty = {}
     self.deleted = {}
 
+  def restore(self, snapshot):
+    """Restore tracked objects from a cache copy made with ``copy``."""
+    self.new = dict(snapshot.new)
+    self.dirty = dict(snapshot.dirty)
+    self.deleted = dict(snapshot.deleted)
+
   def copy(self):
     copied_cache = Cache()
     copied_cache.new = dict(self.new)
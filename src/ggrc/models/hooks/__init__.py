@@ -10,7 +10,9 @@ from ggrc.models.hooks import comment
 from ggrc.models.hooks import custom_attribute_definition
 from ggrc.models.hooks import issue
 from ggrc.models.hooks import issue_tracker
+from ggrc.models.hooks import my_objects
 from ggrc.models.hooks import relationship
+from ggrc.models.hooks import revision
 
 
 ALL_HOOKS = [
@@ -21,6 +23,8 @@ ALL_HOOKS = [
     relationship,
     access_control_list,
     custom_attribute_definition,
+    revision,
+    my_objects,
 
     # Keep IssueTracker at the end of list to make sure that all other hooks
     # are already executed and all data is final.
@@ -0,0 +1,167 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Hooks that keep precomputed "My Work" objects up to date."""
+
+import sqlalchemy as sa
+from sqlalchemy.orm.session import Session
+
+from ggrc.models import all_models
+from ggrc.query import my_objects
+from ggrc_basic_permissions.models import UserRole
+
+
+# Classes whose person attributes link people with objects
+_PERSON_ATTRS = (
+    (all_models.AccessControlList, "person_id", "person"),
+    (all_models.ObjectPerson, "person_id", "person"),
+    (UserRole, "person_id", "person"),
+)
+
+_CONTACT_ATTRS = (
+    ("contact_id", "contact"),
+    ("secondary_contact_id", "secondary_contact"),
+)
+
+_CONTEXT_MODELS = (
+    all_models.Program,
+    all_models.Audit,
+    all_models.Workflow,
+)
+
+
+def _get_values(obj, attr, changed_only):
+  """Get current and previous values of an attribute of a flushed object.
+
+  Args:
+    obj: flushed object.
+    attr: name of the attribute.
+    changed_only: return values only if the attribute has been changed.
+  """
+  attrs = sa.inspect(obj).attrs
+  if attr not in attrs:
+    return set()
+  history = attrs[attr].history
+  if changed_only and not history.has_changes():
+    return set()
+  return {value for value in history.sum() if value is not None}
+
+
+def _get_person_ids(obj, id_attr, person_attr, changed_only):
+  """Get ids of people set as the id or the person attribute of an object."""
+  person_ids = _get_values(obj, id_attr, changed_only)
+  person_ids.update(person.id for person in
+                    _get_values(obj, person_attr, changed_only))
+  return person_ids
+
+
+class _Changes(object):
+  """Changes of a flush that affect objects of people."""
+
+  def __init__(self):
+    self.person_ids = set()
+    self.task_ids = set()
+    self.cycle_ids = set()
+    self.context_ids = set()
+
+  def add(self, obj, changed_only):
+    """Collect changes made to a flushed object."""
+    self._add_people(obj, changed_only)
+    if isinstance(obj, all_models.CustomAttributeValue):
+      self._add_custom_attribute_value(obj, changed_only)
+    elif isinstance(obj, all_models.Relationship):
+      self._add_relationship(obj, changed_only)
+    elif isinstance(obj, (all_models.CycleTaskGroupObjectTask,
+                          all_models.Cycle)):
+      self._add_cycle_object(obj, changed_only)
+    if isinstance(obj, _CONTEXT_MODELS):
+      self.context_ids.update(_get_values(obj, "context_id", changed_only))
+
+  def _add_people(self, obj, changed_only):
+    """Collect people set in person attributes and contacts."""
+    for class_, id_attr, person_attr in _PERSON_ATTRS:
+      if isinstance(obj, class_):
+        self.person_ids.update(
+            _get_person_ids(obj, id_attr, person_attr, changed_only))
+    for id_attr, person_attr in _CONTACT_ATTRS:
+      self.person_ids.update(
+          _get_person_ids(obj, id_attr, person_attr, changed_only))
+
+  def _add_custom_attribute_value(self, obj, changed_only):
+    """Collect people set as Map:Person custom attribute values."""
+    if (_get_values(obj, "attribute_value", changed_only) or
+            _get_values(obj, "attribute_object_id", changed_only)):
+      self.person_ids.update(_get_values(obj, "attribute_object_id", False))
+
+  def _add_relationship(self, obj, changed_only):
+    """Collect people mapped with relationships."""
+    for side in ("source", "destination"):
+      if "Person" in _get_values(obj, side + "_type", changed_only):
+        self.person_ids.update(_get_values(obj, side + "_id", False))
+
+  def _add_cycle_object(self, obj, changed_only):
+    """Collect cycles and cycle tasks whose state has changed."""
+    if isinstance(obj, all_models.CycleTaskGroupObjectTask):
+      if _get_values(obj, "status", changed_only):
+        self.task_ids.add(obj.id)
+    elif (_get_values(obj, "is_current", changed_only) or
+          _get_values(obj, "is_verification_needed", changed_only)):
+      self.cycle_ids.add(obj.id)
+
+  def get_person_ids(self, session):
+    """Get ids of all people whose objects could have been changed."""
+    person_ids = set(self.person_ids)
+    acl = all_models.AccessControlList
+    task = all_models.CycleTaskGroupObjectTask
+    if self.task_ids or self.cycle_ids:
+      person_ids.update(id_ for id_, in session.query(
+          acl.person_id
+      ).join(
+          task,
+          sa.and_(
+              acl.object_type == task.__name__,
+              acl.object_id == task.id,
+          ),
+      ).filter(
+          sa.or_(
+              task.id.in_(self.task_ids or [None]),
+              task.cycle_id.in_(self.cycle_ids or [None]),
+          ),
+      ))
+    if self.context_ids:
+      person_ids.update(id_ for id_, in session.query(
+          UserRole.person_id
+      ).filter(
+          UserRole.context_id.in_(self.context_ids),
+      ))
+    return person_ids
+
+
+def handle_my_objects(session, flush_context):
+  """Invalidate "My Work" objects of people affected by a flush."""
+  # pylint: disable=unused-argument
+  session.info[my_objects.SESSION_WRITES_KEY] = True
+  changes = _Changes()
+  for obj in session.new:
+    changes.add(obj, changed_only=False)
+  for obj in session.dirty:
+    changes.add(obj, changed_only=True)
+  deleted = set()
+  for obj in session.deleted:
+    changes.add(obj, changed_only=False)
+    if isinstance(getattr(obj, "id", None), (int, long)):
+      deleted.add((obj.__class__.__name__, obj.id))
+
+  my_objects.invalidate_my_objects(session, changes.get_person_ids(session))
+  my_objects.delete_my_objects(session, deleted)
+
+
+def _end_transaction(session, transaction):
+  if transaction.parent is None:
+    session.info.pop(my_objects.SESSION_WRITES_KEY, None)
+
+
+def init_hook():
+  """Initialize hooks that maintain "My Work" objects."""
+  sa.event.listen(Session, "after_flush", handle_my_objects)
+  sa.event.listen(Session, "after_transaction_end", _end_transaction)
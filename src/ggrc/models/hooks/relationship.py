@@ -22,6 +22,7 @@ from ggrc.models import all_models
 from ggrc.models.comment import Commentable
 from ggrc.models.mixins import ChangeTracked
 from ggrc.models import exceptions
+from ggrc.query import my_objects
 
 
 LOGGER = logging.getLogger(__name__)
@@ -498,11 +499,16 @@ def handle_relationship_delete(relationship):
     if not issubclass(type(relationship.source), Assignable):
       assign_obj, other = other, assign_obj
     parent_ids = {acl.id for acl in assign_obj.access_control_list}
-    db.session.query(all_models.AccessControlList).filter(
+    acls = db.session.query(all_models.AccessControlList).filter(
         all_models.AccessControlList.parent_id.in_(parent_ids),
         all_models.AccessControlList.object_type == other.type,
         all_models.AccessControlList.object_id == other.id,
-    ).delete(synchronize_session='fetch')
+    )
+    my_objects.invalidate_my_objects(db.session, [
+        id_ for id_, in acls.with_entities(
+            all_models.AccessControlList.person_id)
+    ])
+    acls.delete(synchronize_session='fetch')
 
 
 def copy_snapshot_test_plan(objects, sources):
@@ -0,0 +1,34 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Revision hooks that maintain the latest revision of every object."""
+
+import sqlalchemy as sa
+from sqlalchemy.orm.session import Session
+
+from ggrc.models import all_models
+from ggrc.models.revision import store_latest_revisions
+
+
+def handle_revision_creation(session, flush_context):
+  """Store latest revisions of objects with revisions inserted by a flush.
+
+  Revisions logged by ``log_event`` are stored by the flush that inserts
+  them, in the same transaction.
+  """
+  # pylint: disable=unused-argument
+  latest = {}
+  for obj in session.new:
+    if isinstance(obj, all_models.Revision):
+      key = (obj.resource_type, obj.resource_id)
+      latest[key] = max(latest.get(key, 0), obj.id)
+  store_latest_revisions(session, [{
+      "resource_type": resource_type,
+      "resource_id": resource_id,
+      "revision_id": revision_id,
+  } for (resource_type, resource_id), revision_id in latest.iteritems()])
+
+
+def init_hook():
+  """Initialize Revision-related hooks."""
+  sa.event.listen(Session, "after_flush", handle_revision_creation)
@@ -43,3 +43,34 @@ class ReindexLog(Identifiable, db.Model):
 
   is_reindex_complete = db.Column(db.Boolean, nullable=False, default=True)
   log = db.Column(db.String)
+  mode = db.Column(db.String, nullable=False, default="in_place")
+  started_at = db.Column(db.DateTime)
+
+
+class ReindexCheckpoint(Identifiable, db.Model):
+  """Model holds a finished chunk of a full text reindex run.
+
+  Every row marks the inclusive ``[first_id, last_id]`` range of ``model_name``
+  objects that have already been indexed by the run referenced with
+  ``reindex_log_id``. An interrupted run is resumed by skipping these ranges.
+  """
+  __tablename__ = 'reindex_checkpoints'
+
+  reindex_log_id = db.Column(
+      db.Integer, db.ForeignKey('reindex_log.id'), nullable=False)
+  model_name = db.Column(db.String, nullable=False)
+  first_id = db.Column(db.Integer, nullable=False)
+  last_id = db.Column(db.Integer, nullable=False)
+  count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ReindexChange(db.Model):
+  """Model holds an object reindexed in the live tables during a swap run.
+
+  Recorded objects are reindexed into the shadow tables before they replace
+  the live tables, see ``ggrc.fulltext.shadow``.
+  """
+  __tablename__ = 'reindex_changes'
+
+  object_type = db.Column(db.String, primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
@@ -296,6 +296,11 @@ class CustomAttributable(object):
         .delete(synchronize_session='fetch')
 
     # 3) Delete the list of custom attribute values
+    from ggrc.query import my_objects
+    my_objects.invalidate_my_objects(db.session, [
+        value.attribute_object_id for value in attr_values
+        if value.custom_attribute.attribute_type == "Map:Person"
+    ])
     attr_value_ids = [value.id for value in attr_values]
     db.session.query(CustomAttributeValue)\
         .filter(CustomAttributeValue.id.in_(attr_value_ids))\
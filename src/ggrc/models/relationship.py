@@ -189,6 +189,16 @@ class RelationshipsCache(object):
 
   def populate_cache(self, stubs):
     """Fetch all mappings for objects in stubs, cache them in self.cache."""
+    # Imported here to avoid a circular import of models
+    from ggrc.cache import relationship_graph
+    graph = relationship_graph.get_graph()
+    if graph is not None:
+      for stub in stubs:
+        self.cache[stub].update(
+            Stub(type_, id_)
+            for type_, id_ in graph.get_neighbours(stub.type, stub.id)
+        )
+      return
     # Union is here to convince mysql to use two separate indices and
     # merge te results. Just using `or` results in a full-table scan
     # Manual column list avoids loading the full object which would also try to
@@ -213,6 +223,9 @@ class RelationshipsCache(object):
             )
         )
     ).all()
+    # Cache empty neighborhoods too, so that they are not queried again.
+    for stub in stubs:
+      self.cache.setdefault(stub, set())
     for (src_type, src_id, dst_type, dst_id) in relationships:
       src = Stub(src_type, src_id)
       dst = Stub(dst_type, dst_id)
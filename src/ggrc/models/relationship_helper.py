@@ -7,6 +7,7 @@ from sqlalchemy import and_
 from sqlalchemy import sql
 
 from ggrc import db
+from ggrc.cache import relationship_graph
 from ggrc.extensions import get_extension_modules
 from ggrc import models
 from ggrc.models import Audit
@@ -262,6 +263,61 @@ def _parent_object_mappings(object_type, related_type, related_ids):
   return query
 
 
+def _graph_assessment_object_mappings(graph, object_type, related_type,
+                                      related_ids):
+  """Get ids of _assessment_object_mappings from the relationship graph."""
+  if (object_type in Types.scoped | Types.trans_scope and
+          related_type in Types.all):
+    return graph.get_snapshot_related_ids(object_type, related_type,
+                                          related_ids)
+  return graph.get_snapshotted_ids(object_type, related_type, related_ids)
+
+
+def _graph_parent_object_mappings(graph, object_type, related_type,
+                                  related_ids):
+  """Get ids of _parent_object_mappings from the relationship graph."""
+  if object_type in Types.parents and related_type in Types.all:
+    return graph.get_parent_ids(object_type, related_type, related_ids)
+  return graph.get_child_ids(object_type, related_type, related_ids)
+
+
+def get_related_ids(object_type, related_type, related_ids):
+  """Get a set of ids of objects related to the given objects.
+
+  Same as get_ids_related_to, but relationships and snapshots are looked up
+  in the relationship graph of the worker when it can be used.
+  """
+  graph = relationship_graph.get_graph()
+  if isinstance(related_ids, (int, long)):
+    related_ids = [related_ids]
+  if graph is None or not related_ids:
+    return {id_ for id_, in get_ids_related_to(
+        object_type, related_type, related_ids)}
+
+  if (object_type in Types.scoped and related_type in Types.all or
+          related_type in Types.scoped and object_type in Types.all):
+    return _graph_assessment_object_mappings(
+        graph, object_type, related_type, related_ids)
+
+  if (object_type in Types.parents and related_type in Types.all or
+          related_type in Types.parents and object_type in Types.all):
+    return _graph_parent_object_mappings(
+        graph, object_type, related_type, related_ids)
+
+  result = graph.get_related_ids(object_type, related_type, related_ids)
+  queries = get_extension_mappings(object_type, related_type, related_ids)
+  queries.extend(get_special_mappings(
+      object_type, related_type, related_ids))
+  result.update(id_ for id_, in _array_union(queries))
+
+  if (object_type in Types.trans_scope and related_type in Types.all or
+          object_type in Types.all and related_type in Types.trans_scope):
+    result.update(_graph_assessment_object_mappings(
+        graph, object_type, related_type, related_ids))
+
+  return result
+
+
 def get_ids_related_to(object_type, related_type, related_ids=None):
   """ get ids of objects
 
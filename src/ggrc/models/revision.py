@@ -228,3 +228,66 @@ class Revision(Base, db.Model):
   def content(self, value):
     """ Setter for content property."""
     self._content = value
+
+
+class LatestRevision(db.Model):
+  """Id of the latest revision of every object.
+
+  Rows are upserted for revisions inserted by the session, see
+  ``ggrc.models.hooks.revision``, and refreshed with
+  ``refresh_latest_revisions`` after revisions are inserted in bulk.
+  """
+  __tablename__ = 'latest_revisions'
+
+  resource_type = db.Column(db.String, primary_key=True)
+  resource_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  revision_id = db.Column(
+      db.Integer,
+      db.ForeignKey('revisions.id', ondelete='CASCADE'),
+      nullable=False,
+  )
+
+
+_UPSERT_LATEST_REVISION = """
+    INSERT INTO latest_revisions (resource_type, resource_id, revision_id)
+    VALUES (:resource_type, :resource_id, :revision_id)
+    ON DUPLICATE KEY UPDATE
+        revision_id = GREATEST(revision_id, VALUES(revision_id))
+"""
+
+
+def store_latest_revisions(session, rows):
+  """Store revision ids that are newer than the stored latest revisions.
+
+  Args:
+    session: session or connection that executes the statement.
+    rows: list of dicts with resource_type, resource_id and revision_id.
+  """
+  if rows:
+    session.execute(_UPSERT_LATEST_REVISION, rows)
+
+
+def refresh_latest_revisions(resource_type, resource_ids):
+  """Store latest revisions of objects from the revisions table.
+
+  Used after revisions are inserted without the session, e.g. with
+  ``Revision.__table__.insert()``.
+  """
+  resource_ids = list(resource_ids)
+  for offset in range(0, len(resource_ids), 1000):
+    query = db.session.query(
+        Revision.resource_type,
+        Revision.resource_id,
+        db.func.max(Revision.id),
+    ).filter(
+        Revision.resource_type == resource_type,
+        Revision.resource_id.in_(resource_ids[offset:offset + 1000]),
+    ).group_by(
+        Revision.resource_type,
+        Revision.resource_id,
+    )
+    store_latest_revisions(db.session, [{
+        "resource_type": type_,
+        "resource_id": id_,
+        "revision_id": revision_id,
+    } for type_, id_, revision_id in query])
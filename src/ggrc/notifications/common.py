@@ -8,7 +8,9 @@
 """
 
 
+import multiprocessing
 from collections import defaultdict
+from collections import namedtuple
 from datetime import date
 from datetime import datetime
 from logging import getLogger
@@ -21,11 +23,15 @@ from google.appengine.api import mail
 
 from ggrc import db
 from ggrc import extensions
+from ggrc import models
 from ggrc import settings
 from ggrc.models import Person
 from ggrc.models import Notification
+from ggrc.notifications.local_mail import LocalMailTransport
 from ggrc.rbac import permissions
 from ggrc.utils import DATE_FORMAT_US, merge_dict
+from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 
 from ggrc_workflows.notification.data_handler import (
     cycle_tasks_cache, deleted_task_rels_cache, get_cycle_task_data
@@ -35,6 +41,8 @@ from ggrc_workflows.notification.data_handler import (
 # pylint: disable=invalid-name
 logger = getLogger(__name__)
 
+Email = namedtuple("Email", ["recipient", "subject", "body"])
+
 
 class Services(object):
   """Helper class for notification services.
@@ -91,36 +99,78 @@ class Services(object):
     return service(notif)
 
 
-def get_filter_data(
-    notification, people_cache, tasks_cache=None, del_rels_cache=None
-):
-  """Get filtered notification data.
+def _preload_objects(notifications):
+  """Load objects of all notifications with a single query per object type.
+
+  Data handlers get notification objects by their ids, and those lookups are
+  served from the session identity map for objects loaded here.
+
+  Args:
+    notifications (list of Notification): notifications for which we want to
+      load the objects.
+
+  Returns:
+    list: loaded objects. The identity map only holds weak references, so the
+      list must be kept while the notification data is generated.
+  """
+  ids_by_type = defaultdict(set)
+  for notification in notifications:
+    ids_by_type[notification.object_type].add(notification.object_id)
+
+  objects = []
+  for object_type, ids in ids_by_type.iteritems():
+    model = models.get_model(object_type)
+    if model is None:
+      continue
+    for ids_chunk in list_chunks(list(ids)):
+      objects.extend(model.query.filter(model.id.in_(ids_chunk)))
+  return objects
+
+
+def _preload_people(data_list, people_cache):
+  """Load all notification recipients with their notification settings.
+
+  Args:
+    data_list (list): notification and data handler result pairs.
+    people_cache (dict): people accessible by their ids. Loaded people are
+      added to it.
+  """
+  person_ids = {user_data["user"]["id"]
+                for _, data in data_list
+                for user_data in data.itervalues()}
+  person_ids = [person_id for person_id in person_ids
+                if person_id != -1 and person_id not in people_cache]
+  for ids_chunk in list_chunks(person_ids):
+    people = db.session.query(Person).options(
+        joinedload('user_roles').joinedload('role'),
+        joinedload('notification_configs')
+    ).filter(Person.id.in_(ids_chunk))
+    people_cache.update((person.id, person) for person in people)
+
+
+def group_by_recipient(data_list, people_cache):
+  """Combine notification data for users who should receive it.
 
-  This function gets notification data for all users who should receive it. A
-  single notification can be for multiple users (such as all assignees) but
+  A single notification can be for multiple users (such as all assignees) but
   only some should receive it depending on if it's an instant notification or
   a daily digest and the specific users notification settings.
 
+  Data of a notification is merged only into the data of its own recipients,
+  so the cost does not grow with the size of the already aggregated data.
+
   Args:
-    notification (Notification): Notification object for which we want to get
-      data.
-    tasks_cache (dict): prefetched CycleTaskGroupObjectTask instances
-      accessible by their ID as a key
-    del_rels_cache (dict): prefetched Revision instances representing the
-      relationships to Tasks that were deleted grouped by task ID as a key
+    data_list (list): notification and data handler result pairs.
+    people_cache (dict): preloaded people accessible by their ids.
 
   Returns:
-    dict: dictionary containing notification data for all users who should
-      receive it, according to their notification settings.
+    dict: notification data of all notifications grouped by recipients.
   """
-  result = {}
-  data = Services.call_service(
-      notification, tasks_cache=tasks_cache, del_rels_cache=del_rels_cache)
-
-  for user, user_data in data.iteritems():
-    if should_receive(notification, user_data, people_cache):
-      result[user] = user_data
-  return result
+  result = defaultdict(dict)
+  for notification, data in data_list:
+    for user, user_data in data.iteritems():
+      if should_receive(notification, user_data, people_cache):
+        merge_dict(result[user], user_data)
+  return dict(result)
 
 
 def get_notification_data(notifications):
@@ -139,17 +189,27 @@ def get_notification_data(notifications):
   """
   if not notifications:
     return {}
-  aggregate_data = {}
   people_cache = {}
 
-  tasks_cache = cycle_tasks_cache(notifications)
-  deleted_rels_cache = deleted_task_rels_cache(tasks_cache.keys())
+  with benchmark("Preload notification objects"):
+    tasks_cache = cycle_tasks_cache(notifications)
+    deleted_rels_cache = deleted_task_rels_cache(tasks_cache.keys())
+    objects = _preload_objects(notifications)
 
-  for notification in notifications:
-    filtered_data = get_filter_data(
-        notification, people_cache, tasks_cache=tasks_cache,
-        del_rels_cache=deleted_rels_cache)
-    aggregate_data = merge_dict(aggregate_data, filtered_data)
+  with benchmark("Get notification data"):
+    data_list = [
+        (notification, Services.call_service(
+            notification, tasks_cache=tasks_cache,
+            del_rels_cache=deleted_rels_cache))
+        for notification in notifications
+    ]
+  del objects
+
+  with benchmark("Preload notification recipients"):
+    _preload_people(data_list, people_cache)
+
+  with benchmark("Group notification data by recipients"):
+    aggregate_data = group_by_recipient(data_list, people_cache)
 
   # Remove notifications for objects without a contact (such as task groups)
   aggregate_data.pop("", None)
@@ -285,15 +345,84 @@ def send_daily_digest_notifications():
   """
   # pylint: disable=invalid-name
   notif_list, notif_data = get_daily_notifications()
-  sent_emails = []
   subject = "GGRC daily digest for {}".format(date.today().strftime("%b %d"))
-  for user_email, data in notif_data.iteritems():
-    data = modify_data(data)
-    email_body = settings.EMAIL_DIGEST.render(digest=data)
-    send_email(user_email, subject, email_body)
-    sent_emails.append(user_email)
+  with benchmark("Render daily digest emails"):
+    emails = render_digest_emails(notif_data, subject)
+  with benchmark("Send daily digest emails"):
+    send_emails(emails)
   set_notification_sent_time(notif_list)
-  return "emails sent to: <br> {}".format("<br>".join(sent_emails))
+  return "emails sent to: <br> {}".format(
+      "<br>".join(email.recipient for email in emails))
+
+
+def _render_digest(data):
+  """Render the digest email body for notification data of a single user."""
+  return settings.EMAIL_DIGEST.render(digest=data)
+
+
+def render_digest_emails(notif_data, subject):
+  """Render digest emails for all recipients.
+
+  Emails are rendered by a pool of NOTIFICATION_RENDER_WORKERS worker
+  processes, or in the current process if the setting is 1.
+
+  Args:
+    notif_data (dict): notification data grouped by recipients.
+    subject (str): subject of all digest emails.
+
+  Returns:
+    list of Email: rendered emails.
+  """
+  recipients = notif_data.keys()
+  digests = [modify_data(notif_data[recipient]) for recipient in recipients]
+  workers = min(getattr(settings, "NOTIFICATION_RENDER_WORKERS", 1),
+                len(digests))
+  if workers > 1:
+    pool = multiprocessing.Pool(workers)
+    try:
+      bodies = pool.map(_render_digest, digests)
+      pool.close()
+    except Exception:
+      pool.terminate()
+      raise
+    finally:
+      pool.join()
+  else:
+    bodies = [_render_digest(digest) for digest in digests]
+  return [Email(recipient, subject, body)
+          for recipient, body in zip(recipients, bodies)]
+
+
+class AppEngineMailTransport(object):
+  """Mail transport sending emails with the AppEngine mail API.
+
+  The API has no batch call, so every email of a batch is sent on its own.
+  """
+  # pylint: disable=too-few-public-methods
+
+  @staticmethod
+  def send_batch(emails):
+    for email in emails:
+      send_email(email.recipient, email.subject, email.body)
+
+
+def get_mail_transport():
+  """Get the mail transport selected by MAIL_TRANSPORT setting."""
+  if getattr(settings, "MAIL_TRANSPORT", "appengine") == "local":
+    return LocalMailTransport()
+  return AppEngineMailTransport()
+
+
+def send_emails(emails):
+  """Send emails in batches of MAIL_BATCH_SIZE with the mail transport.
+
+  Args:
+    emails (list of Email): emails that should be sent.
+  """
+  transport = get_mail_transport()
+  batch_size = getattr(settings, "MAIL_BATCH_SIZE", 100)
+  for emails_batch in list_chunks(emails, batch_size):
+    transport.send_batch(emails_batch)
 
 
 def set_notification_sent_time(notif_list):
@@ -0,0 +1,25 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""In-process stand-in for the AppEngine mail transport.
+
+LocalMailTransport keeps sent emails in an outbox shared by all transports of
+the process instead of sending them. It is used when ``MAIL_TRANSPORT``
+setting is "local", e.g. in tests and development environments without the
+AppEngine SDK.
+"""
+
+
+class LocalMailTransport(object):
+  """Mail transport storing emails in memory."""
+
+  outbox = []
+
+  def send_batch(self, emails):
+    """Store a batch of emails in the outbox."""
+    self.outbox.extend(emails)
+
+  @classmethod
+  def clear(cls):
+    """Remove all stored emails."""
+    del cls.outbox[:]
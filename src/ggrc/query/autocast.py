@@ -11,6 +11,7 @@ from ggrc.models.reflection import AttributeInfo
 from ggrc.fulltext.mixin import Indexed
 from ggrc.fulltext.attributes import FullTextAttr, DatetimeValue, DateValue
 from ggrc.query.exceptions import BadQueryException
+from ggrc.query import plan_cache
 
 
 EXP_TMPL = {'is_autocasted': True}
@@ -64,8 +65,16 @@ def get_fulltext_parsed_value(klass, key):
       return attr
 
 
-def get_parsers(klass, key):
-  """Return tuple of 2 parsers related to current key and class"""
+# Parsers that depend only on the model schema are shared by all requests.
+SCHEMA_PARSERS = plan_cache.QueryPlanCache("Autocast parsers", max_size=1000)
+
+
+def get_schema_parsers(klass, key):
+  """Get parsers for a fulltext attribute or a column of the class.
+
+  Returns:
+    tuple of 2 parsers or None if the key is not a part of the class schema.
+  """
   fulltext_parser = get_fulltext_parsed_value(klass, key)
   if fulltext_parser:
     if isinstance(fulltext_parser, DatetimeValue):
@@ -73,9 +82,22 @@ def get_parsers(klass, key):
     else:
       return (None, fulltext_parser)
   columns = {i.name: i.type for i in klass.__table__.columns}
-  if key in columns:
-    attr_type = columns[key]
-  else:
+  if key not in columns:
+    return None
+  attr_type = columns[key]
+  if isinstance(attr_type, sa.sql.sqltypes.DateTime):
+    return (DatetimeValue(), None)
+  elif isinstance(attr_type, sa.sql.sqltypes.Date):
+    return (DateValue(), None)
+  return (None, FullTextAttr(key, key))
+
+
+def get_parsers(klass, key):
+  """Return tuple of 2 parsers related to current key and class"""
+  parsers = SCHEMA_PARSERS.get((klass.__name__, key),
+                               lambda: get_schema_parsers(klass, key))
+  if parsers is None:
+    # Custom attribute definitions can change between requests.
     value_types = [i[0] for i in db.session.query(
         CustomAttributeDefinition.attribute_type
     ).filter(
@@ -85,13 +107,9 @@ def get_parsers(klass, key):
     ).distinct()]
     is_date = CustomAttributeDefinition.ValidTypes.DATE in value_types
     is_any_value = len(value_types) > int(is_date)
-    return (DateValue() if is_date else None,
-            FullTextAttr(key, key) if is_any_value else None)
-  if isinstance(attr_type, sa.sql.sqltypes.DateTime):
-    return (DatetimeValue(), None)
-  elif isinstance(attr_type, sa.sql.sqltypes.Date):
-    return (DateValue(), None)
-  return (None, FullTextAttr(key, key))
+    parsers = (DateValue() if is_date else None,
+               FullTextAttr(key, key) if is_any_value else None)
+  return parsers
 
 
 def autocast(exp, target_class):
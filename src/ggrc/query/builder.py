@@ -7,22 +7,76 @@ This class is used to build SqlAlchemy queries and fetch the result ids.
 """
 
 # flake8: noqa
+import base64
 import collections
 import datetime
+import json
 
 import sqlalchemy as sa
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.models import inflector
 from ggrc.rbac import context_query_filter
 from ggrc.utils import benchmark
 from ggrc.rbac import permissions
+from ggrc.query import autocast
 from ggrc.query import custom_operators
+from ggrc.query import plan_cache
 from ggrc.query.exceptions import BadQueryException
 
 
+TOTAL_EXACT = "exact"
+TOTAL_APPROXIMATE = "approximate"
+TOTAL_SKIP = "skip"
+TOTAL_MODES = (TOTAL_EXACT, TOTAL_APPROXIMATE, TOTAL_SKIP)
+
+
+def _encode_cursor(values):
+  """Encode sort key values of the last row of a page into a cursor."""
+  return base64.urlsafe_b64encode(json.dumps(values, default=unicode))
+
+
+def _decode_cursor(cursor, length):
+  """Decode a cursor into a list of sort key values."""
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+  except (TypeError, ValueError, UnicodeError, AttributeError):
+    raise BadQueryException("Invalid cursor.")
+  if not isinstance(values, list) or len(values) != length:
+    raise BadQueryException("Cursor does not match the query order.")
+  return values
+
+
+def _follows(column, desc, value):
+  """Get a filter for column values sorted after the given value.
+
+  MySQL sorts NULL values before all other values in ascending order.
+  """
+  if value is None:
+    return sa.false() if desc else column.isnot(None)
+  if desc:
+    return sa.or_(column < value, column.is_(None))
+  return column > value
+
+
+def _keyset_filter(sort_keys, values):
+  """Get a filter for rows sorted after the row with the given values.
+
+  Args:
+    sort_keys: list of (column, desc) tuples the query is ordered by.
+    values: values of the sort key columns of the last row of a page.
+  """
+  clauses = []
+  equal = []
+  for (column, desc), value in zip(sort_keys, values):
+    clauses.append(sa.and_(*(equal + [_follows(column, desc, value)])))
+    equal.append(column.is_(None) if value is None else column == value)
+  return sa.or_(*clauses)
+
+
 # pylint: disable=too-few-public-methods
 
 class QueryHelper(object):
@@ -44,6 +98,12 @@ class QueryHelper(object):
         }
       ]
       limit: [from, to] - limit the result list to a slice result[from, to]
+      cursor: optional; enables keyset pagination, only the page size of
+              limit is used. null for the first page, otherwise
+              next_cursor of the previous page.
+      total_mode: optional; "exact" (default), "approximate" to count at
+                  most QUERY_API_APPROXIMATE_TOTAL rows or "skip" to not
+                  count the total at all.
       filters: {
         relevant_filters:
           these filters will return all ids of the "search class name" object
@@ -73,6 +133,8 @@ class QueryHelper(object):
       object_name: search class name,
       (all other object query fields)
       ids: [ list of filtered objects ids ]
+      next_cursor: cursor of the next page or null on the last page,
+                   present only for keyset pagination
     }
   ]
 
@@ -82,8 +144,17 @@ class QueryHelper(object):
   """
 
   def __init__(self, query):
+    self._slug_ids = plan_cache.QueryPlanCache("Query slugs")
+    self._expressions = plan_cache.QueryPlanCache("Query expressions")
     self.query = self._clean_query(query)
     self._count = 0
+    self._context_resources = None
+
+  def log_cache_stats(self):
+    """Log hit and miss counters of the caches used by this query."""
+    self._slug_ids.log_stats()
+    self._expressions.log_stats()
+    autocast.SCHEMA_PARSERS.log_stats()
 
   def _get_snapshot_child_type(self, object_query):
     """Return child_type for snapshot from a query"""
@@ -210,12 +281,43 @@ class QueryHelper(object):
       object_query["ids"] = ids
     return self.query
 
+  def _get_context_resource(self, model_name, permission_type):
+    """Get allowed contexts and resources for a model of the query.
+
+    Contexts and resources of all object queries are fetched together on the
+    first call, once for each distinct model and permission type.
+    """
+    if self._context_resources is None:
+      names_by_permission = collections.defaultdict(set)
+      for object_query in self.query:
+        names_by_permission[object_query.get("permissions", "read")].add(
+            object_query["object_name"])
+      self._context_resources = {}
+      for permission, model_names in names_by_permission.iteritems():
+        context_resources = permissions.get_context_resources(
+            model_names, permission_type=permission)
+        self._context_resources.update(
+            ((name, permission), value)
+            for name, value in context_resources.iteritems()
+        )
+    key = (model_name, permission_type)
+    if key not in self._context_resources:
+      self._context_resources[key] = permissions.get_context_resource(
+          model_name=model_name, permission_type=permission_type)
+    return self._context_resources[key]
+
   @staticmethod
-  def _get_type_query(model, permission_type):
+  def _get_type_query(model, permission_type, context_resource=None):
     """Filter by contexts and resources
 
     Prepare query to filter models based on the available contexts and
     resources for the given type of object.
+
+    Args:
+      model: model class that is filtered.
+      permission_type: "read" or "update".
+      context_resource: optional precomputed tuple of allowed contexts and
+        resources for the model.
     """
     if permission_type == "read" and permissions.has_system_wide_read():
       return None
@@ -223,9 +325,11 @@ class QueryHelper(object):
     if permission_type == "update" and permissions.has_system_wide_update():
       return None
 
-    contexts, resources = permissions.get_context_resource(
-        model_name=model.__name__, permission_type=permission_type
-    )
+    if context_resource is None:
+      context_resource = permissions.get_context_resource(
+          model_name=model.__name__, permission_type=permission_type
+      )
+    contexts, resources = context_resource
     if contexts is not None:
       return sa.or_(context_query_filter(model.context_id, contexts),
                     model.id.in_(resources) if resources else sa.sql.false())
@@ -270,21 +374,32 @@ class QueryHelper(object):
 
     requested_permissions = object_query.get("permissions", "read")
     with benchmark("Get permissions: _get_ids > _get_type_query"):
-      type_query = self._get_type_query(object_class, requested_permissions)
+      type_query = self._get_type_query(
+          object_class,
+          requested_permissions,
+          self._get_context_resource(object_name, requested_permissions),
+      )
       if type_query is not None:
         query = query.filter(type_query)
     with benchmark("Parse filter query: _get_ids > _build_expression"):
-      filter_expression = custom_operators.build_expression(
-          expression,
-          object_class,
-          tgt_class,
-          self.query
+      # The key must be computed before the build, autocast alters expression
+      key = plan_cache.expression_key(object_name, tgt_class.__name__,
+                                      expression)
+      filter_expression = self._expressions.get(
+          key,
+          lambda: custom_operators.build_expression(
+              expression,
+              object_class,
+              tgt_class,
+              self.query
+          ),
       )
       if filter_expression is not None:
         query = query.filter(filter_expression)
+    sort_keys = []
     if object_query.get("order_by"):
       with benchmark("Sorting: _get_ids > order_by"):
-        query = self._apply_order_by(
+        query, sort_keys = self._apply_order_by(
             object_class,
             query,
             object_query["order_by"],
@@ -292,8 +407,21 @@ class QueryHelper(object):
         )
     with benchmark("Apply limit"):
       limit = object_query.get("limit")
-      if limit:
-        ids, total = self._apply_limit(query, limit)
+      total_mode = object_query.get("total_mode", TOTAL_EXACT)
+      if total_mode not in TOTAL_MODES:
+        raise BadQueryException(u"Invalid total mode: {}".format(total_mode))
+      if "cursor" in object_query:
+        ids, total, next_cursor = self._apply_keyset_limit(
+            query,
+            object_class,
+            sort_keys,
+            limit,
+            object_query["cursor"],
+            total_mode,
+        )
+        object_query["next_cursor"] = next_cursor
+      elif limit:
+        ids, total = self._apply_limit(query, limit, total_mode)
       else:
         ids = [obj.id for obj in query]
         total = len(ids)
@@ -317,13 +445,38 @@ class QueryHelper(object):
       page_size = last - first
     return page_size, first
 
-  def _apply_limit(self, query, limit):
+  @staticmethod
+  def _get_total(query, total_mode):
+    """Count all objects matched by the query.
+
+    Args:
+      query: filter query;
+      total_mode: one of TOTAL_MODES.
+
+    Returns:
+      total count, at most QUERY_API_APPROXIMATE_TOTAL for the approximate
+      mode or None if counting is skipped.
+    """
+    if total_mode == TOTAL_SKIP:
+      return None
+    if total_mode == TOTAL_APPROXIMATE:
+      capped_q = query.order_by(None).limit(
+          settings.QUERY_API_APPROXIMATE_TOTAL).subquery()
+      count_q = sa.select([sa.func.count()]).select_from(capped_q)
+    else:
+      # Note: using func.count() as query.count() is generating additional
+      # subquery
+      count_q = query.statement.with_only_columns([sa.func.count()])
+    return db.session.execute(count_q).scalar()
+
+  def _apply_limit(self, query, limit, total_mode=TOTAL_EXACT):
     """Apply limits for pagination.
 
     Args:
       query: filter query;
       limit: a tuple of indexes in format (from, to); objects is sliced to
-            objects[from, to].
+            objects[from, to];
+      total_mode: one of TOTAL_MODES.
 
     Returns:
       matched objects ids and total count.
@@ -338,13 +491,59 @@ class QueryHelper(object):
       if len(ids) < page_size:
         total = len(ids) + first
       else:
-        # Note: using func.count() as query.count() is generating additional
-        # subquery
-        count_q = query.statement.with_only_columns([sa.func.count()])
-        total = db.session.execute(count_q).scalar()
+        total = self._get_total(query, total_mode)
 
     return ids, total
 
+  def _apply_keyset_limit(self, query, model, sort_keys, limit, cursor,
+                          total_mode=TOTAL_EXACT):
+    """Apply keyset pagination.
+
+    Instead of skipping rows with an offset, the page starts after the sort
+    key values of the last row of the previous page, so the cost of a page
+    does not depend on its depth. Object id is used as the last sort key to
+    make the order unique.
+
+    Args:
+      query: filter query;
+      model: the model instances of which are requested in query;
+      sort_keys: list of (column, desc) tuples the query is ordered by;
+      limit: a tuple of indexes in format (from, to), only the page size is
+            used;
+      cursor: next_cursor of the previous page or None for the first page;
+      total_mode: one of TOTAL_MODES.
+
+    Returns:
+      matched objects ids, total count and cursor of the next page or None if
+      this is the last page.
+    """
+    if not limit:
+      raise BadQueryException("Limit is required for cursor pagination.")
+    page_size, _ = self._get_limit(limit)
+    sort_keys = sort_keys + [(model.id, False)]
+    page_query = query.add_columns(
+        *[column for column, _ in sort_keys]
+    ).order_by(model.id)
+    if cursor is not None:
+      values = _decode_cursor(cursor, len(sort_keys))
+      page_query = page_query.filter(_keyset_filter(sort_keys, values))
+
+    with benchmark("Apply limit: _apply_keyset_limit > query_limit"):
+      # one more row tells if there is a next page
+      rows = page_query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+      rows = rows[:page_size]
+      next_cursor = _encode_cursor(list(rows[-1][1:]))
+    ids = [row[0] for row in rows]
+    with benchmark("Apply limit: _apply_keyset_limit > query_count"):
+      if cursor is None and next_cursor is None:
+        total = len(ids)
+      else:
+        total = self._get_total(query, total_mode)
+
+    return ids, total, next_cursor
+
   def _apply_order_by(self, model, query, order_by, tgt_class):
     """Add ordering parameters to a query for objects.
 
@@ -366,7 +565,8 @@ class QueryHelper(object):
     3. Otherwise, raise a NotImplementedError.
 
     Returns:
-      the query with sorting parameters.
+      the query with sorting parameters and a list of (column, desc) tuples
+      the query is ordered by.
     """
     def joins_and_order(clause):
       """Get join operations and ordering field from item of order_by list.
@@ -376,10 +576,11 @@ class QueryHelper(object):
                  "desc": reverse sort on this field if True}
 
       Returns:
-        ([joins], order) - a tuple of joins required for this ordering to work
-                           and ordering clause itself; join is None if no join
-                           required or [(aliased entity, relationship field)]
-                           if joins required.
+        ([joins], order, desc) - a tuple of joins required for this ordering
+                                 to work, ordering field itself and the
+                                 reverse sort flag; join is None if no join
+                                 required or [(aliased entity, relationship
+                                 field)] if joins required.
       """
       def by_fulltext():
         """Join fulltext index table, order by indexed CA value."""
@@ -423,25 +624,28 @@ class QueryHelper(object):
         self._count += 1
         joins, order = by_fulltext()
 
-      if clause.get("desc", False):
-        order = order.desc()
+      return joins, order, clause.get("desc", False)
 
-      return joins, order
-
-    join_lists, orders = zip(*[joins_and_order(clause) for clause in order_by])
+    join_lists, orders, descs = zip(*[joins_and_order(clause)
+                                      for clause in order_by])
     for join_list in join_lists:
       if join_list is not None:
         for join in join_list:
           query = query.outerjoin(*join)
 
-    return query.order_by(*orders)
+    sort_keys = zip(orders, descs)
+    return query.order_by(*[order.desc() if desc else order
+                            for order, desc in sort_keys]), sort_keys
 
-  @staticmethod
-  def _slugs_to_ids(object_name, slugs):
+  def _slugs_to_ids(self, object_name, slugs):
     """Convert SLUG to proper ids for the given objec."""
     object_class = inflector.get_model(object_name)
     if not object_class:
       return []
-    ids = [c.id for c in object_class.query.filter(
-        object_class.slug.in_(slugs)).all()]
-    return ids
+
+    def query_ids():
+      return [c.id for c in object_class.query.filter(
+          object_class.slug.in_(slugs)).all()]
+
+    key = (object_name, tuple(sorted(slugs)))
+    return list(self._slug_ids.get(key, query_ids))
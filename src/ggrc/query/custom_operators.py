@@ -14,6 +14,8 @@ from sqlalchemy.orm import load_only
 from ggrc import db
 from ggrc import models
 from ggrc.access_control.list import AccessControlList
+from ggrc.cache import relationship_graph
+from ggrc.fulltext import get_indexer
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.login import is_creator
 from ggrc.models import inflector
@@ -235,10 +237,7 @@ def text_search(exp, object_class, target_class, query):
     has an indexed property that contains `text`.
   """
   return object_class.id.in_(
-      db.session.query(Record.key).filter(
-          Record.type == object_class.__name__,
-          Record.content.ilike(u"%{}%".format(exp['text'])),
-      ),
+      get_indexer().get_text_search_query(object_class.__name__, exp['text'])
   )
 
 
@@ -289,13 +288,21 @@ def relevant(exp, object_class, target_class, query):
   result = set()
 
   if check_direct:
-    result.update(*relationship_helper.get_ids_related_to(
+    result.update(relationship_helper.get_related_ids(
         object_class.__name__,
         object_name,
         ids,
     ))
 
-  if check_snapshots:
+  graph = relationship_graph.get_graph() if check_snapshots else None
+  if graph is not None:
+    result.update(graph.get_snapshot_related_ids(
+        object_class.__name__,
+        object_name,
+        ids,
+        parent_type=models.Audit.__name__,
+    ))
+  elif check_snapshots:
     snapshot_qs = models.Snapshot.query.filter(
         models.Snapshot.parent_type == models.Audit.__name__,
         models.Snapshot.child_type == object_name,
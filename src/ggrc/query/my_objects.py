@@ -1,7 +1,20 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
-"""This module helper query builder for my dashboard page."""
+"""This module helper query builder for my dashboard page.
+
+Objects of a person are precomputed in ``my_objects`` table. Rows of a person
+are rebuilt on the first lookup after they were invalidated by a change of
+ACL, mappings, custom attribute values, relationships, contacts, user roles or
+cycle tasks, see ``ggrc.models.hooks.my_objects``. People with up to date
+rows are listed in ``my_objects_people`` table. Rows are rebuilt in a
+separate transaction, the session of the request is never committed by a
+lookup.
+
+Objects that do not depend on the person (all people, backlog workflows) and
+objects visible to auditors through relationships of audited objects are
+queried directly on every lookup.
+"""
 import sqlalchemy as sa
 from sqlalchemy import and_
 from sqlalchemy import literal
@@ -16,11 +29,56 @@ from ggrc.models.object_person import ObjectPerson
 from ggrc.models.relationship import Relationship
 from ggrc.models.custom_attribute_value import CustomAttributeValue
 from ggrc.query import utils as query_utils
+from ggrc.utils import list_chunks
 from ggrc_basic_permissions import backlog_workflows
 from ggrc_basic_permissions.models import UserRole, Role
 from ggrc_workflows.models import Cycle
 
 
+# Number of people whose rows are rebuilt in a single transaction
+REBUILD_CHUNK_SIZE = 100
+
+# Session info key set while the session has flushed changes that are not
+# committed yet, see ggrc.models.hooks.my_objects
+SESSION_WRITES_KEY = "my_objects_writes"
+
+
+# pylint: disable=too-few-public-methods
+class MyObject(db.Model):
+  """Object that appears on "My Work" page of a person.
+
+  Objects the person is mapped to with object_people are marked with
+  via_mapping as they are not shown to creators.
+  """
+  __tablename__ = "my_objects"
+
+  person_id = db.Column(
+      db.Integer,
+      db.ForeignKey("people.id", ondelete="CASCADE"),
+      primary_key=True,
+      autoincrement=False,
+  )
+  object_type = db.Column(db.String(250), primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  via_mapping = db.Column(db.Boolean, primary_key=True)
+
+  __table_args__ = (
+      db.Index("ix_my_objects_object", "object_type", "object_id"),
+  )
+
+
+class MyObjectsPerson(db.Model):
+  """Person whose rows in my_objects table are up to date."""
+  __tablename__ = "my_objects_people"
+
+  person_id = db.Column(
+      db.Integer,
+      db.ForeignKey("people.id", ondelete="CASCADE"),
+      primary_key=True,
+      autoincrement=False,
+  )
+
+
 def _types_to_type_models(types):
   """Convert string types to real objects."""
   if types is None:
@@ -28,257 +86,403 @@ def _types_to_type_models(types):
   return [m for m in all_models.all_models if m.__name__ in types]
 
 
-def get_myobjects_query(types=None, contact_id=None, is_creator=False):  # noqa
-  """Filters by "myview" for a given person.
+def _get_people():
+  """Get all the people w/o any restrictions."""
+  all_people = db.session.query(
+      all_models.Person.id.label('id'),
+      literal(all_models.Person.__name__).label('type'),
+      literal(None).label('context_id')
+  )
+  return all_people
 
-  Finds all objects which might appear on a user's Profile or Dashboard
-  pages.
 
-  This method only *limits* the result set -- Contexts and Roles will still
-  filter out forbidden objects.
+def _get_object_people(contact_id):
+  """Objects to which the user is 'mapped'."""
+  object_people_query = db.session.query(
+      ObjectPerson.personable_id.label('id'),
+      ObjectPerson.personable_type.label('type'),
+      literal(None).label('context_id')
+  ).filter(
+      ObjectPerson.person_id == contact_id,
+  )
+  return object_people_query
+
+
+def _get_object_mapped_ca(contact_id):
+  """Objects to which the user is mapped via a custom attribute."""
+  ca_mapped_objects_query = db.session.query(
+      CustomAttributeValue.attributable_id.label('id'),
+      CustomAttributeValue.attributable_type.label('type'),
+      literal(None).label('context_id')
+  ).filter(
+      and_(
+          CustomAttributeValue.attribute_value == "Person",
+          CustomAttributeValue.attribute_object_id == contact_id,
+      )
+  )
+  return ca_mapped_objects_query
+
+
+def _get_objects_user_assigned(contact_id):
+  """Objects for which the user is assigned."""
+  dst_assignee_query = db.session.query(
+      Relationship.destination_id.label('id'),
+      Relationship.destination_type.label('type'),
+      literal(None).label('context_id'),
+  ).filter(
+      and_(
+          Relationship.source_type == "Person",
+          Relationship.source_id == contact_id,
+      ),
+  )
+  src_assignee_query = db.session.query(
+      Relationship.source_id.label('id'),
+      Relationship.source_type.label('type'),
+      literal(None).label('context_id'),
+  ).filter(
+      and_(
+          Relationship.destination_type == "Person",
+          Relationship.destination_id == contact_id,
+      ),
+  )
+  return dst_assignee_query.union(src_assignee_query)
+
+
+def _get_results_by_context(model, contact_id):
+  """Objects based on the context of the current model.
+
+  Return the objects that are in private contexts via UserRole.
   """
-  type_models = _types_to_type_models(types)
-  model_names = [model.__name__ for model in type_models]
-  type_union_queries = []
-
-  def _get_people():
-    """Get all the people w/o any restrictions."""
-    all_people = db.session.query(
-        all_models.Person.id.label('id'),
-        literal(all_models.Person.__name__).label('type'),
-        literal(None).label('context_id')
-    )
-    return all_people
-
-  def _get_object_people():
-    """Objects to which the user is 'mapped'."""
-    object_people_query = db.session.query(
-        ObjectPerson.personable_id.label('id'),
-        ObjectPerson.personable_type.label('type'),
-        literal(None).label('context_id')
-    ).filter(
-        and_(
-            ObjectPerson.person_id == contact_id,
-            ObjectPerson.personable_type.in_(model_names)
-        )
-    )
-    return object_people_query
-
-  def _get_object_mapped_ca():
-    """Objects to which the user is mapped via a custom attribute."""
-    ca_mapped_objects_query = db.session.query(
-        CustomAttributeValue.attributable_id.label('id'),
-        CustomAttributeValue.attributable_type.label('type'),
-        literal(None).label('context_id')
-    ).filter(
-        and_(
-            CustomAttributeValue.attribute_value == "Person",
-            CustomAttributeValue.attribute_object_id == contact_id,
-            CustomAttributeValue.attributable_type.in_(model_names)
-        )
-    )
-    return ca_mapped_objects_query
-
-  def _get_objects_user_assigned():
-    """Objects for which the user is assigned."""
-    dst_assignee_query = db.session.query(
-        Relationship.destination_id.label('id'),
-        Relationship.destination_type.label('type'),
-        literal(None).label('context_id'),
-    ).filter(
-        and_(
-            Relationship.source_type == "Person",
-            Relationship.source_id == contact_id,
-            Relationship.destination_type.in_(model_names)
-        ),
-    )
-    src_assignee_query = db.session.query(
-        Relationship.source_id.label('id'),
-        Relationship.source_type.label('type'),
-        literal(None).label('context_id'),
-    ).filter(
-        and_(
-            Relationship.destination_type == "Person",
-            Relationship.destination_id == contact_id,
-            Relationship.source_type.in_(model_names)
-        ),
-    )
-    return dst_assignee_query.union(src_assignee_query)
-
-  def _get_results_by_context(model):
-    """Objects based on the context of the current model.
-
-    Return the objects that are in private contexts via UserRole.
-    """
-    context_query = db.session.query(
-        model.id.label('id'),
-        literal(model.__name__).label('type'),
-        literal(None).label('context_id'),
-    ).join(
-        UserRole,
-        and_(
-            UserRole.context_id == model.context_id,
-            UserRole.person_id == contact_id,
-        )
-    )
-    return context_query
-
-  def _get_assigned_to_records(model):
-    """Get query by models contacts fields.
-
-    Objects for which the user is the 'contact' or 'secondary contact'.
-    """
-    model_type_queries = []
-    for attr in ('contact_id', 'secondary_contact_id'):
-      if hasattr(model, attr):
-        model_type_queries.append(getattr(model, attr) == contact_id)
-    return model_type_queries
-
-  def _get_tasks_in_cycle(model):
-    """Filter tasks with particular statuses and cycle.
-
-    Filtering tasks with statuses "Assigned", "InProgress" and "Finished".
-    Where the task is in current users cycle.
-    """
-    task_query = db.session.query(
-        model.id.label('id'),
-        literal(model.__name__).label('type'),
-        literal(None).label('context_id'),
-    ).join(
-        Cycle,
-        Cycle.id == model.cycle_id
-    ).join(
-        all_models.AccessControlList,
-        sa.and_(
-            all_models.AccessControlList.object_type ==
-            "CycleTaskGroupObjectTask",
-            all_models.AccessControlList.object_id ==
-            all_models.CycleTaskGroupObjectTask.id,
-            all_models.AccessControlList.person_id == contact_id,
-        ),
-    ).join(
-        all_models.AccessControlRole,
-        sa.and_(
-            all_models.AccessControlRole.id ==
-            all_models.AccessControlList.ac_role_id,
-            all_models.AccessControlRole.object_type ==
-            "CycleTaskGroupObjectTask",
-            all_models.AccessControlRole.name == "Task Assignees",
-        )
-    ).filter(
-        Cycle.is_current == true(),
-    )
-    return task_query.filter(
-        Cycle.is_verification_needed == true(),
-        model.status.in_([
-            all_models.CycleTaskGroupObjectTask.ASSIGNED,
-            all_models.CycleTaskGroupObjectTask.IN_PROGRESS,
-            all_models.CycleTaskGroupObjectTask.FINISHED,
-            all_models.CycleTaskGroupObjectTask.DECLINED,
-            all_models.CycleTaskGroupObjectTask.DEPRECATED,
-        ])
-    ).union_all(
-        task_query.filter(
-            Cycle.is_verification_needed == false(),
-            model.status.in_([
-                all_models.CycleTaskGroupObjectTask.ASSIGNED,
-                all_models.CycleTaskGroupObjectTask.IN_PROGRESS,
-                all_models.CycleTaskGroupObjectTask.DEPRECATED,
-            ])
-        )
-    )
+  context_query = db.session.query(
+      model.id.label('id'),
+      literal(model.__name__).label('type'),
+      literal(None).label('context_id'),
+  ).join(
+      UserRole,
+      and_(
+          UserRole.context_id == model.context_id,
+          UserRole.person_id == contact_id,
+      )
+  )
+  return context_query
 
-  def _get_model_specific_query(model):
-    """Prepare query specific for a particular model."""
-    model_type_query = None
-    if model is all_models.CycleTaskGroupObjectTask:
-      model_type_query = _get_tasks_in_cycle(model)
-    else:
-      model_type_queries = _get_assigned_to_records(model)
-      if model_type_queries:
-        type_column = query_utils.get_type_select_column(model)
-        model_type_query = db.session.query(
-            model.id.label('id'),
-            type_column.label('type'),
-            literal(None).label('context_id')
-        ).filter(or_(*model_type_queries)).distinct()
-    return model_type_query
-
-  def _get_context_relationships():
-    """Load list of objects related on contexts and objects types.
-
-    This code handles the case when user is added as `Auditor` and should be
-    able to see objects mapped to the `Program` on `My Work` page.
-
-    Returns:
-      objects (list((id, type, None))): Related objects
-    """
-    user_role_query = db.session.query(UserRole.context_id).join(
-        Role, UserRole.role_id == Role.id).filter(and_(
-            UserRole.person_id == contact_id, Role.name == 'Auditor')
-    )
 
-    _ct = aliased(all_models.Context, name="c")
-    _rl = aliased(all_models.Relationship, name="rl")
-    context_query = db.session.query(
-        _rl.source_id.label('id'),
-        _rl.source_type.label('type'),
-        literal(None)).join(_ct, and_(
-            _ct.id.in_(user_role_query),
-            _rl.destination_id == _ct.related_object_id,
-            _rl.destination_type == _ct.related_object_type,
-            _rl.source_type.in_(model_names),
-        )).union(db.session.query(
-            _rl.destination_id.label('id'),
-            _rl.destination_type.label('type'),
-            literal(None)).join(_ct, and_(
-                _ct.id.in_(user_role_query),
-                _rl.source_id == _ct.related_object_id,
-                _rl.source_type == _ct.related_object_type,
-                _rl.destination_type.in_(model_names),)))
-
-    return context_query
-
-  def _get_custom_roles():
-    """Objects for which the user is an 'owner'."""
-    custom_roles_query = db.session.query(
-        all_models.AccessControlList.object_id.label('id'),
-        all_models.AccessControlList.object_type.label('type'),
-        literal(None).label('context_id')
-    ).join(
-        all_models.AccessControlRole,
-        all_models.AccessControlList.ac_role_id ==
-        all_models.AccessControlRole.id
-    ).filter(
-        and_(
-            all_models.AccessControlList.person_id == contact_id,
-            all_models.AccessControlList.object_type.in_(model_names),
-            all_models.AccessControlRole.my_work == true(),
-            all_models.AccessControlRole.read == true()
-        )
+def _get_assigned_to_records(model, contact_id):
+  """Get query by models contacts fields.
+
+  Objects for which the user is the 'contact' or 'secondary contact'.
+  """
+  model_type_queries = []
+  for attr in ('contact_id', 'secondary_contact_id'):
+    if hasattr(model, attr):
+      model_type_queries.append(getattr(model, attr) == contact_id)
+  return model_type_queries
+
+
+def _get_tasks_in_cycle(model, contact_id):
+  """Filter tasks with particular statuses and cycle.
+
+  Filtering tasks with statuses "Assigned", "InProgress" and "Finished".
+  Where the task is in current users cycle.
+  """
+  task_query = db.session.query(
+      model.id.label('id'),
+      literal(model.__name__).label('type'),
+      literal(None).label('context_id'),
+  ).join(
+      Cycle,
+      Cycle.id == model.cycle_id
+  ).join(
+      all_models.AccessControlList,
+      sa.and_(
+          all_models.AccessControlList.object_type ==
+          "CycleTaskGroupObjectTask",
+          all_models.AccessControlList.object_id ==
+          all_models.CycleTaskGroupObjectTask.id,
+          all_models.AccessControlList.person_id == contact_id,
+      ),
+  ).join(
+      all_models.AccessControlRole,
+      sa.and_(
+          all_models.AccessControlRole.id ==
+          all_models.AccessControlList.ac_role_id,
+          all_models.AccessControlRole.object_type ==
+          "CycleTaskGroupObjectTask",
+          all_models.AccessControlRole.name == "Task Assignees",
+      )
+  ).filter(
+      Cycle.is_current == true(),
+  )
+  return task_query.filter(
+      Cycle.is_verification_needed == true(),
+      model.status.in_([
+          all_models.CycleTaskGroupObjectTask.ASSIGNED,
+          all_models.CycleTaskGroupObjectTask.IN_PROGRESS,
+          all_models.CycleTaskGroupObjectTask.FINISHED,
+          all_models.CycleTaskGroupObjectTask.DECLINED,
+          all_models.CycleTaskGroupObjectTask.DEPRECATED,
+      ])
+  ).union_all(
+      task_query.filter(
+          Cycle.is_verification_needed == false(),
+          model.status.in_([
+              all_models.CycleTaskGroupObjectTask.ASSIGNED,
+              all_models.CycleTaskGroupObjectTask.IN_PROGRESS,
+              all_models.CycleTaskGroupObjectTask.DEPRECATED,
+          ])
+      )
+  )
+
+
+def _get_model_specific_query(model, contact_id):
+  """Prepare query specific for a particular model."""
+  model_type_query = None
+  if model is all_models.CycleTaskGroupObjectTask:
+    model_type_query = _get_tasks_in_cycle(model, contact_id)
+  else:
+    model_type_queries = _get_assigned_to_records(model, contact_id)
+    if model_type_queries:
+      type_column = query_utils.get_type_select_column(model)
+      model_type_query = db.session.query(
+          model.id.label('id'),
+          type_column.label('type'),
+          literal(None).label('context_id')
+      ).filter(or_(*model_type_queries)).distinct()
+  return model_type_query
+
+
+def _get_context_relationships(model_names, contact_id):
+  """Load list of objects related on contexts and objects types.
+
+  This code handles the case when user is added as `Auditor` and should be
+  able to see objects mapped to the `Program` on `My Work` page.
+
+  Returns:
+    objects (list((id, type, None))): Related objects
+  """
+  user_role_query = db.session.query(UserRole.context_id).join(
+      Role, UserRole.role_id == Role.id).filter(and_(
+          UserRole.person_id == contact_id, Role.name == 'Auditor')
+  )
+
+  _ct = aliased(all_models.Context, name="c")
+  _rl = aliased(all_models.Relationship, name="rl")
+  context_query = db.session.query(
+      _rl.source_id.label('id'),
+      _rl.source_type.label('type'),
+      literal(None)).join(_ct, and_(
+          _ct.id.in_(user_role_query),
+          _rl.destination_id == _ct.related_object_id,
+          _rl.destination_type == _ct.related_object_type,
+          _rl.source_type.in_(model_names),
+      )).union(db.session.query(
+          _rl.destination_id.label('id'),
+          _rl.destination_type.label('type'),
+          literal(None)).join(_ct, and_(
+              _ct.id.in_(user_role_query),
+              _rl.source_id == _ct.related_object_id,
+              _rl.source_type == _ct.related_object_type,
+              _rl.destination_type.in_(model_names),)))
+
+  return context_query
+
+
+def _get_custom_roles(contact_id):
+  """Objects for which the user is an 'owner'."""
+  custom_roles_query = db.session.query(
+      all_models.AccessControlList.object_id.label('id'),
+      all_models.AccessControlList.object_type.label('type'),
+      literal(None).label('context_id')
+  ).join(
+      all_models.AccessControlRole,
+      all_models.AccessControlList.ac_role_id ==
+      all_models.AccessControlRole.id
+  ).filter(
+      and_(
+          all_models.AccessControlList.person_id == contact_id,
+          all_models.AccessControlRole.my_work == true(),
+          all_models.AccessControlRole.read == true()
+      )
+  )
+  return custom_roles_query
+
+
+def _get_stored_queries(contact_id):
+  """Get queries of objects of a person that are stored in my_objects table.
+
+  Returns:
+    list of (query, via_mapping) tuples, queries select id, type and
+    context_id of objects of all types.
+  """
+  queries = [
+      (_get_object_people(contact_id), True),
+      (_get_object_mapped_ca(contact_id), False),
+      (_get_objects_user_assigned(contact_id), False),
+      (_get_custom_roles(contact_id), False),
+  ]
+  for model in all_models.all_models:
+    query = _get_model_specific_query(model, contact_id)
+    if query:
+      queries.append((query, False))
+    if model in (all_models.Program, all_models.Audit, all_models.Workflow):
+      queries.append((_get_results_by_context(model, contact_id), False))
+  return queries
+
+
+def _store_my_objects(connection, person_id):
+  """Insert rows of a person into my_objects table."""
+  table = MyObject.__table__
+  for query, via_mapping in _get_stored_queries(person_id):
+    subquery = query.subquery()
+    connection.execute(table.insert().prefix_with("IGNORE").from_select(
+        ["person_id", "object_type", "object_id", "via_mapping"],
+        sa.select([
+            literal(person_id),
+            subquery.c.type,
+            subquery.c.id,
+            literal(via_mapping),
+        ]).where(subquery.c.type.isnot(None)),
+    ))
+
+
+def refresh_my_objects(person_ids):
+  """Rebuild my_objects rows of people whose rows are not up to date.
+
+  People are marked as up to date before their rows are selected. A change
+  committed by a concurrent request before the rows are inserted is seen by
+  the locking read of INSERT ... SELECT, a change committed later removes the
+  mark again.
+
+  Rows are rebuilt and committed in a separate transaction, so changes of
+  db.session are neither committed nor seen by the rebuild.
+  """
+  person_ids = {id_ for id_ in person_ids if id_ is not None}
+  if not person_ids:
+    return
+  with db.engine.begin() as connection:
+    fresh_ids = {id_ for id_, in connection.execute(sa.select([
+        MyObjectsPerson.person_id
+    ]).where(
+        MyObjectsPerson.person_id.in_(person_ids)
+    ))}
+    stale_ids = list(person_ids - fresh_ids)
+    if not stale_ids:
+      return
+    connection.execute(
+        MyObjectsPerson.__table__.insert().prefix_with("IGNORE"),
+        [{"person_id": id_} for id_ in stale_ids],
     )
-    return custom_roles_query
+    connection.execute(MyObject.__table__.delete().where(
+        MyObject.person_id.in_(stale_ids)))
+    for person_id in stale_ids:
+      _store_my_objects(connection, person_id)
+
+
+def _is_fresh(person_id):
+  """Check if my_objects rows of a person are up to date in db.session."""
+  return db.session.query(sa.exists().where(
+      MyObjectsPerson.person_id == person_id
+  )).scalar()
 
+
+def _get_stored_query(model_names, contact_id, is_creator):
+  """Get objects of a person stored in my_objects table."""
+  query = db.session.query(
+      MyObject.object_id.label('id'),
+      MyObject.object_type.label('type'),
+      literal(None).label('context_id'),
+  ).filter(
+      MyObject.person_id == contact_id,
+      MyObject.object_type.in_(model_names),
+  )
   # Note: We don't return mapped objects for the Creator because being mapped
   # does not give the Creator necessary permissions to view the object.
-  if not is_creator:
-    type_union_queries.append(_get_object_people())
+  if is_creator:
+    query = query.filter(MyObject.via_mapping == false())
+  return query
 
-  type_union_queries.extend((_get_object_mapped_ca(),
-                            _get_objects_user_assigned(),
-                            _get_context_relationships(),
-                            _get_custom_roles(),))
 
-  for model in type_models:
-    query = _get_model_specific_query(model)
-    if query:
-      type_union_queries.append(query)
+def _get_live_queries(model_names, contact_id, is_creator):
+  """Get queries that select objects of my_objects table of a person."""
+  queries = []
+  for query, via_mapping in _get_stored_queries(contact_id):
+    if is_creator and via_mapping:
+      continue
+    subquery = query.subquery()
+    queries.append(db.session.query(
+        subquery.c.id,
+        subquery.c.type,
+        subquery.c.context_id,
+    ).filter(subquery.c.type.in_(model_names)))
+  return queries
 
+
+def invalidate_my_objects(session, person_ids):
+  """Mark my_objects rows of given people as outdated.
+
+  Args:
+    session: session or connection that executes the statement.
+    person_ids: ids of people whose objects could have changed.
+  """
+  person_ids = [id_ for id_ in set(person_ids) if id_ is not None]
+  for chunk in list_chunks(person_ids):
+    session.execute(MyObjectsPerson.__table__.delete().where(
+        MyObjectsPerson.person_id.in_(chunk)))
+
+
+def delete_my_objects(session, objects):
+  """Delete my_objects rows of deleted objects.
+
+  Args:
+    session: session or connection that executes the statement.
+    objects: list of (type, id) tuples of deleted objects.
+  """
+  for chunk in list_chunks(list(objects)):
+    session.execute(MyObject.__table__.delete().where(
+        sa.tuple_(MyObject.object_type, MyObject.object_id).in_(chunk)))
+
+
+def rebuild_my_objects():
+  """Rebuild my_objects rows of all people."""
+  db.session.execute(MyObjectsPerson.__table__.delete())
+  db.session.execute(MyObject.__table__.delete())
+  db.session.commit()
+  person_ids = [id_ for id_, in db.session.query(all_models.Person.id)]
+  for chunk in list_chunks(person_ids, REBUILD_CHUNK_SIZE):
+    refresh_my_objects(chunk)
+
+
+def get_myobjects_query(types=None, contact_id=None, is_creator=False):
+  """Filters by "myview" for a given person.
+
+  Finds all objects which might appear on a user's Profile or Dashboard
+  pages.
+
+  This method only *limits* the result set -- Contexts and Roles will still
+  filter out forbidden objects.
+  """
+  type_models = _types_to_type_models(types)
+  model_names = [model.__name__ for model in type_models]
+
+  if contact_id is not None and _is_fresh(contact_id):
+    type_union_queries = [
+        _get_stored_query(model_names, contact_id, is_creator),
+    ]
+  else:
+    # Rows rebuilt by another transaction are not visible in the snapshot of
+    # db.session, so outdated rows are queried directly for this lookup.
+    # Rows are not rebuilt while the session holds uncommitted changes as
+    # the rebuild could wait for their locks.
+    type_union_queries = _get_live_queries(model_names, contact_id,
+                                           is_creator)
+    if not db.session().info.get(SESSION_WRITES_KEY):
+      refresh_my_objects([contact_id])
+  type_union_queries.append(
+      _get_context_relationships(model_names, contact_id))
+  for model in type_models:
     if model is all_models.Workflow:
       type_union_queries.append(backlog_workflows())
     if model is all_models.Person:
       type_union_queries.append(_get_people())
-    if model in (all_models.Program, all_models.Audit, all_models.Workflow):
-      type_union_queries.append(_get_results_by_context(model))
 
   return alias(union(*type_union_queries))
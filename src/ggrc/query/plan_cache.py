@@ -0,0 +1,79 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Caches for parts of query plans built by the query API.
+
+Hit and miss counters of the caches are logged by the benchmarks logger, see
+``ggrc.utils.benchmarks``.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from ggrc.utils import benchmarks
+
+
+class QueryPlanCache(object):
+  """Least recently used cache with hit and miss counters.
+
+  Caches are shared by all threads of a worker, so access to the items is
+  guarded by a lock. Values are built outside of the lock, two threads that
+  miss the same key can both build it and the last one is kept.
+  """
+
+  _MISSING = object()
+
+  def __init__(self, name, max_size=None):
+    self.name = name
+    self.max_size = max_size
+    self.hits = 0
+    self.misses = 0
+    self._items = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key, build):
+    """Get the cached value for key or build and store a new one.
+
+    Args:
+      key: hashable cache key, None disables caching of the value.
+      build: function without arguments that builds the value.
+    """
+    if key is None:
+      return build()
+    with self._lock:
+      value = self._items.pop(key, self._MISSING)
+      if value is not self._MISSING:
+        self.hits += 1
+        self._items[key] = value
+        return value
+      self.misses += 1
+    value = build()
+    with self._lock:
+      self._items.pop(key, None)
+      if self.max_size is not None and len(self._items) >= self.max_size:
+        self._items.popitem(last=False)
+      self._items[key] = value
+    return value
+
+  def clear(self):
+    with self._lock:
+      self._items.clear()
+
+  def log_stats(self):
+    benchmarks.logger.debug("%s cache: %s hits, %s misses, %s items",
+                            self.name, self.hits, self.misses,
+                            len(self._items))
+
+
+def expression_key(*parts):
+  """Get a normalized key of json serializable expression parts.
+
+  Returns:
+    string key or None if the expression refers to results of previous
+    object queries, because these can change while the query is processed.
+  """
+  key = json.dumps(parts, sort_keys=True, default=unicode)
+  if "__previous__" in key:
+    return None
+  return key
@@ -40,16 +40,15 @@ def build_collection_representation(model, description):
 
 def json_success_response(response_object, last_modified=None, status=200):
   """Build a 200-response with metadata headers."""
+  body = as_json(response_object)
   headers = [
-      ('Etag', etag(response_object)),
+      ('Etag', etag(body)),
       ('Content-Type', 'application/json'),
   ]
   if last_modified is not None:
     headers.append(('Last-Modified', http_timestamp(last_modified)))
 
-  return current_app.make_response(
-      (as_json(response_object), status, headers),
-  )
+  return current_app.make_response((body, status, headers))
 
 
 def http_timestamp(timestamp):
@@ -84,7 +83,9 @@ def get_handler_results(query):
   query_handler = handler_class(query)
   name = query_handler.__class__.__name__
   with benchmark("Get query Handler results from: {}".format(name)):
-    return query_handler.get_results()
+    results = query_handler.get_results()
+  query_handler.log_cache_stats()
+  return results
 
 
 def get_objects_by_query():
@@ -97,7 +98,8 @@ def get_objects_by_query():
                         if result["last_modified"]]
   last_modified = max(last_modified_list) if last_modified_list else None
   collections = []
-  collection_fields = ["ids", "values", "count", "total", "object_name"]
+  collection_fields = ["ids", "values", "count", "total", "object_name",
+                       "next_cursor"]
 
   for result in results:
     model = get_model(result["object_name"])
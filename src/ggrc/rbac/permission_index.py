@@ -0,0 +1,94 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Flat lookup index for the nested user permissions dict.
+
+User permissions are loaded as a nested dict that is also shared with the
+client and memcache, see ``ggrc_basic_permissions.load_permissions_for``:
+
+  permissions[action][resource_type]["contexts"]
+  permissions[action][resource_type]["resources"]
+  permissions[action][resource_type]["conditions"][context_id]
+
+Contexts and resources are stored as lists, so every membership test walks
+the dict and scans a list. The index compiles the dict once into sets keyed
+by ``(action, resource_type)`` so that permission checks are constant time
+lookups.
+"""
+
+from ggrc.utils import benchmark
+
+
+_EMPTY = frozenset()
+
+
+class PermissionIndex(object):
+  """Hashed lookups for a single permissions dict.
+
+  The index does not follow changes of the permissions dict made after the
+  index was compiled.
+  """
+
+  def __init__(self, permissions):
+    self.permissions = permissions
+    self._types = set()
+    self._contexts = {}
+    self._resources = {}
+    self._conditions = {}
+    self._contexts_for_types = {}
+    self._resources_for_types = {}
+    with benchmark("Compile permission index"):
+      self._compile(permissions or {})
+
+  def _compile(self, permissions):
+    """Flatten the nested permissions dict into the lookup dicts."""
+    for action, resource_permissions in permissions.iteritems():
+      if not isinstance(resource_permissions, dict):
+        continue  # e.g. the "__user" email entry
+      for resource_type, permission in resource_permissions.iteritems():
+        if not permission:
+          continue
+        key = (action, resource_type)
+        self._types.add(key)
+        self._contexts[key] = frozenset(permission.get("contexts", []))
+        self._resources[key] = frozenset(permission.get("resources", []))
+        conditions = permission.get("conditions")
+        if conditions:
+          self._conditions[key] = conditions
+
+  def has_permission(self, action, resource_type):
+    """Check if there is any permission entry for the action and type."""
+    return (action, resource_type) in self._types
+
+  def contexts(self, action, resource_type):
+    """Get the set of context ids of the permission."""
+    return self._contexts.get((action, resource_type), _EMPTY)
+
+  def resources(self, action, resource_type):
+    """Get the set of resource ids of the permission."""
+    return self._resources.get((action, resource_type), _EMPTY)
+
+  def has_conditions(self, action, resource_type):
+    return (action, resource_type) in self._conditions
+
+  def conditions(self, action, resource_type, context_id):
+    """Get the list of conditions of the permission in the context."""
+    return self._conditions.get(
+        (action, resource_type), {}
+    ).get(context_id, [])
+
+  def contexts_for_types(self, action, resource_types):
+    """Get the union of contexts of the permission for all given types."""
+    key = (action, tuple(resource_types))
+    if key not in self._contexts_for_types:
+      self._contexts_for_types[key] = frozenset().union(
+          *[self.contexts(action, type_) for type_ in resource_types])
+    return self._contexts_for_types[key]
+
+  def resources_for_types(self, action, resource_types):
+    """Get the union of resources of the permission for all given types."""
+    key = (action, tuple(resource_types))
+    if key not in self._resources_for_types:
+      self._resources_for_types[key] = frozenset().union(
+          *[self.resources(action, type_) for type_ in resource_types])
+    return self._resources_for_types[key]
@@ -166,29 +166,60 @@ def has_conditions(action, resource):
   Checks if the resource has a condition that needs to be checked with
   is_allowed_for.
   """
-  # pylint disable=protected-access
-  _permissions = permissions_for()._permissions()
-  return bool(_permissions.get(action, {})
-              .get(resource, {})
-              .get('conditions', {}))
+  # pylint: disable=protected-access
+  return permissions_for()._permission_index().has_conditions(action,
+                                                              resource)
+
+
+def is_allowed_read_many(resource_type, resources):
+  """Get ids of resources of the given type that the user can read.
+
+  Args:
+    resource_type: type name of all resources.
+    resources: iterable of (resource_id, context_id) tuples.
+
+  Returns:
+    set of ids of readable resources.
+  """
+  resources = list(resources)
+  if has_system_wide_read():
+    return {resource_id for resource_id, _ in resources}
+  return permissions_for(get_user()).is_allowed_read_many(resource_type,
+                                                          resources)
+
+
+def get_context_resources(model_names, permission_type='read',
+                          permission_model=None):
+  """Get allowed contexts and resources for many models at once.
+
+  Returns:
+    dict with a (contexts, resources) tuple for each model name, see
+    get_context_resource.
+  """
+  user_permissions = permissions_for(get_user())
+  contexts_for = getattr(user_permissions,
+                         "{}_contexts_for".format(permission_type))
+  resources_for = getattr(user_permissions,
+                          "{}_resources_for".format(permission_type))
+  result = {}
+  if permission_model:
+    contexts = contexts_for(permission_model)
+    resources = resources_for(permission_model)
+    for model_name in model_names:
+      model_contexts = contexts
+      read_contexts = user_permissions.read_contexts_for(model_name)
+      if contexts and read_contexts is not None:
+        model_contexts = set(contexts) & set(read_contexts)
+      result[model_name] = (model_contexts, resources)
+  else:
+    for model_name in model_names:
+      result[model_name] = (contexts_for(model_name),
+                            resources_for(model_name))
+  return result
 
 
 def get_context_resource(model_name, permission_type='read',
                          permission_model=None):
   """Get allowed contexts and resources."""
-  permissions_map = {
-      "create": (create_contexts_for, create_resources_for),
-      "read": (read_contexts_for, read_resources_for),
-      "update": (update_contexts_for, update_resources_for),
-      "delete": (delete_contexts_for, delete_resources_for),
-  }
-
-  contexts = permissions_map[permission_type][0](
-      permission_model or model_name)
-  resources = permissions_map[permission_type][1](
-      permission_model or model_name)
-
-  if permission_model and contexts:
-    contexts = set(contexts) & set(read_contexts_for(model_name))
-
-  return contexts, resources
+  return get_context_resources([model_name], permission_type,
+                               permission_model)[model_name]
@@ -8,6 +8,7 @@ from .user_permissions import UserPermissions
 from ggrc.app import db
 from ggrc.rbac.permissions import permissions_for as find_permissions
 from ggrc.rbac.permissions import is_allowed_create
+from ggrc.rbac.permission_index import PermissionIndex
 from ggrc.models import get_model
 from ggrc.models import Person
 
@@ -186,49 +187,50 @@ class DefaultUserPermissions(UserPermissions):
         None,
         context_id)
 
-  def _permission_match(self, permission, permissions):
+  def _permission_match(self, permission, index):
     """Check if the user has the given permission"""
-
-    if None in \
-        permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', []):
+    contexts = index.contexts(permission.action, permission.resource_type)
+    if None in contexts:
       return True
-    return \
-        permission.resource_id in permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('resources', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('contexts', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(self.ADMIN_PERMISSION.resource_type, {})\
-        .get('contexts', [])
+    return (
+        permission.resource_id in index.resources(permission.action,
+                                                  permission.resource_type) or
+        permission.context_id in contexts or
+        permission.context_id in index.contexts(
+            permission.action, self.ADMIN_PERMISSION.resource_type)
+    )
 
   @staticmethod
   def _permissions():
     """Returns request permission from the global scope"""
     return getattr(g, '_request_permissions', {})
 
-  def _is_allowed(self, permission):
+  def _permission_index(self):
+    """Returns the permission index compiled for the request permissions.
+
+    The index is compiled once and kept in the global scope for as long as
+    the request permissions are not replaced.
+    """
     permissions = self._permissions()
+    index = getattr(g, '_request_permission_index', None)
+    if index is None or index.permissions is not permissions:
+      index = PermissionIndex(permissions)
+      setattr(g, '_request_permission_index', index)
+    return index
+
+  def _is_allowed(self, permission):
+    index = self._permission_index()
     if permission.resource_type != '/admin' \
        and permission.context_id \
        and self._is_allowed(permission._replace(context_id=None)):
       return True
-    if self._permission_match(permission, permissions):
+    if self._permission_match(permission, index):
       return True
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._permission_match(self.ADMIN_PERMISSION, index):
       return True
     return self._permission_match(
         self._admin_permission_for_context(permission.context_id),
-        permissions)
+        index)
 
   @staticmethod
   def _check_conditions(instance, action, conditions):
@@ -241,47 +243,29 @@ class DefaultUserPermissions(UserPermissions):
     return False
 
   def _is_allowed_for(self, instance, action):
-    permissions = self._permissions()
+    index = self._permission_index()
     # Check for admin permission
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      conditions = permissions[self.ADMIN_PERMISSION.action]\
-          .get(self.ADMIN_PERMISSION.resource_type)\
-          .get("conditions", {})\
-          .get(None, [])
+    if self._permission_match(self.ADMIN_PERMISSION, index):
+      conditions = index.conditions(self.ADMIN_PERMISSION.action,
+                                    self.ADMIN_PERMISSION.resource_type,
+                                    None)
       if not conditions:
         return True
       return self._check_conditions(instance, action, conditions)
-    if (not permissions.get(action) or
-       not permissions[action].get(instance._inflector.model_singular)):
+    resource_type = instance._inflector.model_singular
+    if not index.has_permission(action, resource_type):
       return False
-    resources = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('resources', [])
-    contexts = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('contexts', [])
+    if instance.id in index.resources(action, resource_type):
+      return True
     # We can't use instance.context_id, because it requires the
     # object <-> context mapping to be created,
     # which isn't the case when creating objects
     context_id = None
     if hasattr(instance, 'context') and hasattr(instance.context, 'id'):
       context_id = instance.context.id
-    if instance.id in resources:
-      return True
-    no_context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(None, [])
-
-    context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(context_id, [])
-    conditions = no_context_conditions + context_conditions
+    conditions = (index.conditions(action, resource_type, None) +
+                  index.conditions(action, resource_type, context_id))
+    contexts = index.contexts(action, resource_type)
     # Check any conditions applied per resource
     if (None in contexts or context_id in contexts) and not conditions:
       return True
@@ -307,6 +291,24 @@ class DefaultUserPermissions(UserPermissions):
     """Whether or not the user is allowed to read the given instance"""
     return self._is_allowed_for(instance, 'read')
 
+  def is_allowed_read_many(self, resource_type, resources):
+    """Ids of resources of the specified type that the user is allowed to
+    read.
+
+    Permissions that allow reading all resources of the type are checked
+    once, so only users with per context or per resource permissions need a
+    lookup for every resource.
+    """
+    index = self._permission_index()
+    if (self._permission_match(self.ADMIN_PERMISSION, index) or
+       None in index.contexts('read', resource_type)):
+      return {resource_id for resource_id, _ in resources}
+    return {
+        resource_id for resource_id, context_id in resources
+        if self._is_allowed(
+            Permission('read', resource_type, resource_id, context_id))
+    }
+
   def is_allowed_update(self, resource_type, resource_id, context_id):
     """Whether or not the user is allowed to update a resource of the specified
     type in the context."""
@@ -330,51 +332,35 @@ class DefaultUserPermissions(UserPermissions):
   def _get_resources_for(self, action, resource_type):
     """Get resources resources (object ids) for a given action and
     resource_type"""
-    permissions = self._permissions()
+    index = self._permission_index()
 
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._permission_match(self.ADMIN_PERMISSION, index):
       return None
 
     # Get the list of resources for a given resource type and any
     #   superclasses
     resource_types = get_contributing_resource_types(resource_type)
-
-    ret = []
-    for resource_type in resource_types:
-      ret.extend(
-          permissions
-          .get(action, {})
-          .get(resource_type, {})
-          .get('resources', []))
-    return ret
+    return list(index.resources_for_types(action, resource_types))
 
   def _get_contexts_for(self, action, resource_type):
     # FIXME: (Security) When applicable, we should explicitly assert that no
     #   permissions are expected (e.g. that every user has ADMIN_PERMISSION).
-    permissions = self._permissions()
+    index = self._permission_index()
 
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._permission_match(self.ADMIN_PERMISSION, index):
       return None
 
     # Get the list of contexts for a given resource type and any
     #   superclasses
     resource_types = get_contributing_resource_types(resource_type)
-
-    ret = []
-    for resource_type in resource_types:
-      ret.extend(permissions.get(action, {})
-                            .get(resource_type, {})
-                            .get('contexts', []))
+    contexts = index.contexts_for_types(action, resource_types)
 
     # Extend with the list of all contexts for which the user is an ADMIN
-    admin_list = list(
-        permissions.get(self.ADMIN_PERMISSION.action, {})
-        .get(self.ADMIN_PERMISSION.resource_type, {})
-        .get('contexts', ()))
-    ret.extend(admin_list)
-    if None in ret:
+    admin_contexts = index.contexts(self.ADMIN_PERMISSION.action,
+                                    self.ADMIN_PERMISSION.resource_type)
+    if None in contexts or None in admin_contexts:
       return None
-    return ret
+    return list(contexts | admin_contexts)
 
   def create_contexts_for(self, resource_type):
     """All contexts in which the user has create permission."""
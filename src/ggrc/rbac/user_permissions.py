@@ -15,6 +15,14 @@ class UserPermissions(object):
     type in the context."""
     raise NotImplementedError()
 
+  def is_allowed_read_many(self, resource_type, resources):
+    """Ids of resources of the specified type that the user is allowed to
+    read. Resources are given as (resource_id, context_id) tuples."""
+    return {
+        resource_id for resource_id, context_id in resources
+        if self.is_allowed_read(resource_type, resource_id, context_id)
+    }
+
   def is_allowed_read_for(self, instance):
     """Whether or not the user is allowed to read this particular resource
     instance. This is in contrast to ``is_allowed_read`` which checks that the
@@ -23,6 +31,14 @@ class UserPermissions(object):
     """
     raise NotImplementedError()
 
+  def is_allowed_read_for_many(self, instances):
+    """Ids of instances that the user is allowed to read. Instances should be
+    of a single type."""
+    return {
+        instance.id for instance in instances
+        if self.is_allowed_read_for(instance)
+    }
+
   def is_allowed_update(self, resource_type, resource_id, context_id):
     """Whether or not the user is allowed to update a resource of the specified
     type in the context."""
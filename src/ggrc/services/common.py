@@ -6,6 +6,7 @@
 resources.
 """
 
+import copy
 import datetime
 import collections
 import hashlib
@@ -31,12 +32,15 @@ from werkzeug.exceptions import BadRequest, Forbidden
 import ggrc.builder.json
 import ggrc.models
 from ggrc import db, utils
+from ggrc.cache import stats as cache_stats
+from ggrc.cache import worker_cache
 from ggrc.utils import as_json, benchmark
 from ggrc.utils.log_event import log_event
 from ggrc.fulltext import get_indexer
 from ggrc.login import get_current_user_id, get_current_user
 from ggrc.models.cache import Cache
 from ggrc.models.exceptions import ValidationError, translate_message
+from ggrc.models.reflection import AttributeInfo
 from ggrc.rbac import permissions, context_query_filter
 from ggrc.services.attribute_query import AttributeQueryBuilder
 from ggrc.services import signals
@@ -233,6 +237,8 @@ def update_memcache_after_commit(context):
   if cache_manager.marked_for_delete:
     delete_result = cache_manager.bulk_delete(
         cache_manager.marked_for_delete, 0)
+    worker_cache.invalidate(cache_manager.cache_object.memcache_client,
+                            cache_manager.marked_for_delete)
     # TODO(dan): handling failure including network errors,
     #            currently we log errors
     if delete_result is not True:
@@ -284,11 +290,13 @@ def get_modified_objects(session):
 def update_snapshot_index(session, cache):
   """Update fulltext index records for cached snapshtos."""
   del session  # Unused
+  from ggrc.fulltext import shadow
   from ggrc.snapshotter.indexer import reindex_snapshots
   if cache is None:
     return
   objs = itertools.chain(cache.new, cache.dirty, cache.deleted)
   reindex_snapshots_ids = [o.id for o in objs if o.type == "Snapshot"]
+  shadow.record_changes(("Snapshot", id_) for id_ in reindex_snapshots_ids)
   get_indexer().delete_records_by_ids("Snapshot",
                                       reindex_snapshots_ids,
                                       commit=False)
@@ -900,7 +908,7 @@ class Resource(ModelView):
 
     database_objs = {}
     if database_matches:
-      database_objs = self.get_resources_from_database(matches)
+      database_objs = self.get_resources_from_database(database_matches)
       if self.has_cache():
         with benchmark("Add resources to cache"):
           self.add_resources_to_cache(database_objs)
@@ -937,7 +945,11 @@ class Resource(ModelView):
           extras = {}
     with benchmark("dispatch_request > collection_get > Matched resources"):
       cache_op = None
+      collection_etag = None
       if '__stubs_only' in request.args:
+        collection_etag = self.collection_stubs_etag(matches, extras)
+        if self.is_not_modified(collection_etag):
+          return self.not_modified_response(collection_etag)
         objs = [{
             'id': m[0],
             'type': m[1],
@@ -945,6 +957,13 @@ class Resource(ModelView):
             'context_id': m[2]
         } for m in matches]
 
+      elif self.get_projected_columns() is not None:
+        with benchmark("Query projected fields"):
+          objs = self.get_projected_resources(
+              matches, self.get_projected_columns())
+        with benchmark("Filter resources based on permissions"):
+          objs = filter_resource(objs)
+
       else:
         cache_objs, database_objs = self.get_matched_resources(matches)
         objs = {}
@@ -958,52 +977,171 @@ class Resource(ModelView):
         cache_op = 'Hit' if cache_objs else 'Miss'
     with benchmark("dispatch_request > collection_get > Create Response"):
       # Return custom fields specified via `__fields=id,title,description` etc.
-      # TODO this can be optimized by filter_resource() not retrieving
-      # the other fields to being with
       if '__fields' in request.args:
         custom_fields = request.args['__fields'].split(',')
         objs = [{f: o[f] for f in custom_fields if f in o} for o in objs]
       with benchmark("Serialize collection"):
         collection = self.build_collection_representation(
             objs, extras=extras)
+        body = self.as_json(collection)
 
-      if 'If-None-Match' in self.request.headers and \
-         self.request.headers['If-None-Match'] == etag(collection):
-        return current_app.make_response((
-            '', 304, [('Etag', etag(collection))]))
+      if collection_etag is None:
+        collection_etag = etag(body)
+      if self.is_not_modified(collection_etag):
+        return self.not_modified_response(collection_etag)
 
       with benchmark("Make response"):
-        return self.json_success_response(
-            collection, self.collection_last_modified(), cache_op=cache_op)
+        return self.serialized_success_response(
+            body, self.collection_last_modified(), cache_op=cache_op,
+            obj_etag=collection_etag)
+
+  PROJECTED_BASE_FIELDS = ("id", "type", "selfLink")
+
+  def get_projected_columns(self):
+    """Get column names for fields requested with `__fields`.
+
+    The fields can be selected directly from the model table only if all of
+    them are base fields or published column attributes without custom
+    publish logic. Relationships and revisions need full resources for the
+    permission checks of creators.
+
+    Returns:
+      list of column names or None if the full resources are needed.
+    """
+    if '__fields' not in request.args:
+      return None
+    model = self.model
+    if model.__name__ in ("Relationship", "Revision"):
+      return None
+    mapper = class_mapper(model)
+    if (mapper.polymorphic_on is not None or
+            not hasattr(mapper.c, 'context_id')):
+      return None
+    published = set(AttributeInfo.gather_publish_attrs(model))
+    custom_publish = AttributeInfo.gather_attr_dicts(model, '_custom_publish')
+    columns = []
+    for field in request.args['__fields'].split(','):
+      if field in self.PROJECTED_BASE_FIELDS:
+        continue
+      if (field not in published or field in custom_publish or
+              field not in mapper.column_attrs):
+        return None
+      columns.append(field)
+    return columns
+
+  def get_projected_resources(self, matches, columns):
+    """Get resources with only the given columns for specified matches.
+
+    Resources also contain id, type, selfLink and context_id that are needed
+    for permission checks.
+    """
+    model = self.model
+    rows = {}
+    query_columns = [getattr(model, column) for column in columns]
+    for ids in utils.list_chunks([m[0] for m in matches]):
+      query = db.session.query(model.id, *query_columns).filter(
+          model.id.in_(ids))
+      rows.update((row[0], row[1:]) for row in query)
+    resources = []
+    for match in matches:
+      if match[0] not in rows:
+        continue
+      resource = dict(zip(columns, rows[match[0]]))
+      resource.update({
+          'id': match[0],
+          'type': match[1],
+          'selfLink': utils.url_for(match[1], id=match[0]),
+          'context_id': match[2],
+      })
+      resources.append(resource)
+    return resources
+
+  def collection_stubs_etag(self, matches, extras):
+    """Get etag of a stubs collection before the collection is built.
+
+    Stubs contain only match columns and links, so the etag is derived from
+    the matches, the request url and paging extras.
+    """
+    return etag(self.url_for_preserving_querystring(),
+                self.as_json(extras) + self.as_json(matches))
+
+  def is_not_modified(self, obj_etag):
+    return self.request.headers.get('If-None-Match') == obj_etag
+
+  @staticmethod
+  def not_modified_response(obj_etag):
+    return current_app.make_response(('', 304, [('Etag', obj_etag)]))
 
   def get_resources_from_cache(self, matches):
-    """Get resources from cache for specified matches"""
+    """Get resources from cache for specified matches
+
+    Resources are looked up in the worker resource cache first and only the
+    missing ones are fetched from memcache.
+    """
     resources = {}
     # Disable caching for background tasks
     # Setting background task status circumvents our memcache
     # invalidation logic so we have to disabling memcache.
     if self.model.__name__ == 'BackgroundTask':
       return resources
-    # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
-    for match in matches:
-      key = get_cache_key(None, id=match[0], type=match[1])
-      val = memcache_client.get(key) or {}
-      if "selfLink" in val:
-        resources[match] = val
+    cache_manager = self.request.cache_manager
+    cache = cache_manager.cache_object
+    matches_by_key = {get_cache_key(None, id=match[0], type=match[1]): match
+                      for match in matches}
+    start = time.time()
+    values = {}
+    local_cache = worker_cache.get_resource_cache()
+    if local_cache is not None:
+      # Generations must be read before any values are fetched
+      cache_manager.resource_generations = worker_cache.get_generations(
+          cache.memcache_client, matches_by_key.keys())
+      values = local_cache.get_multi(matches_by_key.keys(),
+                                     cache_manager.resource_generations)
+    missing_keys = [key for key in matches_by_key if key not in values]
+    if missing_keys:
+      memcache_values = {
+          key: val for key, val in cache.get_multi(
+              missing_keys, for_cas=False).iteritems()
+          if "selfLink" in (val or {})
+      }
+      if local_cache is not None:
+        local_cache.set_multi(memcache_values,
+                              cache_manager.resource_generations)
+      values.update(memcache_values)
+    for key, val in values.iteritems():
+      resources[matches_by_key[key]] = val
+    cache_stats.record_read(self.model.__name__, len(resources),
+                            len(matches) - len(resources),
+                            time.time() - start)
+    if local_cache is not None:
+      local_cache.log_stats()
     return resources
 
   def add_resources_to_cache(self, match_obj_pairs):
     """Add resources to cache if they are not blocked by DeleteOp entries"""
     # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
-    for match, obj in match_obj_pairs.items():
-      memcache_client.add(get_cache_key(None, id=match[0], type=match[1]), obj)
+    cache_manager = self.request.cache_manager
+    cache = cache_manager.cache_object
+    start = time.time()
+    values = {get_cache_key(None, id=match[0], type=match[1]): obj
+              for match, obj in match_obj_pairs.iteritems()}
+    not_added = set(cache.add_multi(values) or ())
+    local_cache = worker_cache.get_resource_cache()
+    if (local_cache is not None and
+            cache_manager.resource_generations is not None):
+      # Keys blocked by DeleteOp entries are not stored locally either
+      local_cache.set_multi({key: value for key, value in values.iteritems()
+                             if key not in not_added},
+                            cache_manager.resource_generations)
+    cache_stats.record_write(self.model.__name__, len(match_obj_pairs),
+                             time.time() - start)
 
   def invalidate_cache_to(self, obj):
     """Invalidate api cache for sent object."""
     memcache_client = self.request.cache_manager.cache_object.memcache_client
-    memcache_client.delete(get_cache_key(None, id=obj.id, type=obj.type))
+    key = get_cache_key(None, id=obj.id, type=obj.type)
+    memcache_client.delete(key)
+    worker_cache.invalidate(memcache_client, [key])
 
   def json_create(self, obj, src):
     ggrc.builder.json.create(obj, src)
@@ -1434,6 +1572,14 @@ class Resource(ModelView):
   def json_success_response(self, response_object, last_modified=None,
                             status=200, id=None, cache_op=None,
                             obj_etag=None):
+    return self.serialized_success_response(
+        self.as_json(response_object), last_modified, status, id, cache_op,
+        obj_etag)
+
+  def serialized_success_response(self, body, last_modified=None,
+                                  status=200, id=None, cache_op=None,
+                                  obj_etag=None):
+    """Make a response for an already serialized JSON body."""
     headers = [('Content-Type', 'application/json')]
     if last_modified:
       headers.append(('Last-Modified', self.http_timestamp(last_modified)))
@@ -1443,8 +1589,7 @@ class Resource(ModelView):
       headers.append(('Location', self.url_for(id=id)))
     if cache_op:
       headers.append(('X-GGRC-Cache', cache_op))
-    return current_app.make_response(
-        (self.as_json(response_object), status, headers))
+    return current_app.make_response((body, status, headers))
 
   def process_actions(self, obj):
     if hasattr(obj, 'process_actions'):
@@ -1518,7 +1663,80 @@ class ExtendedResource(Resource):
     )
 
 
-def filter_resource(resource, depth=0, user_permissions=None):  # noqa
+def _get_resource_context_id(resource):
+  """Get context id of a serialized resource."""
+  context_id = False
+  if 'context' in resource:
+    if resource['context'] is None:
+      context_id = None
+    else:
+      context_id = resource['context']['id']
+  elif 'context_id' in resource:
+    context_id = resource['context_id']
+  assert context_id is not False, "No context found for object"
+  return context_id
+
+
+def _get_readable_revision_ids(revisions, user_permissions):
+  """Get ids of revisions of objects that the Creator can read.
+
+  Revised objects are loaded with a single query for each type instead of a
+  query for every revision.
+  """
+  ids_by_type = collections.defaultdict(set)
+  for revision in revisions:
+    ids_by_type[revision['resource_type']].add(revision['resource_id'])
+  readable_objects = set()
+  for resource_type, ids in ids_by_type.iteritems():
+    if not hasattr(ggrc.models.all_models, resource_type):
+      # there are no permissions for old objects
+      continue
+    res_model = getattr(ggrc.models.all_models, resource_type)
+    with benchmark("Load revised {} objects".format(resource_type)):
+      instances = res_model.query.filter(res_model.id.in_(ids)).all()
+    readable_objects.update(
+        (resource_type, id_)
+        for id_ in user_permissions.is_allowed_read_for_many(instances)
+    )
+  return {
+      revision['id'] for revision in revisions
+      if (revision['resource_type'],
+          revision['resource_id']) in readable_objects
+  }
+
+
+def _get_readable_ids(resources, user_permissions):
+  """Get ids of readable resources in the list for each resource type.
+
+  Relationships are skipped, because they need special checks for creators.
+  Revisions are checked by their revised objects for creators and skipped
+  for other users.
+  """
+  resources_by_type = collections.defaultdict(list)
+  revisions = []
+  for resource in resources:
+    if not isinstance(resource, dict) or 'type' not in resource:
+      continue
+    if resource['type'] == "Revision":
+      revisions.append(resource)
+      continue
+    if resource['type'] == "Relationship":
+      continue
+    resources_by_type[resource['type']].append(
+        (resource['id'], _get_resource_context_id(resource)))
+  readable_ids = {
+      resource_type: user_permissions.is_allowed_read_many(resource_type,
+                                                           type_resources)
+      for resource_type, type_resources in resources_by_type.iteritems()
+  }
+  if revisions and _is_creator():
+    readable_ids["Revision"] = _get_readable_revision_ids(revisions,
+                                                          user_permissions)
+  return readable_ids
+
+
+def filter_resource(resource, depth=0, user_permissions=None,  # noqa
+                    readable_ids=None):
   """
   Returns:
      The subset of resources which are readable based on user_permissions
@@ -1528,24 +1746,20 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
     user_permissions = permissions.permissions_for(get_current_user())
 
   if isinstance(resource, (list, tuple)):
+    # Read permissions of all objects in the list are checked at once for
+    # each type.
+    readable_ids = _get_readable_ids(resource, user_permissions)
     filtered = []
     for sub_resource in resource:
       filtered_sub_resource = filter_resource(
-          sub_resource, depth=depth + 1, user_permissions=user_permissions)
+          sub_resource, depth=depth + 1, user_permissions=user_permissions,
+          readable_ids=readable_ids)
       if filtered_sub_resource is not None:
         filtered.append(filtered_sub_resource)
     return filtered
   elif isinstance(resource, dict) and 'type' in resource:
     # First check current level
-    context_id = False
-    if 'context' in resource:
-      if resource['context'] is None:
-        context_id = None
-      else:
-        context_id = resource['context']['id']
-    elif 'context_id' in resource:
-      context_id = resource['context_id']
-    assert context_id is not False, "No context found for object"
+    context_id = _get_resource_context_id(resource)
 
     # In order to avoid loading full instances and using is_allowed_read_for,
     # we are making a special test for the Creator here. Creator can only
@@ -1572,6 +1786,11 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
         can_read = False
       if not can_read:
         return None
+    elif (resource['type'] == "Revision" and _is_creator() and
+          readable_ids and "Revision" in readable_ids):
+      # Revised objects of the whole list were checked at once
+      if resource['id'] not in readable_ids["Revision"]:
+        return None
     elif resource['type'] == "Revision" and _is_creator():
       # Make a check for revision objects that are a special case
       if not hasattr(ggrc.models.all_models, resource['resource_type']):
@@ -1582,11 +1801,16 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
       if instance is None or\
          not user_permissions.is_allowed_read_for(instance):
         return None
+    elif readable_ids and resource['type'] in readable_ids:
+      if resource['id'] not in readable_ids[resource['type']]:
+        return None
     else:
       if not user_permissions.is_allowed_read(resource['type'],
                                               resource['id'], context_id):
         return None
-    # Then, filter any typed keys
+    # Then, filter any typed keys. Resources can be shared by the worker
+    # resource cache, so they are copied instead of changed in place.
+    filtered = resource
     for key, value in resource.items():
       if key == 'context':
         # Explicitly allow `context` objects to pass through
@@ -1594,10 +1818,14 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
       else:
         # Apply filtering to sub-resources
         if isinstance(value, dict) and 'type' in value:
-          resource[key] = filter_resource(
+          filtered_value = filter_resource(
               value, depth=depth + 1, user_permissions=user_permissions)
+          if filtered_value is not value:
+            if filtered is resource:
+              filtered = copy.copy(resource)
+            filtered[key] = filtered_value
 
-    return resource
+    return filtered
   else:
     assert False, "Non-object passed to filter_resource"
 
@@ -76,9 +76,23 @@ SQLALCHEMY_DATABASE_URI = os.environ.get('GGRC_DATABASE_URI', '')
 SECRET_KEY = os.environ.get('GGRC_SECRET_KEY', 'Replace-with-something-secret')
 
 MEMCACHE_MECHANISM = True
+# "appengine" for AppEngine memcache or "local" for an in-process stand-in
+MEMCACHE_CLIENT = os.environ.get("GGRC_MEMCACHE_CLIENT", "appengine")
+# Number of serialized resources kept in memory of every worker, 0 disables
+# the in-process tier in front of memcache
+RESOURCE_CACHE_SIZE = int(os.environ.get("GGRC_RESOURCE_CACHE_SIZE", "1000"))
+RESOURCE_CACHE_TTL = int(os.environ.get("GGRC_RESOURCE_CACHE_TTL", "60"))
 
 # AppEngine Email
 APPENGINE_EMAIL = os.environ.get('APPENGINE_EMAIL', '')
+# "appengine" sends emails with AppEngine mail API, "local" keeps them in
+# memory of the process
+MAIL_TRANSPORT = os.environ.get("GGRC_MAIL_TRANSPORT", "appengine")
+# Number of emails handed to the mail transport at once
+MAIL_BATCH_SIZE = int(os.environ.get("GGRC_MAIL_BATCH_SIZE", "100"))
+# Worker processes rendering digest emails. They are not used on App Engine.
+NOTIFICATION_RENDER_WORKERS = int(
+    os.environ.get("GGRC_NOTIFICATION_RENDER_WORKERS", "1"))
 
 CALENDAR_MECHANISM = False
 
@@ -100,6 +114,40 @@ USE_APP_ENGINE_ASSETS_SUBDOMAIN = False
 
 BACKGROUND_COLLECTION_POST_SLEEP = 0
 
+# Full text reindex settings. Worker processes are not used on App Engine.
+FULLTEXT_REINDEX_CHUNK_SIZE = int(
+    os.environ.get("GGRC_REINDEX_CHUNK_SIZE", "1000"))
+FULLTEXT_REINDEX_WORKERS = int(os.environ.get("GGRC_REINDEX_WORKERS", "1"))
+# "in_place" or "swap", see ggrc.fulltext.reindex
+FULLTEXT_REINDEX_MODE = os.environ.get("GGRC_REINDEX_MODE", "in_place")
+
+# Snapshot scopes with more objects are created and updated by a background
+# task, 0 keeps snapshot operations in the request that triggered them.
+SNAPSHOT_ASYNC_THRESHOLD = int(
+    os.environ.get("GGRC_SNAPSHOT_ASYNC_THRESHOLD", "0"))
+# Number of snapshots created or updated and committed at once by the task.
+SNAPSHOT_JOB_CHUNK_SIZE = int(
+    os.environ.get("GGRC_SNAPSHOT_JOB_CHUNK_SIZE", "1000"))
+
+# 1 keeps relationships and snapshots in memory of every worker for related
+# object lookups, see ggrc.cache.relationship_graph. The graph is loaded by a
+# background thread and is never loaded on App Engine.
+RELATIONSHIP_GRAPH = int(os.environ.get("GGRC_RELATIONSHIP_GRAPH", "0"))
+# Seconds between checks of the in-memory graph against the database
+RELATIONSHIP_GRAPH_CHECK_INTERVAL = int(
+    os.environ.get("GGRC_RELATIONSHIP_GRAPH_CHECK_INTERVAL", "30"))
+
+# Share of requests profiled by ggrc.utils.profiling, from 0 (disabled) to 1.
+# Stats of sampled requests are served by /admin/profiling.
+REQUEST_PROFILING_SAMPLE_RATE = float(
+    os.environ.get("GGRC_PROFILING_SAMPLE_RATE", "0"))
+# Sampled requests slower than this number of seconds get their cProfile
+# stats logged or saved, 0 disables cProfile
+REQUEST_PROFILING_SLOW_THRESHOLD = float(
+    os.environ.get("GGRC_PROFILING_SLOW_THRESHOLD", "0"))
+# Directory for .prof files of slow requests, stats are logged if not set
+REQUEST_PROFILING_DUMP_DIR = os.environ.get("GGRC_PROFILING_DUMP_DIR", "")
+
 
 LOGGING_HANDLER = {
     "class": "logging.StreamHandler",
@@ -155,6 +203,10 @@ if bool(os.environ.get("DASHBOARD_INTEGRATION", "")):
 else:
   DASHBOARD_INTEGRATION = None
 
+# Number of rows counted for an approximate total of a query API page
+QUERY_API_APPROXIMATE_TOTAL = int(
+    os.environ.get("GGRC_QUERY_API_APPROXIMATE_TOTAL", "10000"))
+
 # App2app QueryAPI endpoints
 ALLOWED_QUERYAPI_APP_IDS = os.environ.get(
     "ALLOWED_QUERYAPI_APP_IDS",
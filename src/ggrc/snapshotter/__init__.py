@@ -8,6 +8,7 @@ snapshot object represent a join between parent object (Audit),
 child object (e.g. Control, Regulation, ...) and a particular revision.
 """
 
+import collections
 from logging import getLogger
 
 from sqlalchemy.sql.expression import tuple_
@@ -15,8 +16,12 @@ from sqlalchemy.sql.expression import bindparam
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
+from ggrc.cache import relationship_graph
 from ggrc.login import get_current_user_id
+from ggrc.models.revision import refresh_latest_revisions
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 
 from ggrc.snapshotter.datastructures import Attr
 from ggrc.snapshotter.datastructures import Pair
@@ -250,7 +255,7 @@ class SnapshotGenerator(object):
           revision_payload += [data]
 
       with benchmark("Insert Snapshot entries into Revision"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._insert_revisions(revision_payload)
       return OperationResponse("update", True, for_update, response_data)
 
   def analyze(self):
@@ -278,6 +283,42 @@ class SnapshotGenerator(object):
   def upsert(self, event, revisions, _filter):
     return self._upsert(event=event, revisions=revisions, _filter=_filter)
 
+  def upsert_pairs(self, pairs, event, revisions):
+    """Update and create snapshots of the given pairs and reindex them.
+
+    Unlike upsert, snapshot relationships are not copied, so that the scope
+    can be processed in several chunks.
+
+    Args:
+      pairs: A set of pairs from the scopes of the parent objects.
+      event: A ggrc.models.Event instance
+      revisions: A set of tuples of pairs with revisions to which it should
+        either create or update a snapshot of that particular audit
+    Returns:
+      A set of pairs whose snapshots were updated or created.
+    """
+    existing = {Pair.from_4tuple(fields) for fields in db.session.query(
+        models.Snapshot.parent_type,
+        models.Snapshot.parent_id,
+        models.Snapshot.child_type,
+        models.Snapshot.child_id,
+    ).filter(tuple_(
+        models.Snapshot.parent_type, models.Snapshot.parent_id,
+        models.Snapshot.child_type, models.Snapshot.child_id
+    ).in_({pair.to_4tuple() for pair in pairs}))}
+    for_update = pairs & existing
+    for_create = pairs - existing
+    updated, created = set(), set()
+    if for_update:
+      updated = self._update(for_update=for_update, event=event,
+                             revisions=revisions, _filter=None).response
+    if for_create:
+      created = self._create(for_create=for_create, event=event,
+                             revisions=revisions, _filter=None).response
+    if not self.dry_run:
+      reindex_pairs(updated | created)
+    return updated | created
+
   def _upsert(self, event, revisions, _filter):
     """Update and (if needed) create snapshots
 
@@ -328,6 +369,18 @@ class SnapshotGenerator(object):
       engine = db.engine
       engine.execute(operation, data)
       db.session.commit()
+      relationship_graph.mark_changed()
+
+  def _insert_revisions(self, revision_payload):
+    """Insert revisions and store them as latest revisions of objects."""
+    self._execute(models.Revision.__table__.insert(), revision_payload)
+    if revision_payload and not self.dry_run:
+      resource_ids = collections.defaultdict(set)
+      for revision in revision_payload:
+        resource_ids[revision["resource_type"]].add(revision["resource_id"])
+      for resource_type, ids in resource_ids.iteritems():
+        refresh_latest_revisions(resource_type, ids)
+      db.session.commit()
 
   def create(self, event, revisions, _filter=None):
     """Create snapshots of parent object's neighborhood per provided rules
@@ -438,7 +491,7 @@ class SnapshotGenerator(object):
             revision_payload += [data]
 
       with benchmark("Snapshot._create.write revisions to database"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._insert_revisions(revision_payload)
       return OperationResponse("create", True, for_create, response_data)
 
   def _copy_snapshot_relationships(self):
@@ -484,6 +537,7 @@ class SnapshotGenerator(object):
           "user_id": get_current_user_id(),
           "parent_id": parent.id
       })
+    relationship_graph.mark_changed(db.session())
 
 
 def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
@@ -523,6 +577,52 @@ def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
     return generator.upsert(event=event, revisions=revisions, _filter=_filter)
 
 
+def upsert_snapshots_in_chunks(obj, event, revisions=None, last_pair=None,
+                               progress_callback=None):
+  """Update and create snapshots of a parent object chunk by chunk.
+
+  Pairs of the scope are processed in a stable order and every chunk is
+  committed before the next one, so an interrupted run can be resumed after
+  the last processed pair.
+
+  Args:
+    obj: Parent object (e.g. Audit).
+    event: A ggrc.models.Event instance
+    revisions: A set of tuples of pairs with revisions to which it should
+      either create or update a snapshot of that particular audit
+    last_pair: 4-tuple of the last pair processed by an interrupted run.
+    progress_callback: function that receives a dict with "done", "total"
+      and "last_pair" keys after every chunk.
+  """
+  if not revisions:
+    revisions = set()
+
+  with benchmark("Snapshot.upsert_snapshots_in_chunks"):
+    generator = SnapshotGenerator(dry_run=False)
+    generator.add_parent(obj)
+    for_create, for_update = generator.analyze()
+    pairs = sorted(for_create | for_update, key=Pair.to_4tuple)
+    total = len(pairs)
+    if last_pair is not None:
+      last_pair = tuple(last_pair)
+      pairs = [pair for pair in pairs if pair.to_4tuple() > last_pair]
+    done = total - len(pairs)
+    for chunk in list_chunks(pairs, settings.SNAPSHOT_JOB_CHUNK_SIZE):
+      with benchmark("Snapshot.upsert_snapshots_in_chunks.chunk"):
+        generator.upsert_pairs(set(chunk), event, revisions)
+        db.session.commit()
+      done += len(chunk)
+      if progress_callback:
+        progress_callback({
+            "done": done,
+            "total": total,
+            "last_pair": chunk[-1].to_4tuple(),
+        })
+    # pylint: disable=protected-access
+    generator._copy_snapshot_relationships()
+    db.session.commit()
+
+
 def clone_scope(base_parent, new_parent, event):
   """Create exact copy of parent object scope.
 
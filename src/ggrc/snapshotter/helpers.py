@@ -3,20 +3,103 @@
 
 """Various simple helper functions for snapshot generator"""
 
-import collections
 from logging import getLogger
 
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.revision import LatestRevision
 from ggrc.snapshotter.datastructures import Stub
-from ggrc.snapshotter.datastructures import Pair
 from ggrc.utils import benchmark
+from ggrc.utils import list_chunks
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
 
+def _get_history_revision_ids(children, filters):
+  """Get ids of the latest revisions from the whole history of children.
+
+  Returns:
+    dict of child stubs and their latest revision ids.
+  """
+  query = db.session.query(
+      models.Revision.id,
+      models.Revision.resource_type,
+      models.Revision.resource_id,
+  ).filter(
+      tuple_(
+          models.Revision.resource_type,
+          models.Revision.resource_id,
+      ).in_(children)
+  )
+  for _filter in filters:
+    query = query.filter(_filter)
+  latest = dict()
+  for revid, restype, resid in query:
+    child = Stub(restype, resid)
+    latest[child] = max(latest.get(child, 0), revid)
+  return latest
+
+
+def _get_latest_revision_ids(children, filters):
+  """Get ids of the latest revisions of children that match filters.
+
+  The latest revision of every child is read from the latest_revisions
+  table. The whole revision history is only read for children without
+  a stored latest revision and for children whose latest revision does not
+  match the filters (e.g. deleted objects).
+
+  Returns:
+    dict of child stubs and their latest revision ids.
+  """
+  latest = dict()
+  for children_chunk in list_chunks(list(children)):
+    query = db.session.query(
+        LatestRevision.revision_id,
+        LatestRevision.resource_type,
+        LatestRevision.resource_id,
+    ).filter(
+        tuple_(
+            LatestRevision.resource_type,
+            LatestRevision.resource_id,
+        ).in_(children_chunk)
+    )
+    if filters:
+      query = query.join(
+          models.Revision,
+          models.Revision.id == LatestRevision.revision_id,
+      )
+      for _filter in filters:
+        query = query.filter(_filter)
+    for revid, restype, resid in query:
+      latest[Stub(restype, resid)] = revid
+  missing = set(children) - set(latest)
+  if missing:
+    latest.update(_get_history_revision_ids(missing, filters))
+  return latest
+
+
+def _get_requested_revision_ids(requested, filters):
+  """Get ids of requested revisions that exist in the history of children.
+
+  Args:
+    requested: dict of pairs and requested revision ids.
+  Returns:
+    set of (child, revision_id) tuples of found revisions.
+  """
+  query = db.session.query(
+      models.Revision.id,
+      models.Revision.resource_type,
+      models.Revision.resource_id,
+  ).filter(
+      models.Revision.id.in_(set(requested.values()))
+  )
+  for _filter in filters:
+    query = query.filter(_filter)
+  return {(Stub(restype, resid), revid) for revid, restype, resid in query}
+
+
 def get_revisions(pairs, revisions, filters=None):
   """Retrieve revision ids for pairs
 
@@ -30,44 +113,29 @@ def get_revisions(pairs, revisions, filters=None):
   """
   with benchmark("snapshotter.helpers.get_revisions"):
     revision_id_cache = dict()
+    filters = filters or []
 
     if pairs:
-      with benchmark("get_revisions.create caches"):
-        child_stubs = {pair.child for pair in pairs}
-
-        with benchmark("get_revisions.create child -> parents cache"):
-          parents_cache = collections.defaultdict(set)
-          for parent, child in pairs:
-            parents_cache[child].add(parent)
-
-      with benchmark("get_revisions.retrieve revisions"):
-        query = db.session.query(
-            models.Revision.id,
-            models.Revision.resource_type,
-            models.Revision.resource_id).filter(
-            tuple_(
-                models.Revision.resource_type,
-                models.Revision.resource_id).in_(child_stubs)
-        ).order_by(models.Revision.id.desc())
-        if filters:
-          for _filter in filters:
-            query = query.filter(_filter)
-
-      with benchmark("get_revisions.create revision_id cache"):
-        for revid, restype, resid in query:
-          child = Stub(restype, resid)
-          for parent in parents_cache[child]:
-            key = Pair(parent, child)
-            if key in revisions:
-              if revid == revisions[key]:
-                revision_id_cache[key] = revid
-              else:
-                logger.warning(
-                    "Specified revision for object %s but couldn't find the"
-                    "revision '%s' in object history", key, revisions[key])
-            else:
-              if key not in revision_id_cache:
-                revision_id_cache[key] = revid
+      requested = {pair: revisions[pair] for pair in pairs
+                   if pair in revisions}
+      if requested:
+        with benchmark("get_revisions.retrieve requested revisions"):
+          found = _get_requested_revision_ids(requested, filters)
+        for pair, revid in requested.iteritems():
+          if (pair.child, revid) in found:
+            revision_id_cache[pair] = revid
+          else:
+            logger.warning(
+                "Specified revision for object %s but couldn't find the"
+                "revision '%s' in object history", pair, revid)
+
+      children = {pair.child for pair in pairs if pair not in requested}
+      if children:
+        with benchmark("get_revisions.retrieve latest revisions"):
+          latest = _get_latest_revision_ids(children, filters)
+        for pair in pairs:
+          if pair not in requested and pair.child in latest:
+            revision_id_cache[pair] = latest[pair.child]
     return revision_id_cache
 
 
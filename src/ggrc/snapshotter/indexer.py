@@ -4,7 +4,7 @@
 """Manage indexing for snapshotter service"""
 
 import logging
-from collections import defaultdict
+from collections import defaultdict, namedtuple, OrderedDict
 import itertools
 
 from sqlalchemy.sql.expression import tuple_
@@ -15,8 +15,9 @@ from ggrc import models
 from ggrc.models import all_models
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.fulltext import get_indexer
+from ggrc.fulltext import shadow
 from ggrc.models.reflection import AttributeInfo
-from ggrc.utils import generate_query_chunks
+from ggrc.utils import generate_query_chunks, list_chunks
 
 from ggrc.snapshotter.rules import Types
 from ggrc.snapshotter.datastructures import Pair
@@ -55,6 +56,32 @@ PARENT_PROPERTY_TMPL = u"{parent_type}-{parent_id}"
 CHILD_PROPERTY_TMPL = u"{child_type}-{child_id}"
 
 
+# Maximal number of rows in a single multi-row INSERT of records.
+INSERT_CHUNK_SIZE = 1000
+
+# Maximal number of revisions with searchable attributes kept by IndexCache.
+REVISION_CACHE_SIZE = 5000
+
+
+class CadInfo(namedtuple("CadInfo", ["id", "title", "attribute_type"])):
+  """Custom attribute definition data needed for indexing.
+
+  Unlike CustomAttributeDefinition instances these stay usable after the
+  session that loaded them is committed.
+  """
+  # pylint: disable=no-member
+
+  @property
+  def default_value(self):
+    return models.CustomAttributeDefinition.ValidTypes.DEFAULT_VALUE.get(
+        self.attribute_type)
+
+  def get_indexed_value(self, value):
+    value_mapping = (models.CustomAttributeDefinition.ValidTypes.
+                     DEFAULT_VALUE_MAPPING.get(self.attribute_type) or {})
+    return value_mapping.get(value, value)
+
+
 def _get_custom_attribute_dict():
   """Get fulltext indexable properties for all snapshottable objects
 
@@ -69,17 +96,124 @@ def _get_custom_attribute_dict():
       getattr(all_models, c)._inflector.table_singular: c for c in Types.all
   }
 
-  query = models.CustomAttributeDefinition.query.filter(
+  query = db.session.query(
+      models.CustomAttributeDefinition.id,
+      models.CustomAttributeDefinition.title,
+      models.CustomAttributeDefinition.attribute_type,
+      models.CustomAttributeDefinition.definition_type,
+  ).filter(
       models.CustomAttributeDefinition.definition_type.in_(
           cadef_klass_names.keys()
       )
   )
   cads = defaultdict(list)
-  for cad in query:
-    cads[cadef_klass_names[cad.definition_type]].append(cad)
+  for id_, title, attribute_type, definition_type in query:
+    cads[cadef_klass_names[definition_type]].append(
+        CadInfo(id_, title, attribute_type))
   return cads
 
 
+class IndexCache(object):
+  """Lookups shared by all chunks of a single snapshot reindex.
+
+  Custom attribute definitions are loaded once and searchable attributes
+  are computed once for every revision, because revisions are shared by
+  snapshots of different audits. People and access control roles referenced
+  by a chunk are loaded with a single query into the cache of the record
+  builders, see ``ggrc.fulltext.recordbuilder``.
+  """
+
+  def __init__(self):
+    self._cads = None
+    self._revisions = OrderedDict()
+
+  @property
+  def cads(self):
+    if self._cads is None:
+      self._cads = _get_custom_attribute_dict()
+    return self._cads
+
+  def get_revisions(self, revision_ids):
+    """Get searchable attributes of revisions.
+
+    Args:
+      revision_ids: set of revision ids.
+    Returns:
+      dict of revision ids and searchable attributes of their content.
+    """
+    result = {id_: self._revisions[id_] for id_ in revision_ids
+              if id_ in self._revisions}
+    missing = [id_ for id_ in revision_ids if id_ not in result]
+    for ids in list_chunks(missing):
+      query = models.Revision.query.filter(
+          models.Revision.id.in_(ids)
+      ).options(
+          orm.load_only(
+              "id",
+              "resource_type",
+              "resource_id",
+              "_content",
+              "created_at",
+              "updated_at",
+          )
+      )
+      for revision in query:
+        result[revision.id] = get_searchable_attributes(
+            CLASS_PROPERTIES[revision.resource_type],
+            self.cads[revision.resource_type],
+            revision.content)
+    for id_ in missing:
+      if id_ in result:
+        self._revisions[id_] = result[id_]
+    while len(self._revisions) > REVISION_CACHE_SIZE:
+      self._revisions.popitem(last=False)
+    return result
+
+  @staticmethod
+  def load_references(values):
+    """Load people and roles referenced by property values in bulk."""
+    person_ids, role_ids = _get_referenced_ids(values)
+    cache = get_indexer().cache
+    person_ids -= set(cache["people_map"])
+    for ids in list_chunks(list(person_ids)):
+      cache["people_map"].update(
+          (id_, (name, email)) for id_, name, email in db.session.query(
+              all_models.Person.id,
+              all_models.Person.name,
+              all_models.Person.email,
+          ).filter(all_models.Person.id.in_(ids))
+      )
+    role_ids -= set(cache["ac_role_map"])
+    if role_ids:
+      cache["ac_role_map"].update(db.session.query(
+          all_models.AccessControlRole.id,
+          all_models.AccessControlRole.name,
+      ).filter(all_models.AccessControlRole.id.in_(role_ids)))
+
+
+def _get_referenced_ids(values):
+  """Get ids of people and access control roles used in property values.
+
+  Returns:
+    tuple of sets of person ids and access control role ids.
+  """
+  person_ids = set()
+  role_ids = set()
+  for value in values:
+    items = value if isinstance(value, list) else [value]
+    for item in items:
+      if not isinstance(item, dict):
+        continue
+      if item.get("type") == "Person":
+        person_ids.add(item.get("id"))
+      if "ac_role_id" in item:
+        role_ids.add(item["ac_role_id"])
+        person_ids.add(item.get("person_id"))
+  person_ids.discard(None)
+  role_ids.discard(None)
+  return person_ids, role_ids
+
+
 def get_searchable_attributes(attributes, cads, content):
   """Get all searchable attributes for a given object that should be indexed
 
@@ -117,14 +251,23 @@ def reindex():
       models.Snapshot.child_type,
       models.Snapshot.child_id,
   )
-  for query_chunk in generate_query_chunks(columns):
+  cache = IndexCache()
+  for query_chunk in generate_query_chunks(columns, key=models.Snapshot.id):
     pairs = {Pair.from_4tuple(p) for p in query_chunk}
-    reindex_pairs(pairs)
+    reindex_pairs(pairs, cache=cache)
     db.session.commit()
 
 
-def reindex_snapshots(snapshot_ids):
-  """Reindex selected snapshots"""
+def reindex_snapshots(snapshot_ids, table=None, cache=None, token_table=None):
+  """Reindex selected snapshots
+
+  Args:
+    snapshot_ids: ids of snapshots that should be reindexed.
+    table: table for the records, the full text record table by default.
+    cache: IndexCache shared with other reindexed chunks.
+    token_table: table for the search tokens, the indexer token table by
+      default.
+  """
   if not snapshot_ids:
     return
   columns = db.session.query(
@@ -133,34 +276,54 @@ def reindex_snapshots(snapshot_ids):
       models.Snapshot.child_type,
       models.Snapshot.child_id,
   ).filter(models.Snapshot.id.in_(snapshot_ids))
-  for query_chunk in generate_query_chunks(columns):
+  if cache is None:
+    cache = IndexCache()
+  for query_chunk in generate_query_chunks(columns, key=models.Snapshot.id):
     pairs = {Pair.from_4tuple(p) for p in query_chunk}
-    reindex_pairs(pairs)
+    reindex_pairs(pairs, table, cache, token_table)
     db.session.commit()
 
 
-def delete_records(snapshot_ids):
+def delete_records(snapshot_ids, table=None, commit=True):
   """Delete all records for some snapshots.
   Args:
     snapshot_ids: An iterable with snapshot IDs whose full text records should
         be deleted.
+    table: table for the records, the full text record table by default.
+    commit: commit the session after the records are deleted.
   """
-  db.session.query(Record).filter(
-      Record.type == "Snapshot",
-      Record.key.in_(snapshot_ids)
-  ).delete(synchronize_session=False)
-  db.session.commit()
+  if table is None:
+    db.session.query(Record).filter(
+        Record.type == "Snapshot",
+        Record.key.in_(snapshot_ids)
+    ).delete(synchronize_session=False)
+  else:
+    db.session.execute(table.delete().where(
+        table.c.type == "Snapshot"
+    ).where(
+        table.c.key.in_(snapshot_ids)
+    ))
+  if commit:
+    db.session.commit()
 
 
-def insert_records(payload):
+def insert_records(payload, table=None, commit=True):
   """Insert records to full text table.
 
+  Records are inserted with multi-row INSERT statements in the transaction
+  of the session.
+
   Args:
     payload: List of dictionaries that represent records entries.
+    table: table for the records, the full text record table by default.
+    commit: commit the session after the records are inserted.
   """
-  engine = db.engine
-  engine.execute(Record.__table__.insert(), payload)
-  db.session.commit()
+  if table is None:
+    table = Record.__table__
+  for rows in list_chunks(payload, INSERT_CHUNK_SIZE):
+    db.session.execute(table.insert().values(rows))
+  if commit:
+    db.session.commit()
 
 
 def get_person_data(rec, person):
@@ -294,17 +457,39 @@ def get_record_value(prop, val, rec):
   return []
 
 
-def reindex_pairs(pairs):
+def reindex_pairs(pairs, table=None, cache=None, token_table=None):
   """Reindex selected snapshots.
 
+  Pairs are reindexed in chunks and records of every chunk are replaced in a
+  single transaction.
+
   Args:
     pairs: A list of parent-child pairs that uniquely represent snapshot
     object whose properties should be reindexed.
+    table: table for the records, the full text record table by default.
+    cache: IndexCache shared with other reindexed chunks.
+    token_table: table for the search tokens, the indexer token table by
+      default.
   """
   if not pairs:
     return
-  snapshots = dict()
-  snapshot_query = models.Snapshot.query.filter(
+  if cache is None:
+    cache = IndexCache()
+  for pairs_chunk in list_chunks(list(pairs)):
+    _reindex_pairs_chunk(pairs_chunk, table, cache, token_table)
+
+
+def _reindex_pairs_chunk(pairs, table, cache, token_table=None):
+  """Replace records of a single chunk of snapshots."""
+  snapshot_query = db.session.query(
+      models.Snapshot.id,
+      models.Snapshot.context_id,
+      models.Snapshot.parent_type,
+      models.Snapshot.parent_id,
+      models.Snapshot.child_type,
+      models.Snapshot.child_id,
+      models.Snapshot.revision_id,
+  ).filter(
       tuple_(
           models.Snapshot.parent_type,
           models.Snapshot.parent_id,
@@ -313,41 +498,23 @@ def reindex_pairs(pairs):
       ).in_(
           {pair.to_4tuple() for pair in pairs}
       )
-  ).options(
-      orm.subqueryload("revision").load_only(
-          "id",
-          "resource_type",
-          "resource_id",
-          "_content",
-      ),
-      orm.load_only(
-          "id",
-          "context_id",
-          "parent_type",
-          "parent_id",
-          "child_type",
-          "child_id",
-          "revision_id",
-      )
   )
-  cad_dict = _get_custom_attribute_dict()
-  for snapshot in snapshot_query:
-    revision = snapshot.revision
-    snapshots[snapshot.id] = {
-        "id": snapshot.id,
-        "context_id": snapshot.context_id,
-        "parent_type": snapshot.parent_type,
-        "parent_id": snapshot.parent_id,
-        "child_type": snapshot.child_type,
-        "child_id": snapshot.child_id,
-        "revision": get_searchable_attributes(
-            CLASS_PROPERTIES[revision.resource_type],
-            cad_dict[revision.resource_type],
-            revision.content)
-    }
+  # pylint: disable=protected-access
+  snapshots = [row._asdict() for row in snapshot_query]
+  if not snapshots:
+    return
+  revisions = cache.get_revisions({s["revision_id"] for s in snapshots})
+  snapshot_properties = []
+  for snapshot in snapshots:
+    snapshot["revision"] = revisions[snapshot["revision_id"]]
+    snapshot_properties.append((snapshot, get_properties(snapshot)))
+  cache.load_references(
+      val for _, properties in snapshot_properties
+      for val in properties.itervalues()
+  )
   search_payload = []
-  for snapshot in snapshots.values():
-    for prop, val in get_properties(snapshot).items():
+  for snapshot, properties in snapshot_properties:
+    for prop, val in properties.items():
       search_payload.extend(
           get_record_value(
               prop,
@@ -361,5 +528,11 @@ def reindex_pairs(pairs):
               }
           )
       )
-  delete_records(snapshots.keys())
-  insert_records(search_payload)
+  snapshot_ids = [s["id"] for s in snapshots]
+  if table is None:
+    shadow.record_changes(("Snapshot", id_) for id_ in snapshot_ids)
+  delete_records(snapshot_ids, table, commit=False)
+  insert_records(search_payload, table, commit=False)
+  get_indexer().update_tokens("Snapshot", snapshot_ids, search_payload,
+                              token_table)
+  db.session.commit()
@@ -4,19 +4,45 @@
 """Register various listeners needed for snapshot operation"""
 
 from ggrc import models
+from ggrc import settings
 from ggrc.services import signals
 from ggrc.snapshotter import create_snapshots
+from ggrc.snapshotter import SnapshotGenerator
 from ggrc.snapshotter import upsert_snapshots
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.rules import get_rules
 
 
+def _run_async(obj, snapshot_settings):
+  """Check if snapshots of the object should be handled by a background task.
+
+  That is the case if the client asked for it with "async" snapshot setting
+  or if the scope of the object exceeds SNAPSHOT_ASYNC_THRESHOLD.
+  """
+  if snapshot_settings and snapshot_settings.get("async"):
+    return True
+  threshold = getattr(settings, "SNAPSHOT_ASYNC_THRESHOLD", 0)
+  if threshold <= 0:
+    return False
+  generator = SnapshotGenerator(dry_run=True)
+  generator.add_parent(obj)
+  return len(generator.children) > threshold
+
+
+def _start_job(obj, event, revisions=None):
+  from ggrc import views
+  views.start_upsert_snapshots(obj, event, revisions)
+
+
 def create_all(sender, obj=None, src=None, service=None, event=None):  # noqa
   """Creates snapshots."""
   del sender, service  # Unused
   # We use "operation" for non-standard operations (e.g. cloning)
   if not src.get("operation"):
-    create_snapshots(obj, event)
+    if _run_async(obj, src.get("snapshots")):
+      _start_job(obj, event)
+    else:
+      create_snapshots(obj, event)
 
 
 def upsert_all(
@@ -27,6 +53,9 @@ def upsert_all(
   snapshot_settings = src.get("snapshots")
   if snapshot_settings:
     if snapshot_settings["operation"] == "upsert":
+      if _run_async(obj, snapshot_settings):
+        _start_job(obj, event, snapshot_settings.get("revisions") or [])
+        return
       revisions = {
           (Stub.from_dict(revision["parent"]),
            Stub.from_dict(revision["child"])): revision["revision_id"]
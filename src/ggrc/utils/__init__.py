@@ -254,11 +254,106 @@ def iso_to_us_date(date_string):
   return convert_date_format(date_string, DATE_FORMAT_ISO, DATE_FORMAT_US)
 
 
-def generate_query_chunks(query, chunk_size=1000):
-  """Make a generator splitting `query` into chunks of size `chunk_size`."""
-  count = query.count()
-  for offset in range(0, count, chunk_size):
-    yield query.order_by("id").limit(chunk_size).offset(offset)
+def _get_key_columns(query, key=None):
+  """Get a tuple of columns by which rows of `query` are ordered in chunks.
+
+  Args:
+    query: query for which we want the key columns.
+    key: a column or a tuple of columns with unique values. The primary key of
+      the mapper of the first entity of the query is used if it is not given,
+      so queries of aliased entities need an explicit key.
+  """
+  if key is None:
+    # pylint: disable=protected-access
+    mapper = query._mapper_zero()
+    if mapper is None:
+      raise ValueError("Key columns are required for query {}".format(query))
+    return tuple(mapper.primary_key)
+  if isinstance(key, (tuple, list)):
+    return tuple(key)
+  return (key,)
+
+
+def _after_key(columns, values):
+  """Get a condition for rows with key columns greater than `values`."""
+  conditions = []
+  for i, column in enumerate(columns):
+    conditions.append(sqlalchemy.and_(
+        column > values[i],
+        *[prev_column == prev_value
+          for prev_column, prev_value in zip(columns[:i], values[:i])]
+    ))
+  return sqlalchemy.or_(*conditions)
+
+
+def generate_query_chunks(query, chunk_size=1000, key=None):
+  """Make a generator splitting `query` into chunks of size `chunk_size`.
+
+  Chunks are walked by key values greater than the last key of the previous
+  chunk instead of by row offsets, so reading a chunk does not scan the rows
+  of all previous chunks.
+
+  Args:
+    query: query that should be split into chunks.
+    chunk_size: maximal number of rows in a single chunk.
+    key: a column or a tuple of columns with unique values, e.g. for tables
+      without a single id column. The primary key of the first entity of the
+      query is used by default.
+
+  Yields:
+    queries for consecutive chunks of rows ordered by the key columns.
+  """
+  columns = _get_key_columns(query, key)
+  last = None
+  while True:
+    chunk = query.order_by(None)
+    if last is not None:
+      chunk = chunk.filter(_after_key(columns, last))
+    keys = chunk.with_entities(*columns).order_by(
+        *columns).limit(chunk_size).all()
+    if not keys:
+      return
+    last = tuple(keys[-1])
+    yield chunk.filter(
+        sqlalchemy.not_(_after_key(columns, last))
+    ).order_by(*columns)
+
+
+def partition_query(query, partitions, key=None):
+  """Split `query` into queries of disjoint key ranges of similar sizes.
+
+  Partitions can be processed in parallel, e.g. with generate_query_chunks in
+  separate worker processes.
+
+  Args:
+    query: query that should be split.
+    partitions: maximal number of returned queries.
+    key: key columns, same as in generate_query_chunks.
+
+  Returns:
+    list of queries that together return all rows of `query`.
+  """
+  columns = _get_key_columns(query, key)
+  query = query.order_by(None)
+  size = max(-(-query.count() // partitions), 1)
+  result = []
+  remaining = query
+  for _ in range(partitions - 1):
+    boundary = remaining.with_entities(*columns).order_by(
+        *columns).offset(size - 1).first()
+    if boundary is None:
+      break
+    last = tuple(boundary)
+    result.append(remaining.filter(sqlalchemy.not_(_after_key(columns, last))))
+    remaining = query.filter(_after_key(columns, last))
+  result.append(remaining)
+  return result
+
+
+def list_chunks(items, chunk_size=1000):
+  """Make a generator splitting list `items` into chunks of `chunk_size`."""
+  for offset in range(0, len(items), chunk_size):
+    yield items[offset:offset + chunk_size]
 
 
 def create_stub(object_, context_id=None):
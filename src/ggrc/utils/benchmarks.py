@@ -12,10 +12,13 @@ in ``DEBUG`` level within ``settings`` module:
         "ggrc.utils.benchmarks": "DEBUG",
     }
 
+Durations of all benchmarks are also reported to the recorder set by
+``set_recorder`` for the current thread, see ``ggrc.utils.profiling``.
 """
 
 import inspect
 import logging
+import threading
 import time
 from collections import defaultdict
 
@@ -24,6 +27,22 @@ from ggrc import settings
 
 logger = logging.getLogger(__name__)
 
+_local = threading.local()
+
+
+def set_recorder(recorder):
+  """Set a callable that gets message and duration of every benchmark.
+
+  The recorder is set for the current thread only, None removes it.
+  """
+  _local.recorder = recorder
+
+
+def _record(message, duration):
+  recorder = getattr(_local, "recorder", None)
+  if recorder is not None:
+    recorder(message, duration)
+
 
 class BenchmarkContextManager(object):
   """Default benchmark context manager.
@@ -43,8 +62,9 @@ class BenchmarkContextManager(object):
     self.start = time.time()
 
   def __exit__(self, exc_type, exc_value, exc_trace):
-    end = time.time()
-    logger.debug("%.4f %s", end - self.start, self.message)
+    duration = time.time() - self.start
+    logger.debug("%.4f %s", duration, self.message)
+    _record(self.message, duration)
 
 
 class DebugBenchmark(object):
@@ -63,7 +83,8 @@ class DebugBenchmark(object):
   simple addition with func_name given. If func name is not given the it will
   run about 200 times slower than simple addition.
 
-  For more precise measurements uncomment the c profiler in ggrc.__main__.
+  For more precise measurements uncomment the c profiler in ggrc.__main__ or
+  enable sampled request profiling, see ggrc.utils.profiling.
   """
 
   _depth = 0
@@ -129,6 +150,7 @@ class DebugBenchmark(object):
     duration = time.time() - self.start
     DebugBenchmark._depth -= 1
     self.update_stats(duration)
+    _record(self.message, duration)
     if not self.quiet and self._summary in {"all", "last"}:
       msg = self.form.format(
           prefix=self.PREFIX * DebugBenchmark._depth,
@@ -0,0 +1,279 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Sampled request profiling.
+
+``ProfilingMiddleware`` instruments the share of requests set by
+``REQUEST_PROFILING_SAMPLE_RATE``. For every endpoint the worker keeps
+histograms of request durations and SQL query counts, the total SQL time and
+the time spent in every named ``benchmark`` block. Stats of the worker are
+served by ``/admin/profiling`` and every sampled request is logged by the
+``ggrc.utils.profiling`` logger in ``INFO`` level.
+
+If ``REQUEST_PROFILING_SLOW_THRESHOLD`` is set, sampled requests also run
+under cProfile. Profiles of requests slower than the threshold are written
+to ``REQUEST_PROFILING_DUMP_DIR`` or logged when no directory is set.
+
+Durations are measured until the WSGI app returns the response, so streamed
+response bodies are not included.
+"""
+
+import bisect
+import cProfile
+import logging
+import os
+import pstats
+import random
+import re
+import StringIO
+import threading
+import time
+from collections import defaultdict
+
+import sqlalchemy as sa
+from werkzeug.exceptions import HTTPException
+
+from ggrc import settings
+from ggrc.utils import benchmarks
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of histogram buckets, the last bucket has no upper bound
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Number of functions in logged cProfile stats
+PROFILE_STATS_LINES = 30
+
+_QUERY_START_KEY = "profiling_query_start"
+
+_local = threading.local()
+
+
+class Histogram(object):
+  """Counts of values in buckets with the given upper bounds."""
+
+  def __init__(self, bounds):
+    self.bounds = bounds
+    self.counts = [0] * (len(bounds) + 1)
+
+  def add(self, value):
+    self.counts[bisect.bisect_left(self.bounds, value)] += 1
+
+  def to_dict(self):
+    return {
+        "buckets": list(self.bounds) + [None],
+        "counts": list(self.counts),
+    }
+
+
+class RequestProfile(object):
+  """Measurements of a single sampled request."""
+
+  def __init__(self, method, endpoint):
+    self.method = method
+    self.endpoint = endpoint
+    self.status = None
+    self.start = time.time()
+    self.duration = 0
+    self.queries = 0
+    self.sql_time = 0
+    self.benchmarks = defaultdict(lambda: [0, 0])
+
+  def add_query(self, duration):
+    self.queries += 1
+    self.sql_time += duration
+
+  def add_benchmark(self, message, duration):
+    stats = self.benchmarks[message]
+    stats[0] += 1
+    stats[1] += duration
+
+  def finish(self):
+    self.duration = time.time() - self.start
+
+  def __str__(self):
+    blocks = sorted(self.benchmarks.items(), key=lambda item: -item[1][1])
+    return "{} {} {} {:.4f}s, {} queries in {:.4f}s{}".format(
+        self.method, self.endpoint, self.status, self.duration, self.queries,
+        self.sql_time, "".join(
+            ", {}: {:.4f}s".format(message, duration)
+            for message, (_, duration) in blocks
+        ),
+    )
+
+
+class EndpointStats(object):
+  """Aggregated measurements of sampled requests of an endpoint."""
+
+  def __init__(self):
+    self.count = 0
+    self.time = 0
+    self.max_time = 0
+    self.queries = 0
+    self.sql_time = 0
+    self.statuses = defaultdict(int)
+    self.durations = Histogram(DURATION_BUCKETS)
+    self.query_counts = Histogram(QUERY_COUNT_BUCKETS)
+    self.benchmarks = defaultdict(lambda: [0, 0])
+
+  def add(self, profile):
+    """Add measurements of a request."""
+    self.count += 1
+    self.time += profile.duration
+    self.max_time = max(self.max_time, profile.duration)
+    self.queries += profile.queries
+    self.sql_time += profile.sql_time
+    self.statuses[profile.status] += 1
+    self.durations.add(profile.duration)
+    self.query_counts.add(profile.queries)
+    for message, (count, duration) in profile.benchmarks.iteritems():
+      stats = self.benchmarks[message]
+      stats[0] += count
+      stats[1] += duration
+
+  def to_dict(self):
+    return {
+        "count": self.count,
+        "time": self.time,
+        "avg_time": self.time / self.count,
+        "max_time": self.max_time,
+        "queries": self.queries,
+        "sql_time": self.sql_time,
+        "statuses": dict(self.statuses),
+        "durations": self.durations.to_dict(),
+        "query_counts": self.query_counts.to_dict(),
+        "benchmarks": {
+            message: {"count": count, "time": duration}
+            for message, (count, duration) in self.benchmarks.iteritems()
+        },
+    }
+
+
+class ProfilingStats(object):
+  """Stats of sampled requests of this worker by endpoint."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.started_at = time.time()
+    self.endpoints = {}
+
+  def add(self, profile):
+    key = "{} {}".format(profile.method, profile.endpoint)
+    with self._lock:
+      if key not in self.endpoints:
+        self.endpoints[key] = EndpointStats()
+      self.endpoints[key].add(profile)
+
+  def clear(self):
+    with self._lock:
+      self.started_at = time.time()
+      self.endpoints = {}
+
+  def to_dict(self):
+    with self._lock:
+      return {
+          "started_at": self.started_at,
+          "sample_rate": getattr(settings, "REQUEST_PROFILING_SAMPLE_RATE", 0),
+          "endpoints": {key: stats.to_dict()
+                        for key, stats in self.endpoints.iteritems()},
+      }
+
+
+stats = ProfilingStats()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+  # pylint: disable=unused-argument,too-many-arguments
+  if getattr(_local, "profile", None) is not None:
+    conn.info.setdefault(_QUERY_START_KEY, []).append(time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+  # pylint: disable=unused-argument,too-many-arguments
+  profile = getattr(_local, "profile", None)
+  starts = conn.info.get(_QUERY_START_KEY)
+  if profile is not None and starts:
+    profile.add_query(time.time() - starts.pop())
+
+
+class ProfilingMiddleware(object):
+  """WSGI middleware that profiles a sample of requests of a Flask app."""
+
+  def __init__(self, app, sample_rate, slow_threshold=0, dump_dir=None):
+    self.app = app
+    self.wsgi_app = app.wsgi_app
+    self.sample_rate = sample_rate
+    self.slow_threshold = slow_threshold
+    self.dump_dir = dump_dir
+
+  def _get_endpoint(self, environ):
+    try:
+      endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+      return "<unmatched>"
+    return endpoint
+
+  def _save_profile(self, profiler, profile):
+    """Write or log cProfile stats of a slow request."""
+    if self.dump_dir:
+      filename = os.path.join(self.dump_dir, "{:.0f}_{}_{}.prof".format(
+          profile.start * 1000,
+          profile.method,
+          re.sub(r"\W", "_", profile.endpoint),
+      ))
+      profiler.dump_stats(filename)
+      logger.warning("Slow request %s, profile saved to %s", profile,
+                     filename)
+    else:
+      stream = StringIO.StringIO()
+      pstats.Stats(profiler, stream=stream).sort_stats(
+          "cumulative").print_stats(PROFILE_STATS_LINES)
+      logger.warning("Slow request %s\n%s", profile, stream.getvalue())
+
+  def __call__(self, environ, start_response):
+    if random.random() >= self.sample_rate:
+      return self.wsgi_app(environ, start_response)
+
+    profile = RequestProfile(environ.get("REQUEST_METHOD"),
+                             self._get_endpoint(environ))
+
+    def _start_response(status, headers, *args):
+      profile.status = int(status.split(" ", 1)[0])
+      return start_response(status, headers, *args)
+
+    profiler = cProfile.Profile() if self.slow_threshold > 0 else None
+    _local.profile = profile
+    benchmarks.set_recorder(profile.add_benchmark)
+    try:
+      if profiler is None:
+        return self.wsgi_app(environ, _start_response)
+      return profiler.runcall(self.wsgi_app, environ, _start_response)
+    finally:
+      _local.profile = None
+      benchmarks.set_recorder(None)
+      profile.finish()
+      stats.add(profile)
+      logger.info("%s", profile)
+      if profiler is not None and profile.duration >= self.slow_threshold:
+        self._save_profile(profiler, profile)
+
+
+def init_profiling(app):
+  """Wrap the app with ProfilingMiddleware if request profiling is enabled."""
+  sample_rate = getattr(settings, "REQUEST_PROFILING_SAMPLE_RATE", 0)
+  if sample_rate <= 0:
+    return
+  sa.event.listen(sa.engine.Engine, "before_cursor_execute",
+                  _before_cursor_execute)
+  sa.event.listen(sa.engine.Engine, "after_cursor_execute",
+                  _after_cursor_execute)
+  app.wsgi_app = ProfilingMiddleware(
+      app,
+      sample_rate,
+      settings.REQUEST_PROFILING_SLOW_THRESHOLD,
+      settings.REQUEST_PROFILING_DUMP_DIR,
+  )
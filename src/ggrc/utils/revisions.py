@@ -11,8 +11,10 @@ from sqlalchemy import literal
 
 from ggrc import db
 from ggrc.utils import benchmark
+from ggrc.utils import generate_query_chunks
 from ggrc.login import get_current_user_id
 from ggrc.models import all_models
+from ggrc.models.revision import refresh_latest_revisions
 from ggrc.snapshotter.rules import Types
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
@@ -57,12 +59,10 @@ def _fix_type_revisions(event, type_, obj_rev_map):
                    "skipped", type_)
     return
 
-  chunk = 1000
-  all_objects = model.eager_query().order_by(model.id)
-  all_objects_count = model.query.count()
+  all_objects = model.eager_query()
 
-  for i in range(all_objects_count // chunk + 1):
-    objects_chunk = all_objects.limit(chunk).offset(i * chunk)
+  for query_chunk in generate_query_chunks(all_objects, key=model.id):
+    objects_chunk = query_chunk.all()
     chunk_with_revisions = [
         obj for obj in objects_chunk if obj.id in obj_rev_map]
     chunk_without_revisions = [
@@ -77,12 +77,15 @@ def _fix_type_revisions(event, type_, obj_rev_map):
     # content equal to obj.log_json()
     _recover_create_revisions(revisions_table, event,
                               type_, chunk_without_revisions)
+    refresh_latest_revisions(
+        type_, [obj.id for obj in chunk_without_revisions])
 
   # 3. For each lost object log a "deleted" revision with content identical
   # to the last logged revision.
   _recover_delete_revisions(
       # Every revision present in obj_rev_map has no object in the DB
       revisions_table, event, list(obj_rev_map.values()))
+  refresh_latest_revisions(type_, obj_rev_map.keys())
 
   db.session.commit()
 
@@ -15,7 +15,9 @@ from flask import g
 from flask import render_template
 from flask import url_for
 from flask import request
+from werkzeug.exceptions import BadRequest
 from werkzeug.exceptions import Forbidden
+from werkzeug.exceptions import NotFound
 
 from ggrc import models
 from ggrc import settings
@@ -25,13 +27,15 @@ from ggrc.builder.json import publish
 from ggrc.builder.json import publish_representation
 from ggrc.converters import get_importables, get_exportables
 from ggrc.extensions import get_extension_modules
-from ggrc.fulltext import get_indexer, mixin
+from ggrc.fulltext import reindex as fulltext_reindex
 from ggrc.integrations import issues
 from ggrc.integrations import integrations_errors
 from ggrc.login import get_current_user
 from ggrc.login import login_required
 from ggrc.login import admin_required
 from ggrc.models import all_models
+from ggrc.models.background_task import BackgroundTask
+from ggrc.models.background_task import RETRY_QUEUE
 from ggrc.models.background_task import create_task
 from ggrc.models.background_task import make_task_response
 from ggrc.models.background_task import queued_task
@@ -39,20 +43,24 @@ from ggrc.models.reflection import AttributeInfo
 from ggrc.rbac import permissions
 from ggrc.services.common import as_json
 from ggrc.services.common import inclusion_filter
+from ggrc.query import my_objects
 from ggrc.query import views as query_views
+from ggrc import snapshotter
 from ggrc.snapshotter import rules
-from ggrc.snapshotter.indexer import reindex as reindex_snapshots
+from ggrc.snapshotter.datastructures import Stub
 from ggrc.views import converters
 from ggrc.views import cron
 from ggrc.views import filters
 from ggrc.views import notifications
 from ggrc.views.registry import object_view
 from ggrc.utils import benchmark
-from ggrc.utils import generate_query_chunks
+from ggrc.utils import profiling
 from ggrc.utils import revisions
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+SNAPSHOT_JOB = "snapshots"
+
 
 # Needs to be secured as we are removing @login_required
 @app.route("/_background_tasks/refresh_revisions", methods=["POST"])
@@ -63,11 +71,20 @@ def refresh_revisions(_):
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
+@app.route("/_background_tasks/rebuild_my_objects", methods=["POST"])
+@queued_task
+def rebuild_my_objects(_):
+  """Web hook to rebuild objects shown on "My Work" pages."""
+  with benchmark("Rebuild my objects"):
+    my_objects.rebuild_my_objects()
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
 @app.route("/_background_tasks/reindex", methods=["POST"])
 @queued_task
-def reindex(_):
+def reindex(task):
   """Web hook to update the full text search index."""
-  do_reindex()
+  do_reindex(task, (task.parameters or {}).get("mode"))
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
@@ -131,6 +148,64 @@ def update_audit_issues(args):
   return app.make_response(('success', 200, [('Content-Type', 'text/html')]))
 
 
+@app.route("/_background_tasks/upsert_snapshots", methods=["POST"])
+@queued_task(retry=True)
+def upsert_snapshots(task):
+  """Web hook that creates and updates snapshots of a parent object.
+
+  The last processed pair is stored as the task checkpoint after every
+  chunk, and a retried task resumes after it. The task is created in the
+  retry queue, see start_upsert_snapshots.
+  """
+  parameters = task.parameters
+  parent_model = getattr(all_models, parameters["parent_type"])
+  parent = parent_model.query.get(parameters["parent_id"])
+  event = all_models.Event.query.get(parameters["event_id"])
+  revisions = {
+      (Stub.from_dict(revision["parent"]),
+       Stub.from_dict(revision["child"])): revision["revision_id"]
+      for revision in parameters["revisions"]}
+  checkpoint = task.get_checkpoint() or {}
+
+  def save_progress(progress):
+    task.save_checkpoint({"last_pair": progress["last_pair"]})
+    task.update_progress(progress)
+
+  with benchmark("Run upsert snapshots background task"):
+    snapshotter.upsert_snapshots_in_chunks(
+        parent, event, revisions, last_pair=checkpoint.get("last_pair"),
+        progress_callback=save_progress)
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
+
+
+def _get_snapshot_job_prefix(parent_type, parent_id):
+  return "{}:{}:{}:".format(SNAPSHOT_JOB, parent_type, parent_id)
+
+
+def start_upsert_snapshots(parent, event, revisions=None):
+  """Start a background task that creates and updates snapshots.
+
+  Args:
+    parent: Parent object (e.g. Audit).
+    event: Event that triggered the snapshot operation.
+    revisions: list of dicts with "parent", "child" and "revision_id" of
+      the revisions that should be used for the given pairs.
+  """
+  return create_task(
+      name=_get_snapshot_job_prefix(parent.type, parent.id),
+      url=url_for(upsert_snapshots.__name__),
+      parameters={
+          "parent_type": parent.type,
+          "parent_id": parent.id,
+          "event_id": event.id,
+          "revisions": revisions or [],
+      },
+      method=u"POST",
+      queued_callback=upsert_snapshots,
+      queue_name=RETRY_QUEUE,
+  )
+
+
 def start_compute_attributes(revision_ids):
   """Start a background task for computed attributes."""
   task = create_task(
@@ -158,34 +233,15 @@ def start_update_audit_issues(audit_id, message):
   task.start()
 
 
-def do_reindex():
-  """Update the full text search index."""
+def do_reindex(task=None, mode=None):
+  """Update the full text search index.
 
-  indexer = get_indexer()
-  indexed_models = {
-      m.__name__: m for m in all_models.all_models
-      if issubclass(m, mixin.Indexed) and m.REQUIRED_GLOBAL_REINDEX
-  }
-  people_query = db.session.query(all_models.Person.id,
-                                  all_models.Person.name,
-                                  all_models.Person.email)
-  indexer.cache["people_map"] = {p.id: (p.name, p.email) for p in people_query}
-  indexer.cache["ac_role_map"] = dict(db.session.query(
-      all_models.AccessControlRole.id,
-      all_models.AccessControlRole.name,
-  ))
-  for model_name in sorted(indexed_models.keys()):
-    logger.info("Updating index for: %s", model_name)
-    with benchmark("Create records for %s" % model_name):
-      model = indexed_models[model_name]
-      for query_chunk in generate_query_chunks(db.session.query(model.id)):
-        model.bulk_record_update_for([i.id for i in query_chunk])
-        db.session.commit()
-
-  logger.info("Updating index for: %s", "Snapshot")
-  with benchmark("Create records for %s" % "Snapshot"):
-    reindex_snapshots()
-  indexer.invalidate_cache()
+  Args:
+    task: optional BackgroundTask that receives reindex progress.
+    mode: reindex mode, see ggrc.fulltext.reindex.MODES.
+  """
+  with benchmark("Full reindex"):
+    fulltext_reindex.reindex_all(task, mode=mode)
   start_compute_attributes("all_latest")
 
 
@@ -415,10 +471,17 @@ def object_browser():
 @admin_required
 def admin_reindex():
   """Calls a webhook that reindexes indexable objects
+
+  The optional "mode" query argument selects the reindex mode, "swap" keeps
+  search results complete during the reindex.
   """
+  mode = request.args.get("mode")
+  if mode and mode not in fulltext_reindex.MODES:
+    raise BadRequest("Invalid reindex mode: {}".format(mode))
   task_queue = create_task(
       name="reindex",
       url=url_for(reindex.__name__),
+      parameters={"mode": mode},
       queued_callback=reindex
   )
   return task_queue.make_response(
@@ -442,6 +505,27 @@ def admin_refresh_revisions():
                          [('Content-Type', 'text/html')])))
 
 
+@app.route("/admin/rebuild_my_objects", methods=["POST"])
+@login_required
+@admin_required
+def admin_rebuild_my_objects():
+  """Calls a webhook that rebuilds objects shown on "My Work" pages."""
+  task_queue = create_task("rebuild_my_objects", url_for(
+      rebuild_my_objects.__name__), rebuild_my_objects)
+  return task_queue.make_response(
+      app.make_response(("scheduled %s" % task_queue.name, 200,
+                         [('Content-Type', 'text/html')])))
+
+
+@app.route("/admin/profiling")
+@login_required
+@admin_required
+def admin_profiling():
+  """Stats of sampled requests handled by this worker."""
+  return app.make_response((json.dumps(profiling.stats.to_dict()), 200,
+                            [("Content-Type", "application/json")]))
+
+
 @app.route("/admin/compute_attributes", methods=["POST"])
 @login_required
 @admin_required
@@ -471,6 +555,33 @@ def assessments_view():
   return render_template("assessments_view/index.haml")
 
 
+@app.route("/_service/snapshot_jobs/<parent_type>/<int:parent_id>",
+           methods=["GET"])
+@login_required
+def snapshot_job_status(parent_type, parent_id):
+  """Get status and progress of the latest snapshot job of an object."""
+  parent_model = getattr(all_models, parent_type, None)
+  if parent_model is None or parent_type not in rules.get_rules().rules:
+    raise NotFound()
+  parent = parent_model.query.get(parent_id)
+  if parent is None:
+    raise NotFound()
+  if not permissions.is_allowed_read_for(parent):
+    raise Forbidden()
+  task = BackgroundTask.query.filter(
+      BackgroundTask.name.startswith(
+          _get_snapshot_job_prefix(parent_type, parent_id))
+  ).order_by(BackgroundTask.id.desc()).first()
+  if task is None:
+    raise NotFound()
+  status = {"id": task.id, "status": task.status}
+  result = task.result or {}
+  if result.get("status_code") == 202:
+    status["progress"] = json.loads(result["content"])
+  return app.make_response((json.dumps(status), 200,
+                            [("Content-Type", "application/json")]))
+
+
 @app.route("/background_task/<id_task>", methods=['GET'])
 def get_task_response(id_task):
   """Gets the status of a background task"""
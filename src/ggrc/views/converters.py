@@ -15,8 +15,11 @@ from flask import current_app
 from flask import request
 from flask import json
 from flask import render_template
+from flask import stream_with_context
+from flask import url_for
+from flask.wrappers import Response
 from werkzeug.exceptions import (
-    BadRequest, InternalServerError, Unauthorized
+    BadRequest, Forbidden, InternalServerError, NotFound, Unauthorized
 )
 
 from ggrc import settings
@@ -24,7 +27,14 @@ from ggrc_gdrive_integration import verify_credentials
 from ggrc_gdrive_integration import file_actions as fa
 from ggrc.app import app
 from ggrc.converters.base import Converter
-from ggrc.converters.import_helper import generate_csv_string
+from ggrc.converters.import_helper import generate_csv_parts
+from ggrc.login import get_current_user
+from ggrc.models.background_task import BackgroundTask
+from ggrc.models.background_task import BackgroundTaskFile
+from ggrc.models.background_task import create_task
+from ggrc.models.background_task import queued_task
+from ggrc.models.background_task import read_task_file
+from ggrc.models.background_task import write_task_file
 from ggrc.query.exceptions import BadQueryException
 from ggrc.query.builder import QueryHelper
 from ggrc.login import login_required
@@ -34,6 +44,13 @@ from ggrc.utils import benchmark
 # pylint: disable=invalid-name
 logger = getLogger(__name__)
 
+IMPORT_JOB = "import_csv"
+EXPORT_JOB = "export_csv"
+
+# Names of csv files stored for import and export jobs
+JOB_INPUT = "input"
+JOB_OUTPUT = "output"
+
 
 def check_required_headers(required_headers):
   """Check required headers to the current request"""
@@ -59,6 +76,13 @@ def parse_export_request():
   return request.json
 
 
+def _make_csv_headers(filename):
+  return [
+      ("Content-Type", "text/csv"),
+      ("Content-Disposition", "attachment; filename='{}'".format(filename)),
+  ]
+
+
 def handle_export_request():
   """Export request handler"""
   try:
@@ -68,25 +92,19 @@ def handle_export_request():
       export_to = data.get("export_to")
       query_helper = QueryHelper(objects)
       ids_by_type = query_helper.get_ids()
-    with benchmark("Generate CSV array"):
+    with benchmark("Prepare CSV lines"):
       converter = Converter(ids_by_type=ids_by_type)
-      csv_data = converter.to_array()
-    with benchmark("Generate CSV string"):
-      csv_string = generate_csv_string(csv_data)
+      csv_parts = generate_csv_parts(converter.to_stream())
     with benchmark("Make response."):
       object_names = "_".join(converter.get_object_names())
       filename = "{}.csv".format(object_names)
       if export_to == "gdrive":
-        gfile = fa.create_gdrive_file(csv_string, filename)
+        gfile = fa.create_gdrive_file_from_parts(csv_parts, filename)
         headers = [('Content-Type', 'application/json'), ]
         return current_app.make_response((json.dumps(gfile), 200, headers))
       if export_to == "csv":
-        headers = [
-            ("Content-Type", "text/csv"),
-            ("Content-Disposition",
-             "attachment; filename='{}'".format(filename)),
-        ]
-        return current_app.make_response((csv_string, 200, headers))
+        return Response(stream_with_context(csv_parts), 200,
+                        _make_csv_headers(filename))
   except BadQueryException as exception:
     raise BadRequest(exception.message)
   except HttpError as e:
@@ -140,6 +158,167 @@ def handle_import_request():
   raise BadRequest("Import failed due to server error.")
 
 
+@app.route("/_background_tasks/import_csv", methods=["POST"])
+@queued_task
+def run_import_job(task):
+  """Web hook that imports csv data stored with the task."""
+  with benchmark("Run import background task"):
+    csv_data = [row
+                for part in read_task_file(task.id, JOB_INPUT)
+                for row in part]
+    converter = Converter(dry_run=task.parameters["dry_run"],
+                          csv_data=csv_data,
+                          progress_callback=task.update_progress)
+    converter.import_csv()
+    response_json = json.dumps(converter.get_info())
+    headers = [("Content-Type", "application/json")]
+    return app.make_response((response_json, 200, headers))
+
+
+@app.route("/_background_tasks/export_csv", methods=["POST"])
+@queued_task
+def run_export_job(task):
+  """Web hook that exports objects and stores the csv file with the task.
+
+  The file is stored part by part, so it is never held in memory as a whole.
+  The task result holds only the file name.
+  """
+  with benchmark("Run export background task"):
+    converter = Converter(ids_by_type=task.parameters["ids_by_type"],
+                          progress_callback=task.update_progress)
+    write_task_file(task.id, JOB_OUTPUT,
+                    generate_csv_parts(converter.to_stream()))
+    filename = "{}.csv".format("_".join(converter.get_object_names()))
+    response_json = json.dumps({"filename": filename})
+    headers = [("Content-Type", "application/json")]
+    return app.make_response((response_json, 200, headers))
+
+
+def _csv_row_parts(csv_data):
+  """Split csv rows into lists of roughly BackgroundTaskFile.PART_SIZE."""
+  part, part_size = [], 0
+  for row in csv_data:
+    part.append(row)
+    part_size += sum(len(value) for value in row)
+    if part_size >= BackgroundTaskFile.PART_SIZE:
+      yield part
+      part, part_size = [], 0
+  if part:
+    yield part
+
+
+def _make_job_response(task):
+  response_json = json.dumps({"id": task.id, "status": task.status})
+  headers = [("Content-Type", "application/json")]
+  return current_app.make_response((response_json, 200, headers))
+
+
+def handle_import_job_request():
+  """Schedule an import background job for the requested file."""
+  dry_run, file_data = parse_import_request()
+  csv_data = fa.get_gdrive_file(file_data)
+  task = create_task(
+      name=IMPORT_JOB,
+      url=url_for(run_import_job.__name__),
+      queued_callback=run_import_job,
+      parameters={"dry_run": dry_run},
+      method=u"POST",
+      files={JOB_INPUT: _csv_row_parts(csv_data)},
+  )
+  return _make_job_response(task)
+
+
+def handle_export_job_request():
+  """Schedule an export background job for the requested objects.
+
+  Object ids are resolved with permissions of the current user before the
+  job is scheduled. The job stores the csv file for download, see
+  get_job_output.
+  """
+  try:
+    data = parse_export_request()
+    ids_by_type = QueryHelper(data.get("objects")).get_ids()
+  except BadQueryException as exception:
+    raise BadRequest(exception.message)
+  task = create_task(
+      name=EXPORT_JOB,
+      url=url_for(run_export_job.__name__),
+      queued_callback=run_export_job,
+      parameters={"ids_by_type": ids_by_type},
+      method=u"POST",
+  )
+  return _make_job_response(task)
+
+
+def get_job(task_id):
+  """Get an import or export job of the current user.
+
+  Raises:
+    NotFound: if there is no import or export job with the given id.
+    Forbidden: if the job was started by another user.
+  """
+  task = BackgroundTask.query.get(task_id)
+  if task is None or not task.name.startswith((IMPORT_JOB, EXPORT_JOB)):
+    raise NotFound()
+  if task.modified_by_id != get_current_user().id:
+    raise Forbidden()
+  return task
+
+
+def get_job_status(task_id):
+  """Get status of a job with progress or import results if available."""
+  task = get_job(task_id)
+  status = {"id": task.id, "status": task.status}
+  result = task.result or {}
+  if result.get("status_code") == 202:
+    status["progress"] = json.loads(result["content"])
+  elif task.status == "Success" and task.name.startswith(IMPORT_JOB):
+    status["result"] = json.loads(result["content"])
+  response_json = json.dumps(status)
+  headers = [("Content-Type", "application/json")]
+  return current_app.make_response((response_json, 200, headers))
+
+
+def get_job_output(task_id):
+  """Stream the csv file stored by a finished export job."""
+  task = get_job(task_id)
+  if not task.name.startswith(EXPORT_JOB) or task.status != "Success":
+    raise BadRequest("Export job {} has no output".format(task_id))
+  filename = json.loads(task.result["content"])["filename"]
+  return Response(stream_with_context(read_task_file(task.id, JOB_OUTPUT)),
+                  headers=_make_csv_headers(filename))
+
+
+@app.route("/_service/import_csv_job", methods=["POST"])
+@login_required
+def handle_import_csv_job():
+  """Schedules an import background job"""
+  with benchmark("handle import job request"):
+    return handle_import_job_request()
+
+
+@app.route("/_service/export_csv_job", methods=["POST"])
+@login_required
+def handle_export_csv_job():
+  """Schedules an export background job"""
+  with benchmark("handle export job request"):
+    return handle_export_job_request()
+
+
+@app.route("/_service/jobs/<int:task_id>", methods=["GET"])
+@login_required
+def handle_job_status(task_id):
+  """Gets import or export job status and progress"""
+  return get_job_status(task_id)
+
+
+@app.route("/_service/jobs/<int:task_id>/output", methods=["GET"])
+@login_required
+def handle_job_output(task_id):
+  """Downloads the csv file of a finished export job"""
+  return get_job_output(task_id)
+
+
 def init_converter_views():
   """Initialize views for import and export."""
 
@@ -23,6 +23,7 @@ from ggrc.models import all_models
 from ggrc.models.audit import Audit
 from ggrc.models.program import Program
 from ggrc.rbac import permissions as rbac_permissions
+from ggrc.rbac.permission_index import PermissionIndex
 from ggrc.rbac.permissions_provider import DefaultUserPermissions
 from ggrc.services.common import _get_cache_manager
 from ggrc.services import signals
@@ -87,10 +88,14 @@ class BasicUserPermissions(DefaultUserPermissions):
     self.user = user
     with benchmark('BasicUserPermissions > load permissions for user'):
       self.permissions = load_permissions_for(user)
+      self.permission_index = PermissionIndex(self.permissions)
 
   def _permissions(self):
     return self.permissions
 
+  def _permission_index(self):
+    return self.permission_index
+
 
 class UserPermissions(DefaultUserPermissions):
   """User permissions cached in the global session object"""
@@ -125,6 +130,8 @@ class UserPermissions(DefaultUserPermissions):
     else:
       with benchmark('load_permissions'):
         self._request_permissions = load_permissions_for(user)
+        setattr(g, '_request_permission_index',
+                PermissionIndex(self._request_permissions))
 
 
 def collect_permissions(src_permissions, context_id, permissions):
@@ -45,10 +45,14 @@ class ObjectRoleColumnHandler(UserColumnHandler):
     return "\n".join(cache[self.row_converter.obj.context_id][self.role.id])
 
   def remove_current_roles(self):
-    UserRole.query.filter_by(
+    """Delete roles of all people with this role on the object context."""
+    from ggrc.query import my_objects
+    roles = UserRole.query.filter_by(
         role=self.role,
-        context_id=self.row_converter.obj.context_id)\
-        .delete(synchronize_session='fetch')
+        context_id=self.row_converter.obj.context_id)
+    my_objects.invalidate_my_objects(
+        db.session, [id_ for id_, in roles.with_entities(UserRole.person_id)])
+    roles.delete(synchronize_session='fetch')
 
   def insert_object(self):
     if self.dry_run or not self.value:
@@ -169,6 +173,8 @@ class UserRoleColumnHandler(UserColumnHandler):
 
   def remove_current_roles(self):
     """Delete all roles for the current object."""
+    from ggrc.query import my_objects
+    my_objects.invalidate_my_objects(db.session, [self.row_converter.obj.id])
     allowed_role_ids = db.session.query(Role.id).filter(
         Role.name.in_(self._allowed_roles))
     UserRole.query.filter(and_(
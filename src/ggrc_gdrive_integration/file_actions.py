@@ -17,6 +17,13 @@ from ggrc.converters.import_helper import read_csv_file
 from ggrc_gdrive_integration import get_http_auth
 
 
+UPLOAD_URL = ("https://www.googleapis.com/upload/drive/v3/files"
+              "?uploadType=resumable&fields=id,name,parents")
+
+# Chunks of resumable uploads must be multiples of 256 KB
+UPLOAD_CHUNK_SIZE = 4 * 256 * 1024
+
+
 def create_gdrive_file(csv_string, filename):
   """Post text/csv data to a gdrive file"""
   http_auth = get_http_auth()
@@ -34,6 +41,69 @@ def create_gdrive_file(csv_string, filename):
                                       fields='id, name, parents').execute()
 
 
+def _upload_chunk(http_auth, session_uri, chunk, offset, total=None):
+  """Upload a single chunk of a resumable upload session.
+
+  Args:
+    http_auth: authorized http instance.
+    session_uri: uri of the resumable upload session.
+    chunk: string with the uploaded data.
+    offset: position of the chunk in the whole file.
+    total: size of the whole file, None for all but the last chunk.
+
+  Returns:
+    response content of the finished upload or None for intermediate chunks.
+  """
+  content_range = "bytes {}-{}/{}".format(
+      offset, offset + len(chunk) - 1, "*" if total is None else total)
+  if not chunk:
+    content_range = "bytes */{}".format(total)
+  resp, content = http_auth.request(
+      session_uri, method="PUT", body=chunk,
+      headers={"Content-Range": content_range,
+               "Content-Length": str(len(chunk))})
+  if total is None and resp.status == 308:
+    return None
+  if total is not None and resp.status in (200, 201):
+    return json.loads(content)
+  raise HttpError(resp, content, uri=session_uri)
+
+
+def create_gdrive_file_from_parts(csv_parts, filename):
+  """Post text/csv data to a gdrive file with a chunked resumable upload.
+
+  Only a single upload chunk is kept in memory, so the whole csv file never
+  has to be built as one string.
+
+  Args:
+    csv_parts: iterable of strings that make the csv file.
+    filename: name of the created gdrive file.
+  """
+  http_auth = get_http_auth()
+  file_metadata = {
+      'name': filename,
+      'mimeType': 'application/vnd.google-apps.spreadsheet'
+  }
+  resp, content = http_auth.request(
+      UPLOAD_URL, method="POST", body=json.dumps(file_metadata),
+      headers={"Content-Type": "application/json; charset=UTF-8",
+               "X-Upload-Content-Type": "text/csv"})
+  if resp.status != 200:
+    raise HttpError(resp, content, uri=UPLOAD_URL)
+  session_uri = resp["location"]
+
+  offset = 0
+  pending = ""
+  for part in csv_parts:
+    pending += part
+    while len(pending) >= UPLOAD_CHUNK_SIZE:
+      chunk, pending = pending[:UPLOAD_CHUNK_SIZE], pending[UPLOAD_CHUNK_SIZE:]
+      _upload_chunk(http_auth, session_uri, chunk, offset)
+      offset += len(chunk)
+  return _upload_chunk(http_auth, session_uri, pending, offset,
+                       total=offset + len(pending))
+
+
 def get_gdrive_file(file_data):
   """Get text/csv data from gdrive file"""
   http_auth = get_http_auth()
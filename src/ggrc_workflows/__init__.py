@@ -7,18 +7,26 @@
 
 import collections
 import itertools
+import time
 from datetime import datetime, date
 from logging import getLogger
 from flask import Blueprint
 from sqlalchemy import inspect, and_, orm
 
 from ggrc import db
+from ggrc.cache import relationship_graph
 from ggrc.login import get_current_user
 from ggrc.models import all_models
 from ggrc.models.relationship import Relationship
+from ggrc.models.revision import refresh_latest_revisions
 from ggrc.rbac.permissions import is_allowed_update
 from ggrc.access_control import role
 from ggrc.services import signals
+from ggrc.snapshotter.datastructures import Stub
+from ggrc.snapshotter.helpers import create_relationship_dict
+from ggrc.snapshotter.helpers import create_relationship_revision_dict
+from ggrc.snapshotter.helpers import get_relationships
+from ggrc.utils import list_chunks
 from ggrc.utils.log_event import log_event
 from ggrc_workflows import models, notification
 from ggrc_workflows import services
@@ -188,23 +196,43 @@ def handle_cycle_post(sender, obj=None, src=None, service=None):  # noqa pylint:
   build_cycles(workflow, obj)
 
 
-def _create_cycle_task(task_group_task, cycle, cycle_task_group, current_user):
+class CycleTaskDefaults(object):
+  """Values shared by all cycle tasks of a single cycle.
+
+  The assignee role id and adjusted task dates are computed once per cycle
+  instead of once per created cycle task.
+  """
+
+  def __init__(self, workflow):
+    self.workflow = workflow
+    self.assignee_role_id = {
+        v: k for (k, v) in
+        role.get_custom_roles_for("CycleTaskGroupObjectTask").iteritems()
+    }['Task Assignees']
+    self._adjusted_dates = {}
+
+  def get_adjusted_date(self, task_date):
+    """Get the task date adjusted for the current cycle of the workflow."""
+    if task_date not in self._adjusted_dates:
+      self._adjusted_dates[task_date] = \
+          self.workflow.calc_next_adjusted_date(task_date)
+    return self._adjusted_dates[task_date]
+
+
+def _create_cycle_task(task_group_task, cycle, cycle_task_group, current_user,
+                       defaults=None):
   """Create a cycle task along with relations to other objects"""
   description = models.CycleTaskGroupObjectTask.default_description if \
       task_group_task.object_approval else task_group_task.description
 
-  workflow = cycle.workflow
-  start_date = workflow.calc_next_adjusted_date(task_group_task.start_date)
-  end_date = workflow.calc_next_adjusted_date(task_group_task.end_date)
-  cycle_task_role_id = {
-      v: k for (k, v) in
-      role.get_custom_roles_for("CycleTaskGroupObjectTask").iteritems()
-  }['Task Assignees']
+  defaults = defaults or CycleTaskDefaults(cycle.workflow)
+  start_date = defaults.get_adjusted_date(task_group_task.start_date)
+  end_date = defaults.get_adjusted_date(task_group_task.end_date)
   access_control_list = []
   for person_id in task_group_task.get_person_ids_for_rolename(
           "Task Assignees"):
     access_control_list.append(
-        {"ac_role_id": cycle_task_role_id, "person": {"id": person_id}}
+        {"ac_role_id": defaults.assignee_role_id, "person": {"id": person_id}}
     )
   cycle_task_group_object_task = models.CycleTaskGroupObjectTask(
       context=cycle.context,
@@ -225,27 +253,51 @@ def _create_cycle_task(task_group_task, cycle, cycle_task_group, current_user):
   return cycle_task_group_object_task
 
 
-def create_old_style_cycle(cycle, task_group, cycle_task_group, current_user):
+def _relate_cycle_task(cycle_task, object_, task_relationships=None):
+  """Relate a cycle task to an object of its task group.
+
+  If task_relationships list is given, the pair is added to it and the
+  relationship is inserted later by insert_task_relationships.
+  """
+  if task_relationships is None:
+    Relationship(source=cycle_task, destination=object_)
+  else:
+    task_relationships.append((cycle_task, object_))
+
+
+def create_old_style_cycle(cycle, task_group, cycle_task_group, current_user,
+                           defaults=None, task_relationships=None):
   """ This function preserves the old style of creating cycles, so each object
   gets its own task assigned to it.
   """
+  defaults = defaults or CycleTaskDefaults(cycle.workflow)
   if len(task_group.task_group_objects) == 0:
     for task_group_task in task_group.task_group_tasks:
       cycle_task_group_object_task = _create_cycle_task(
           task_group_task, cycle, cycle_task_group,
-          current_user)
+          current_user, defaults)
 
   for task_group_object in task_group.task_group_objects:
     object_ = task_group_object.object
     for task_group_task in task_group.task_group_tasks:
       cycle_task_group_object_task = _create_cycle_task(
           task_group_task, cycle, cycle_task_group,
-          current_user)
-      Relationship(source=cycle_task_group_object_task, destination=object_)
+          current_user, defaults)
+      _relate_cycle_task(cycle_task_group_object_task, object_,
+                         task_relationships)
 
 
-def build_cycle(workflow, cycle=None, current_user=None):
-  """Build a cycle with it's child objects"""
+def build_cycle(workflow, cycle=None, current_user=None,
+                task_relationships=None):
+  """Build a cycle with it's child objects
+
+  workflow: Workflow instance (required).
+  cycle: Cycle instance (optional). Cycle that should be populated.
+  current_user: User instance (optional). User who will be the creator of
+    the cycle.
+  task_relationships: list (optional). If given, pairs of cycle tasks and
+    related objects are added to it instead of creating Relationship objects.
+  """
 
   if not workflow.tasks:
     logger.error("Starting a cycle has failed on Workflow with "
@@ -271,6 +323,7 @@ def build_cycle(workflow, cycle=None, current_user=None):
   cycle.description = workflow.description
   cycle.is_verification_needed = workflow.is_verification_needed
   cycle.status = models.Cycle.ASSIGNED
+  defaults = CycleTaskDefaults(workflow)
 
   # Populate CycleTaskGroups based on Workflow's TaskGroups
   for task_group in workflow.task_groups:
@@ -290,16 +343,17 @@ def build_cycle(workflow, cycle=None, current_user=None):
     # preserve the old cycle creation for old workflows, so each object
     # gets its own cycle task
     if workflow.is_old_workflow:
-      create_old_style_cycle(cycle, task_group, cycle_task_group, current_user)
+      create_old_style_cycle(cycle, task_group, cycle_task_group,
+                             current_user, defaults, task_relationships)
     else:
       for task_group_task in task_group.task_group_tasks:
         cycle_task_group_object_task = _create_cycle_task(
-            task_group_task, cycle, cycle_task_group, current_user)
+            task_group_task, cycle, cycle_task_group, current_user, defaults)
 
         for task_group_object in task_group.task_group_objects:
           object_ = task_group_object.object
-          Relationship(source=cycle_task_group_object_task,
-                       destination=object_)
+          _relate_cycle_task(cycle_task_group_object_task, object_,
+                             task_relationships)
 
   update_cycle_dates(cycle)
   Signals.workflow_cycle_start.send(
@@ -908,24 +962,93 @@ def init_extra_views(app):
   views.init_extra_views(app)
 
 
+def insert_task_relationships(task_relationships, event):
+  """Insert relationships of cycle tasks and their revisions in bulk.
+
+  Args:
+    task_relationships: list of flushed cycle tasks and related objects.
+    event: Event instance to which relationship revisions belong.
+  """
+  relationship_payload = [
+      create_relationship_dict(Stub.from_object(cycle_task),
+                               Stub.from_object(object_),
+                               cycle_task.modified_by_id,
+                               cycle_task.context_id)
+      for cycle_task, object_ in task_relationships
+  ]
+  relationships_table = Relationship.__table__
+  for chunk in list_chunks(relationship_payload):
+    db.session.execute(relationships_table.insert(), chunk)
+  relationship_graph.mark_changed(db.session())
+
+  relationships = get_relationships({
+      (rel["source_type"], rel["source_id"],
+       rel["destination_type"], rel["destination_id"])
+      for rel in relationship_payload
+  })
+  revision_payload = [
+      create_relationship_revision_dict(
+          "created", event.id, relationship, relationship.modified_by_id,
+          relationship.context_id)
+      for relationship in relationships
+  ]
+  revisions_table = all_models.Revision.__table__
+  for chunk in list_chunks(revision_payload):
+    db.session.execute(revisions_table.insert(), chunk)
+  refresh_latest_revisions(
+      "Relationship", [rel["resource_id"] for rel in revision_payload])
+
+
+def _start_workflow_cycles(workflow):
+  """Build all due cycles of a recurring workflow.
+
+  Returns:
+    int: number of started cycles.
+  """
+  cycles_count = 0
+  task_relationships = []
+  # Follow same steps as in model_posted.connect_via(models.Cycle)
+  while workflow.next_cycle_start_date <= date.today():
+    cycle = build_cycle(workflow, task_relationships=task_relationships)
+    if not cycle:
+      break
+    db.session.add(cycle)
+    notification.handle_cycle_created(cycle, False)
+    notification.handle_workflow_modify(None, workflow)
+    cycles_count += 1
+  event = log_event(db.session)
+  if task_relationships:
+    db.session.flush()
+    insert_task_relationships(task_relationships, event)
+  return cycles_count
+
+
 def start_recurring_cycles():
-  """Start recurring cycles by cron job."""
+  """Start recurring cycles by cron job.
+
+  Cycles of every workflow are committed separately, so a workflow that
+  fails to start does not prevent cycles of other workflows from starting.
+  """
   today = date.today()
-  workflows = models.Workflow.query.filter(
+  workflow_ids = [workflow_id for workflow_id, in db.session.query(
+      models.Workflow.id
+  ).filter(
       models.Workflow.next_cycle_start_date <= today,
       models.Workflow.recurrences == True  # noqa
-  )
-  for workflow in workflows:
-    # Follow same steps as in model_posted.connect_via(models.Cycle)
-    while workflow.next_cycle_start_date <= date.today():
-      cycle = build_cycle(workflow)
-      if not cycle:
-        break
-      db.session.add(cycle)
-      notification.handle_cycle_created(cycle, False)
-      notification.handle_workflow_modify(None, workflow)
-  log_event(db.session)
-  db.session.commit()
+  )]
+  for workflow_id in workflow_ids:
+    start = time.time()
+    try:
+      workflow = models.Workflow.query.get(workflow_id)
+      cycles_count = _start_workflow_cycles(workflow)
+      db.session.commit()
+    except Exception:  # pylint: disable=broad-except
+      db.session.rollback()
+      logger.exception("Starting recurring cycles of workflow %s has failed",
+                       workflow_id)
+      continue
+    logger.info("Started %s cycles of workflow %s in %.4fs",
+                cycles_count, workflow_id, time.time() - start)
 
 
 class WorkflowRoleContributions(RoleContributions):
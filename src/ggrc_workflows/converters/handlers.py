@@ -243,8 +243,11 @@ class WorkflowPersonColumnHandler(handlers.UserColumnHandler):
     Args:
         role_name: Workflow user role name
     """
+    from ggrc.query import my_objects
     user_ids_query = self._get_user_ids_query_for(role_name)
     new_people_ids = [p.id for p in self.value]
+    my_objects.invalidate_my_objects(
+        db.session, [id_ for id_, in user_ids_query])
     workflow_people_query = db.session.query(wf_models.WorkflowPerson).filter(
         wf_models.WorkflowPerson.workflow_id == self.row_converter.obj.id,
         or_(wf_models.WorkflowPerson.person_id.in_(user_ids_query.subquery()),
@@ -265,6 +268,7 @@ class WorkflowOwnerColumnHandler(WorkflowPersonColumnHandler):
   def set_obj_attr(self):
     if self.dry_run or not self.value:
       return
+    from ggrc.query import my_objects
     super(WorkflowOwnerColumnHandler, self).set_obj_attr()
     self._remove_people_with_role('WorkflowOwner')
     new_people_ids = [p.id for p in self.value]
@@ -272,6 +276,8 @@ class WorkflowOwnerColumnHandler(WorkflowPersonColumnHandler):
     user_role_query = self._get_user_ids_query_for('WorkflowMember')
     user_role_query = user_role_query.filter(
         bp_models.UserRole.person_id.in_(new_people_ids))
+    my_objects.invalidate_my_objects(
+        db.session, [id_ for id_, in user_role_query])
     user_role_query.delete(synchronize_session='fetch')
     self._add_workflow_people('WorkflowOwner')
 
@@ -6,11 +6,14 @@
 import itertools
 from contextlib import contextmanager
 
+import ddt
+
 import ggrc
 from ggrc import automapper
 from ggrc import models
 from ggrc.models import all_models
 from ggrc.models import Automapping
+from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
 from integration.ggrc import generator
 from integration.ggrc.models import factories
@@ -478,3 +481,66 @@ class TestIssueAutomappings(TestCase):
                                   destination=self.asmt)
 
     self.assertEqual(all_models.Automapping.query.count(), 0)
+
+
+@ddt.ddt
+class TestBulkAutomappings(TestCase):
+  """Test automappings of many relationships created at once."""
+
+  def setUp(self):
+    super(TestBulkAutomappings, self).setUp()
+    self.api = generator.ObjectGenerator().api
+    with factories.single_commit():
+      self.program = factories.ProgramFactory()
+      self.regulation = factories.RegulationFactory()
+      factories.RelationshipFactory(source=self.program,
+                                    destination=self.regulation)
+
+  def assert_automapped(self, objective_ids):
+    """Check that all objectives are automapped to the program."""
+    automapped = all_models.Relationship.query.filter(
+        all_models.Relationship.automapping_id.isnot(None),
+    ).all()
+    self.assertEqual(
+        {(rel.source_type, rel.source_id, rel.destination_type,
+          rel.destination_id) for rel in automapped},
+        {("Objective", objective_id, "Program", self.program.id)
+         for objective_id in objective_ids},
+    )
+
+  @ddt.data(1, 5, 50)
+  def test_single_flush(self, count):
+    """Test relationships of one flush are automapped with one insert."""
+    with factories.single_commit():
+      objectives = [factories.ObjectiveFactory() for _ in range(count)]
+
+    with QueryCounter() as counter:
+      with factories.single_commit():
+        for objective in objectives:
+          factories.RelationshipFactory(source=self.regulation,
+                                        destination=objective)
+
+    relationship_inserts = [
+        query for query in counter.queries
+        if query.startswith("INSERT IGNORE INTO relationships")
+    ]
+    self.assertEqual(len(relationship_inserts), 1)
+    self.assert_automapped([objective.id for objective in objectives])
+
+  @ddt.data(1, 5, 50)
+  def test_collection_post(self, count):
+    """Test automapping of relationships posted in one request."""
+    with factories.single_commit():
+      objectives = [factories.ObjectiveFactory() for _ in range(count)]
+    objective_ids = [objective.id for objective in objectives]
+
+    response = self.api.post(all_models.Relationship, [{
+        "relationship": {
+            "source": {"id": self.regulation.id, "type": "Regulation"},
+            "destination": {"id": objective_id, "type": "Objective"},
+            "context": None,
+        },
+    } for objective_id in objective_ids])
+
+    self.assert200(response)
+    self.assert_automapped(objective_ids)
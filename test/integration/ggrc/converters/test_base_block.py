@@ -4,12 +4,15 @@
 """Tests for basic Block Converter."""
 
 from collections import defaultdict
+from collections import OrderedDict
 
 import mock
 from ddt import data, ddt
+from sqlalchemy import exc
 
 from ggrc import models
 from ggrc.converters import base_block
+from ggrc.converters import base_row
 from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories
@@ -99,3 +102,47 @@ class TestBaseBlock(TestCase):
     block.object_ids = [regulation.id]
     id_map = block._get_identifier_mappings(relationships)
     self.assertEqual(expected_id_map, id_map)
+
+
+class TestBatchImport(TestCase):
+  """Tests for importing rows in batches."""
+
+  def _import_markets(self, count):
+    return self.import_data(*[
+        OrderedDict([
+            ("object_type", "Market"),
+            ("code", "market-{}".format(i)),
+            ("title", "Market {}".format(i)),
+            ("Admin", "user@example.com"),
+        ]) for i in range(count)
+    ])
+
+  @mock.patch.object(base_block.BlockConverter, "IMPORT_BATCH_SIZE", 2)
+  def test_import_in_batches(self):
+    """Test import of more rows than fit into a single batch."""
+    response = self._import_markets(5)
+    self._check_csv_response(response, {})
+    self.assertEqual(models.Market.query.count(), 5)
+    self.assertEqual(
+        models.Revision.query.filter_by(resource_type="Market").count(), 5)
+
+  @mock.patch.object(base_block.BlockConverter, "IMPORT_BATCH_SIZE", 2)
+  def test_failed_batch_fallback(self):
+    """Test that rows of a failed batch are inserted one by one."""
+    original_insert = base_row.RowConverter.insert_object
+    calls = []
+
+    def failing_insert(row_converter):
+      """Fail the first row of the first batch."""
+      calls.append(row_converter)
+      if len(calls) == 1:
+        raise exc.SQLAlchemyError("Batch failed")
+      return original_insert(row_converter)
+
+    with mock.patch.object(base_row.RowConverter, "insert_object",
+                           autospec=True, side_effect=failing_insert):
+      response = self._import_markets(3)
+    self._check_csv_response(response, {})
+    self.assertEqual(models.Market.query.count(), 3)
+    self.assertEqual(models.AccessControlList.query.filter_by(
+        object_type="Market").count(), 3)
@@ -0,0 +1,138 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for import and export background jobs."""
+
+import json
+
+import mock
+
+from ggrc import db
+from ggrc import models
+from ggrc.models.background_task import BackgroundTaskFile
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestImportExportJobs(TestCase):
+  """Tests for import and export background jobs."""
+
+  CSV_DATA = [
+      ["Object type"],
+      ["Market", "Code*", "Title*", "Admin*"],
+      ["", "market-1", "imported market", "user@example.com"],
+  ]
+
+  def setUp(self):
+    super(TestImportExportJobs, self).setUp()
+    self.client.get("/login")
+
+  def _export_job(self, data):
+    headers = {
+        "Content-Type": "application/json",
+        "X-requested-by": "GGRC",
+        "X-export-view": "blocks",
+    }
+    response = self.client.post("/_service/export_csv_job",
+                                data=json.dumps({"objects": data}),
+                                headers=headers)
+    self.assert200(response)
+    return json.loads(response.data)
+
+  def _import_job(self, csv_data, dry_run=False):
+    headers = {
+        "Content-Type": "application/json",
+        "X-test-only": "true" if dry_run else "false",
+        "X-requested-by": "GGRC",
+    }
+    with mock.patch("ggrc_gdrive_integration.file_actions.get_gdrive_file",
+                    return_value=csv_data):
+      response = self.client.post("/_service/import_csv_job",
+                                  data=json.dumps({"id": "file_id"}),
+                                  headers=headers)
+    self.assert200(response)
+    return json.loads(response.data)
+
+  def test_export_job(self):
+    """Test export job stores the csv file for download."""
+    with factories.single_commit():
+      market = factories.MarketFactory(title="exported market")
+      factories.ControlFactory()
+    market_slug = market.slug
+
+    job = self._export_job([
+        {"object_name": "Market", "filters": {"expression": {}},
+         "fields": "all"},
+        {"object_name": "Control", "filters": {"expression": {}},
+         "fields": "all"},
+    ])
+
+    response = self.client.get("/_service/jobs/{}".format(job["id"]))
+    self.assert200(response)
+    self.assertEqual(json.loads(response.data)["status"], "Success")
+    response = self.client.get("/_service/jobs/{}/output".format(job["id"]))
+    self.assert200(response)
+    self.assertEqual(response.headers["Content-Type"], "text/csv")
+    self.assertIn(market_slug, response.data)
+    self.assertIn("exported market", response.data)
+
+  @mock.patch.object(BackgroundTaskFile, "PART_SIZE", 20)
+  def test_job_files_in_parts(self):
+    """Test that job csv files are stored and read in parts."""
+    self._import_job(self.CSV_DATA)
+    market_slug = models.Market.query.one().slug
+    job = self._export_job([
+        {"object_name": "Market", "filters": {"expression": {}},
+         "fields": "all"},
+    ])
+
+    output_parts = BackgroundTaskFile.query.filter_by(
+        task_id=job["id"], name="output").count()
+    self.assertGreater(output_parts, 1)
+    response = self.client.get("/_service/jobs/{}/output".format(job["id"]))
+    self.assert200(response)
+    self.assertIn(market_slug, response.data)
+    self.assertIn("imported market", response.data)
+
+  def test_import_job(self):
+    """Test import job stores the import result and progress."""
+    with mock.patch(
+        "ggrc.models.background_task.BackgroundTask.update_progress"
+    ) as update_progress:
+      job = self._import_job(self.CSV_DATA)
+    update_progress.assert_called_once_with({
+        "stage": "import",
+        "blocks": ["Market"],
+        "done": 1,
+        "total": 1,
+    })
+
+    response = self.client.get("/_service/jobs/{}".format(job["id"]))
+    self.assert200(response)
+    status = json.loads(response.data)
+    self.assertEqual(status["status"], "Success")
+    self.assertEqual(status["result"][0]["created"], 1)
+    self.assertEqual(models.Market.query.one().title, "imported market")
+
+  def test_dry_run_import_job(self):
+    """Test dry run import job does not create objects."""
+    job = self._import_job(self.CSV_DATA, dry_run=True)
+
+    response = self.client.get("/_service/jobs/{}".format(job["id"]))
+    status = json.loads(response.data)
+    self.assertEqual(status["result"][0]["created"], 1)
+    self.assertEqual(models.Market.query.count(), 0)
+
+  def test_import_job_has_no_output(self):
+    """Test that only export jobs have downloadable output."""
+    job = self._import_job(self.CSV_DATA)
+    response = self.client.get("/_service/jobs/{}/output".format(job["id"]))
+    self.assert400(response)
+
+  def test_unknown_job(self):
+    """Test that other background tasks are not exposed as jobs."""
+    background_task = models.BackgroundTask(name="reindex")
+    db.session.add(background_task)
+    db.session.commit()
+    response = self.client.get("/_service/jobs/{}".format(background_task.id))
+    self.assert404(response)
@@ -3,12 +3,23 @@
 
 """Test for total reindex procedure"""
 
+import json
+
 import ddt
+import mock
+import sqlalchemy as sa
 from sqlalchemy import orm
 
 from ggrc import db
 from ggrc import fulltext
+from ggrc.fulltext import reindex
+from ggrc.fulltext import shadow
 from ggrc.fulltext.mysql import MysqlRecordProperty
+from ggrc.models import all_models
+from ggrc.models.background_task import BackgroundTask
+from ggrc.models.maintenance import ReindexChange
+from ggrc.models.maintenance import ReindexCheckpoint
+from ggrc.models.maintenance import ReindexLog
 from ggrc.utils import QueryCounter
 from ggrc.fulltext import mysql
 
@@ -133,3 +144,189 @@ class TestTotalReindex(TestCase):
               obj_count=obj_count,
           )
       )
+
+
+class TestResumableReindex(TestCase):
+  """Tests for checkpoints of the total reindex procedure."""
+
+  def setUp(self):
+    super(TestResumableReindex, self).setUp()
+    mysql.MysqlRecordProperty.query.delete()
+
+  @staticmethod
+  def _indexed_keys(type_):
+    return {r.key for r in MysqlRecordProperty.query.filter(
+        MysqlRecordProperty.type == type_)}
+
+  def test_resume_reindex(self):
+    """Test that reindex skips chunks stored in checkpoints."""
+    with ggrc_factories.single_commit():
+      markets = [ggrc_factories.MarketFactory() for _ in range(4)]
+    market_ids = sorted(m.id for m in markets)
+    MysqlRecordProperty.query.delete()
+    reindex_log = ReindexLog(is_reindex_complete=False)
+    db.session.add(reindex_log)
+    db.session.flush()
+    db.session.add(ReindexCheckpoint(
+        reindex_log_id=reindex_log.id,
+        model_name="Market",
+        first_id=market_ids[0],
+        last_id=market_ids[1],
+        count=2,
+    ))
+    db.session.commit()
+
+    reindex.reindex_all(chunk_size=1)
+
+    self.assertEqual(self._indexed_keys("Market"), set(market_ids[2:]))
+    reindex_log = ReindexLog.query.get(reindex_log.id)
+    self.assertTrue(reindex_log.is_reindex_complete)
+    self.assertEqual(ReindexCheckpoint.query.count(), 0)
+
+  def test_failed_reindex_checkpoints(self):
+    """Test that failed reindex keeps checkpoints of finished chunks."""
+    with ggrc_factories.single_commit():
+      markets = [ggrc_factories.MarketFactory() for _ in range(2)]
+    market_ids = sorted(m.id for m in markets)
+    MysqlRecordProperty.query.delete()
+    db.session.commit()
+
+    original_reindex_chunk = reindex.reindex_chunk
+
+    def failing_reindex_chunk(reindex_log_id, model_name, ids):
+      if model_name == "Market" and ids[0] == market_ids[1]:
+        raise Exception("Reindex failure")
+      return original_reindex_chunk(reindex_log_id, model_name, ids)
+
+    with mock.patch("ggrc.fulltext.reindex.reindex_chunk",
+                    side_effect=failing_reindex_chunk):
+      with self.assertRaises(Exception):
+        reindex.reindex_all(chunk_size=1)
+
+    reindex_log = ReindexLog.query.one()
+    self.assertFalse(reindex_log.is_reindex_complete)
+    self.assertEqual(reindex_log.log, "Reindex failure")
+    checkpoint = ReindexCheckpoint.query.filter_by(model_name="Market").one()
+    self.assertEqual(checkpoint.first_id, market_ids[0])
+
+    reindex.reindex_all(chunk_size=1)
+    self.assertEqual(self._indexed_keys("Market"), set(market_ids))
+    self.assertTrue(ReindexLog.query.one().is_reindex_complete)
+
+  def test_reindex_progress(self):
+    """Test that reindex stores its progress in the background task."""
+    with ggrc_factories.single_commit():
+      for _ in range(3):
+        ggrc_factories.MarketFactory()
+    task = BackgroundTask(name="reindex")
+    db.session.add(task)
+    db.session.commit()
+
+    reindex.reindex_all(task=task, chunk_size=2)
+
+    task = BackgroundTask.query.one()
+    self.assertEqual(task.result["status_code"], 202)
+    progress = json.loads(task.result["content"])
+    self.assertEqual(progress["models"]["Market"], {"done": 3, "total": 3})
+    self.assertEqual(progress["done"], progress["total"])
+
+
+class TestSwapReindex(TestCase):
+  """Tests for the shadow table swap reindex mode."""
+
+  def setUp(self):
+    super(TestSwapReindex, self).setUp()
+    mysql.MysqlRecordProperty.query.delete()
+    db.session.commit()
+
+  def tearDown(self):
+    db.session.remove()
+    db.engine.execute(
+        "DROP TABLE IF EXISTS `{}`".format(shadow.get_shadow_table_name()))
+    super(TestSwapReindex, self).tearDown()
+
+  @staticmethod
+  def _get_index_names():
+    return {i["name"] for i in sa.inspect(db.engine).get_indexes(
+        MysqlRecordProperty.__tablename__)}
+
+  def test_swap_reindex(self):
+    """Test that swap reindex replaces records with a shadow table."""
+    with ggrc_factories.single_commit():
+      markets = [ggrc_factories.MarketFactory() for _ in range(3)]
+    market_ids = {m.id for m in markets}
+    MysqlRecordProperty.query.delete()
+    db.session.add(MysqlRecordProperty(
+        key=0, type="Market", property="title", subproperty="",
+        content="stale record"))
+    db.session.commit()
+    index_names = self._get_index_names()
+
+    reindex.reindex_all(chunk_size=2, mode=reindex.SWAP)
+
+    db.session.expire_all()
+    indexed = {r.key for r in MysqlRecordProperty.query.filter(
+        MysqlRecordProperty.type == "Market")}
+    self.assertEqual(indexed, market_ids)
+    self.assertEqual(self._get_index_names(), index_names)
+    self.assertFalse(shadow.shadow_table_exists())
+    self.assertEqual(ReindexLog.query.one().mode, reindex.SWAP)
+
+  def test_swap_reindexes_recorded_changes(self):
+    """Test that objects reindexed during the rebuild are swapped in."""
+    with ggrc_factories.single_commit():
+      market = ggrc_factories.MarketFactory(title="old title")
+    market_id = market.id
+    original_create_indexes = shadow.create_shadow_indexes
+
+    def change_market():
+      # Changes that do not touch updated_at, like ACL or CAV changes
+      db.session.execute(all_models.Market.__table__.update().where(
+          all_models.Market.id == market_id).values(title="new title"))
+      all_models.Market.bulk_record_update_for([market_id])
+      db.session.commit()
+      original_create_indexes()
+
+    with mock.patch.object(shadow, "create_shadow_indexes",
+                           side_effect=change_market):
+      reindex.reindex_all(mode=reindex.SWAP)
+
+    db.session.expire_all()
+    titles = {r.content for r in MysqlRecordProperty.query.filter(
+        MysqlRecordProperty.type == "Market",
+        MysqlRecordProperty.key == market_id,
+        MysqlRecordProperty.property == "title",
+    )}
+    self.assertEqual(titles, {"new title"})
+    self.assertEqual(ReindexChange.query.count(), 0)
+
+  def test_record_changes_without_swap(self):
+    """Test that changes are only recorded during a swap run."""
+    shadow.record_changes([("Market", 1)])
+    db.session.commit()
+    self.assertEqual(ReindexChange.query.count(), 0)
+
+  def test_swap_removes_deleted(self):
+    """Test that records of objects deleted during reindex are removed."""
+    with ggrc_factories.single_commit():
+      market = ggrc_factories.MarketFactory()
+    market_id = market.id
+    shadow.create_shadow_table()
+    table = shadow.get_shadow_table()
+    db.session.execute(table.insert().values(
+        key=market_id + 1, type="Market", property="title", subproperty="",
+        content="deleted market"))
+    db.session.commit()
+
+    shadow.delete_missing_objects("Market", all_models.Market)
+    db.session.commit()
+
+    keys = {row.key for row in db.session.execute(
+        sa.select([table.c.key]).where(table.c.type == "Market"))}
+    self.assertNotIn(market_id + 1, keys)
+
+  def test_admin_reindex_mode(self):
+    """Test that invalid reindex mode is rejected."""
+    self.client.get("/login")
+    response = self.client.post("/admin/reindex?mode=invalid")
+    self.assert400(response)
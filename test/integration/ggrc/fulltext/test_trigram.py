@@ -0,0 +1,185 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the trigram full text indexer."""
+
+import os
+import time
+import unittest
+
+import mock
+
+from ggrc import db
+from ggrc import extensions
+from ggrc import settings
+from ggrc.data_platform import computed_attributes
+from ggrc.fulltext import reindex
+from ggrc.fulltext import shadow
+from ggrc.fulltext.mysql import MysqlIndexer
+from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.fulltext.trigram import MysqlRecordTrigram as Trigram
+from ggrc.fulltext.trigram import MysqlTrigramIndexer
+from ggrc.fulltext.trigram import get_trigrams
+from ggrc.models import all_models
+from ggrc.utils import list_chunks
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+BENCHMARK_RECORDS = int(
+    os.environ.get("GGRC_BENCHMARK_FULLTEXT_RECORDS", "0"))
+
+
+def _use_indexer(indexer):
+  """Patch the indexer returned by get_indexer."""
+  instances = extensions.get_extension_instance.func_defaults[0]
+  return mock.patch.dict(instances, {"FULLTEXT_INDEXER": indexer})
+
+
+class TestTrigramIndexer(TestCase):
+  """Tests for MysqlTrigramIndexer."""
+
+  def setUp(self):
+    super(TestTrigramIndexer, self).setUp()
+    self.indexer = MysqlTrigramIndexer(settings)
+    patcher = _use_indexer(self.indexer)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    with factories.single_commit():
+      self.markets = [factories.MarketFactory(title=title)
+                      for title in ["Alpha widget", "Beta WIDGET", "Gamma"]]
+    self.market_ids = [market.id for market in self.markets]
+
+  def _search(self, text):
+    query = self.indexer.get_text_search_query("Market", text)
+    return sorted(key for key, in query)
+
+  def test_trigrams(self):
+    """Trigrams are distinct and lower case."""
+    self.assertEqual(get_trigrams(u"Aaaa"), {u"aaa"})
+    self.assertEqual(get_trigrams(u"ab"), set())
+
+  def test_tokens_indexed(self):
+    """Trigrams of indexed objects are stored."""
+    self.assertTrue(Trigram.query.filter(
+        Trigram.type == "Market",
+        Trigram.key == self.market_ids[0],
+        Trigram.property == "title",
+        Trigram.trigram == u"alp",
+    ).count())
+
+  def test_substring_search(self):
+    """Substrings and prefixes are found case insensitively."""
+    self.assertEqual(self._search(u"widget"), self.market_ids[:2])
+    self.assertEqual(self._search(u"gam"), self.market_ids[2:])
+    self.assertEqual(self._search(u"ha w"), self.market_ids[:1])
+    self.assertEqual(self._search(u"al"), self.market_ids[:1])
+
+  def test_search(self):
+    """Full text search uses the trigram filter."""
+    result = self.indexer.search(u"beta", types=["Market"])
+    self.assertEqual([(key, type_) for key, type_ in result],
+                     [(self.market_ids[1], "Market")])
+
+  def test_updated_tokens(self):
+    """Trigrams follow updated records."""
+    market = all_models.Market.query.get(self.market_ids[2])
+    market.title = u"Delta"
+    db.session.commit()
+    self.assertEqual(self._search(u"gamma"), [])
+    self.assertEqual(self._search(u"delta"), self.market_ids[2:])
+
+  def test_deleted_tokens(self):
+    """Trigrams of deleted records are removed."""
+    self.indexer.delete_records_by_ids("Market", self.market_ids)
+    self.assertEqual(
+        Trigram.query.filter(Trigram.key.in_(self.market_ids)).count(), 0)
+
+  def test_computed_value_tokens(self):
+    """Trigrams follow records of computed attribute values."""
+    row = {
+        "key": self.market_ids[2],
+        "type": "Market",
+        "tags": u"",
+        "property": "Last assessment date",
+        "content": u"12/24/2017",
+        "context_id": None,
+        "subproperty": u"",
+    }
+    computed_attributes.store_data([], [row])
+    self.assertEqual(self._search(u"12/24"), self.market_ids[2:])
+    computed_attributes.store_data([], [dict(row, content=u"01/05/2018")])
+    self.assertEqual(self._search(u"12/24"), [])
+    self.assertEqual(self._search(u"gamma"), self.market_ids[2:])
+
+  def test_swap_reindex_tokens(self):
+    """Swap reindex loads and swaps in a shadow token table."""
+    self.addCleanup(self._drop_shadow_tables)
+    original_swap = shadow.swap_shadow_table
+
+    def check_live_tokens():
+      # Live trigrams are not touched before the swap
+      self.assertEqual(Trigram.query.count(), live_tokens)
+      original_swap()
+
+    Trigram.query.filter(Trigram.key == self.market_ids[0]).delete()
+    db.session.commit()
+    live_tokens = Trigram.query.count()
+    with mock.patch.object(shadow, "swap_shadow_table",
+                           side_effect=check_live_tokens):
+      reindex.reindex_all(mode=reindex.SWAP)
+    db.session.expire_all()
+    self.assertFalse(shadow.shadow_table_exists())
+    self.assertEqual(self._search(u"alpha"), self.market_ids[:1])
+
+  @staticmethod
+  def _drop_shadow_tables():
+    db.session.remove()
+    for table in (Record.__table__, Trigram.__table__):
+      db.engine.execute("DROP TABLE IF EXISTS `{}{}`".format(
+          table.name, shadow.SHADOW_SUFFIX))
+
+
+@unittest.skipUnless(
+    BENCHMARK_RECORDS,
+    "Set GGRC_BENCHMARK_FULLTEXT_RECORDS to run the benchmark")
+class TestTrigramBenchmark(TestCase):
+  """Compare searches of MysqlIndexer and MysqlTrigramIndexer.
+
+  Run with GGRC_BENCHMARK_FULLTEXT_RECORDS=3000000 for a multi-million
+  record corpus.
+  """
+
+  WORDS = [u"control", u"policy", u"audit", u"market", u"system", u"risk",
+           u"process", u"vendor", u"access", u"review"]
+
+  def setUp(self):
+    super(TestTrigramBenchmark, self).setUp()
+    self.indexer = MysqlTrigramIndexer(settings)
+    rows = []
+    for i in range(BENCHMARK_RECORDS):
+      words = [self.WORDS[(i // 10 ** n) % len(self.WORDS)] for n in range(4)]
+      rows.append({
+          "key": i + 1,
+          "type": "Market",
+          "context_id": None,
+          "tags": u"",
+          "property": "title",
+          "subproperty": u"",
+          "content": u"{} {}".format(u" ".join(words), i),
+      })
+    for chunk in list_chunks(rows, 10000):
+      db.session.execute(Record.__table__.insert(), chunk)
+      self.indexer.update_tokens("Market", [row["key"] for row in chunk],
+                                 chunk)
+    db.session.commit()
+
+  def test_search(self):
+    """Search for a rare and a frequent term with both indexers."""
+    for text in [u"{}9".format(BENCHMARK_RECORDS // 7), u"policy audit"]:
+      for indexer in [MysqlIndexer(settings), self.indexer]:
+        start = time.time()
+        count = indexer.get_text_search_query("Market", text).count()
+        print "{}: {} records with '{}' in {:.4f}s".format(
+            indexer.__class__.__name__, count, text, time.time() - start)
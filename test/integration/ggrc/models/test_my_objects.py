@@ -0,0 +1,152 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for precomputed "My Work" objects."""
+
+import mock
+
+from ggrc import db
+from ggrc.models import all_models
+from ggrc.query import my_objects
+from ggrc.query.my_objects import MyObject
+from ggrc.query.my_objects import MyObjectsPerson
+from ggrc_basic_permissions.converters import handlers
+from ggrc_basic_permissions.models import Role
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc_basic_permissions.models import factories as bp_factories
+
+
+class TestMyObjects(TestCase):
+  """Tests for my_objects table maintenance."""
+
+  def setUp(self):
+    super(TestMyObjects, self).setUp()
+    with factories.single_commit():
+      self.person = factories.PersonFactory()
+      self.role = factories.AccessControlRoleFactory(object_type="Control",
+                                                     my_work=True)
+      self.controls = [factories.ControlFactory() for _ in range(3)]
+      factories.AccessControlListFactory(
+          ac_role=self.role,
+          person=self.person,
+          object=self.controls[0],
+      )
+    self.person_id = self.person.id
+    self.control_ids = [control.id for control in self.controls]
+
+  def _get_control_ids(self, is_creator=False):
+    """Get ids of "My Work" controls of the person."""
+    query = my_objects.get_myobjects_query(
+        types=["Control"],
+        contact_id=self.person_id,
+        is_creator=is_creator,
+    )
+    return sorted(id_ for id_, in db.session.query(query.c.id))
+
+  def _is_fresh(self):
+    return bool(MyObjectsPerson.query.get(self.person_id))
+
+  def test_lookup_stores_rows(self):
+    """The first lookup stores objects of the person."""
+    self.assertFalse(self._is_fresh())
+    self.assertEqual(self._get_control_ids(), self.control_ids[:1])
+    # Rows are committed in a separate transaction
+    db.session.rollback()
+    self.assertTrue(self._is_fresh())
+    self.assertEqual(
+        [(row.object_type, row.object_id) for row in MyObject.query.filter(
+            MyObject.person_id == self.person_id,
+            MyObject.object_type == "Control")],
+        [("Control", self.control_ids[0])],
+    )
+
+  def test_lookup_keeps_session(self):
+    """Lookups with uncommitted changes neither commit nor store them."""
+    db.session.add(all_models.ObjectPerson(
+        person_id=self.person_id,
+        personable_id=self.control_ids[1],
+        personable_type="Control",
+    ))
+    db.session.flush()
+    self.assertEqual(self._get_control_ids(), self.control_ids[:2])
+    db.session.rollback()
+    self.assertFalse(self._is_fresh())
+    self.assertEqual(all_models.ObjectPerson.query.filter_by(
+        person_id=self.person_id).count(), 0)
+    self.assertEqual(self._get_control_ids(), self.control_ids[:1])
+
+  def test_bulk_role_delete(self):
+    """Roles deleted by import invalidate objects of their people."""
+    role = Role.query.filter_by(name="ProgramEditor").one()
+    with factories.single_commit():
+      context = factories.ContextFactory()
+      bp_factories.UserRoleFactory(
+          role=role,
+          context=context,
+          person=all_models.Person.query.get(self.person_id),
+      )
+    self._get_control_ids()
+    db.session.rollback()
+    self.assertTrue(self._is_fresh())
+    handler = handlers.ObjectRoleColumnHandler.__new__(
+        handlers.ObjectRoleColumnHandler)
+    handler.role = role
+    handler.row_converter = mock.MagicMock()
+    handler.row_converter.obj.context_id = context.id
+    handler.remove_current_roles()
+    db.session.commit()
+    self.assertFalse(self._is_fresh())
+
+  def test_acl_change(self):
+    """New ACL entries invalidate objects of the person."""
+    self._get_control_ids()
+    factories.AccessControlListFactory(
+        ac_role=all_models.AccessControlRole.query.get(self.role.id),
+        person=all_models.Person.query.get(self.person_id),
+        object=all_models.Control.query.get(self.control_ids[1]),
+    )
+    db.session.commit()
+    self.assertFalse(self._is_fresh())
+    self.assertEqual(self._get_control_ids(), self.control_ids[:2])
+
+  def test_relationship_change(self):
+    """Relationships with the person are found for all but creators."""
+    self._get_control_ids()
+    factories.RelationshipFactory(
+        source=all_models.Person.query.get(self.person_id),
+        destination=all_models.Control.query.get(self.control_ids[2]),
+    )
+    db.session.commit()
+    self.assertEqual(self._get_control_ids(),
+                     [self.control_ids[0], self.control_ids[2]])
+
+  def test_mapped_objects_for_creator(self):
+    """Objects mapped with object_people are not returned for creators."""
+    db.session.add(all_models.ObjectPerson(
+        person_id=self.person_id,
+        personable_id=self.control_ids[1],
+        personable_type="Control",
+    ))
+    db.session.commit()
+    self.assertEqual(self._get_control_ids(), self.control_ids[:2])
+    self.assertEqual(self._get_control_ids(is_creator=True),
+                     self.control_ids[:1])
+
+  def test_deleted_object(self):
+    """Rows of deleted objects are removed."""
+    self._get_control_ids()
+    db.session.delete(all_models.Control.query.get(self.control_ids[0]))
+    db.session.commit()
+    self.assertEqual(MyObject.query.filter(
+        MyObject.object_id == self.control_ids[0]).count(), 0)
+    self.assertEqual(self._get_control_ids(), [])
+
+  def test_rebuild(self):
+    """Rebuild stores objects of all people."""
+    my_objects.rebuild_my_objects()
+    self.assertTrue(self._is_fresh())
+    self.assertEqual(MyObject.query.filter(
+        MyObject.person_id == self.person_id,
+        MyObject.object_type == "Control").count(), 1)
@@ -0,0 +1,81 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for related object lookups with the relationship graph."""
+
+import time
+
+import mock
+
+from ggrc import db
+from ggrc.cache import relationship_graph
+from ggrc.models import all_models
+from ggrc.models import relationship_helper
+from ggrc.utils import QueryCounter
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestRelationshipGraph(TestCase):
+  """Tests for RelationshipGraph."""
+
+  def setUp(self):
+    super(TestRelationshipGraph, self).setUp()
+    with factories.single_commit():
+      self.control = factories.ControlFactory()
+      self.objectives = [factories.ObjectiveFactory() for _ in range(2)]
+      factories.RelationshipFactory(source=self.control,
+                                    destination=self.objectives[0])
+    self.control_id = self.control.id
+    self.objective_ids = [objective.id for objective in self.objectives]
+    self.graph = relationship_graph.RelationshipGraph(db.engine, 0)
+    self.graph.load()
+    relationship_graph.register_listeners()
+    patcher = mock.patch.object(relationship_graph, "_graph", self.graph)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def _related_objectives(self):
+    return relationship_helper.get_related_ids(
+        "Objective", "Control", [self.control_id])
+
+  def test_lookup_without_relationship_queries(self):
+    """Related ids are found without queries of the relationships table."""
+    self.graph.check_interval = 60
+    self.graph.checked_at = time.time()
+    with QueryCounter() as counter:
+      self.assertEqual(self._related_objectives(), set(self.objective_ids[:1]))
+    self.assertFalse([query for query in counter.queries
+                      if "FROM relationships" in query])
+
+  def test_rows_of_other_workers(self):
+    """Rows inserted without the session are loaded by the next check."""
+    db.session.execute(all_models.Relationship.__table__.insert(), [{
+        "source_type": "Control",
+        "source_id": self.control_id,
+        "destination_type": "Objective",
+        "destination_id": self.objective_ids[1],
+    }])
+    db.session.commit()
+    self.assertEqual(self._related_objectives(), set(self.objective_ids))
+
+  def test_deleted_rows_of_other_workers(self):
+    """Rows deleted elsewhere make the graph stale until it is reloaded."""
+    db.session.execute(all_models.Relationship.__table__.delete())
+    db.session.commit()
+    with mock.patch.object(self.graph, "_load_in_background") as load:
+      self.assertIsNone(relationship_graph.get_graph())
+      self.assertEqual(self._related_objectives(), set())
+    self.assertTrue(load.called)
+
+  def test_uncommitted_changes(self):
+    """Sessions with flushed changes do not use the graph."""
+    factories.RelationshipFactory(
+        source=all_models.Control.query.get(self.control_id),
+        destination=all_models.Objective.query.get(self.objective_ids[1]),
+    )
+    db.session.flush()
+    self.assertIsNone(relationship_graph.get_graph())
+    self.assertEqual(self._related_objectives(), set(self.objective_ids))
+    db.session.commit()
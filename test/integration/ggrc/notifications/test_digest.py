@@ -0,0 +1,65 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for batched daily digest generation."""
+
+from mock import MagicMock
+from mock import patch
+
+from ggrc.models import Assessment
+from ggrc.notifications import common
+from ggrc.notifications.local_mail import LocalMailTransport
+from ggrc.utils import QueryCounter
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc_workflows.models import factories as wf_factories
+
+
+@patch("ggrc.settings.MAIL_TRANSPORT", "local", create=True)
+class TestDailyDigest(TestCase):
+  """Tests for daily digest emails."""
+
+  def setUp(self):
+    super(TestDailyDigest, self).setUp()
+    self.client.get("/login")
+    factories.AuditFactory(slug="Audit")
+    LocalMailTransport.clear()
+    self.addCleanup(LocalMailTransport.clear)
+
+  def test_digest_sent_with_transport(self):
+    """Digest emails are sent with the configured mail transport."""
+    self.import_file("assessment_with_templates.csv")
+    titles = [asmt.title for asmt in Assessment.query]
+
+    response = self.client.get("/_notifications/send_daily_digest")
+    self.assert200(response)
+
+    self.assertEqual(len(LocalMailTransport.outbox), 1)
+    email = LocalMailTransport.outbox[0]
+    self.assertEqual(email.recipient, u"user@example.com")
+    self.assertIn(u"New assessments were created", email.body)
+    for asmt_title in titles:
+      self.assertIn(asmt_title, email.body)
+
+  def test_recipients_loaded_once(self):
+    """Recipients of all notifications are loaded with a single query."""
+    self.import_file("assessment_with_templates.csv")
+
+    with QueryCounter() as counter:
+      _, notif_data = common.get_daily_notifications()
+
+    self.assertIn(u"user@example.com", notif_data)
+    self.assertEqual(
+        len([query for query in counter.queries
+             if "JOIN notification_configs" in query]),
+        1,
+    )
+
+  def test_preload_extension_objects(self):
+    """Objects of extension models are preloaded too."""
+    workflow_id = wf_factories.WorkflowFactory().id
+    notification = MagicMock(object_type="Workflow", object_id=workflow_id)
+    objects = common._preload_objects([notification])
+    self.assertEqual([(obj.type, obj.id) for obj in objects],
+                     [("Workflow", workflow_id)])
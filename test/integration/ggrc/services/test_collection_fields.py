@@ -0,0 +1,57 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for `__fields` projection of /api/<model> collections."""
+
+import mock
+
+from ggrc.models import all_models
+from ggrc.services.common import Resource
+
+from integration.ggrc import TestCase
+from integration.ggrc.api_helper import Api
+from integration.ggrc.models import factories
+
+
+class TestCollectionFields(TestCase):
+  """Tests for collection GET with `__fields` argument."""
+
+  def setUp(self):
+    super(TestCollectionFields, self).setUp()
+    self.api = Api()
+    with factories.single_commit():
+      self.markets = [factories.MarketFactory(title="Market {}".format(i))
+                      for i in range(3)]
+    self.market_ids = [market.id for market in self.markets]
+
+  def _get_markets(self, fields):
+    response = self.api.get_query(all_models.Market,
+                                  "__fields={}".format(fields))
+    self.assert200(response)
+    return response.json["markets_collection"]["markets"]
+
+  def test_column_fields_projected(self):
+    """Column fields are selected without loading full resources."""
+    with mock.patch.object(Resource, "get_matched_resources") as matched:
+      markets = self._get_markets("id,title")
+    self.assertFalse(matched.called)
+    self.assertEqual(
+        sorted((market["id"], market["title"]) for market in markets),
+        [(market_id, "Market {}".format(i))
+         for i, market_id in enumerate(self.market_ids)],
+    )
+    for market in markets:
+      self.assertItemsEqual(market.keys(), ["id", "title"])
+
+  def test_non_column_fields_full_load(self):
+    """Fields that are not plain columns are read from full resources."""
+    with mock.patch.object(Resource, "get_matched_resources",
+                           autospec=True,
+                           side_effect=Resource.get_matched_resources
+                           ) as matched:
+      markets = self._get_markets("id,title,access_control_list")
+    self.assertTrue(matched.called)
+    self.assertEqual(len(markets), len(self.market_ids))
+    for market in markets:
+      self.assertItemsEqual(market.keys(),
+                            ["id", "title", "access_control_list"])
@@ -324,6 +324,45 @@ class TestServices(TestCase):
     self.assertStatus(response, 304)
     self.assertIn("Etag", response.headers)
 
+  def test_collection_get_if_none_match(self):
+    """Collection GET returns 304 for the Etag of the previous response."""
+    self.mock_model(foo="baz")
+    response = self.client.get(self.mock_url(), headers=self.get_headers())
+    self.assert200(response)
+    self.assertIn("Etag", response.headers)
+    response = self.client.get(
+        self.mock_url(),
+        headers=self.get_headers(
+            ("If-None-Match", response.headers["Etag"]),
+        ),
+    )
+    self.assertStatus(response, 304)
+    self.mock_model(foo="bar")
+    response = self.client.get(
+        self.mock_url(),
+        headers=self.get_headers(
+            ("If-None-Match", response.headers["Etag"]),
+        ),
+    )
+    self.assert200(response)
+
+  def test_stubs_if_none_match(self):
+    """Stubs collection returns 304 without building the collection."""
+    self.mock_model(foo="baz")
+    url = self.mock_url() + "?__stubs_only=true"
+    response = self.client.get(url, headers=self.get_headers())
+    self.assert200(response)
+    with mock.patch("ggrc.services.common.Resource."
+                    "build_collection_representation") as build:
+      response = self.client.get(
+          url,
+          headers=self.get_headers(
+              ("If-None-Match", response.headers["Etag"]),
+          ),
+      )
+    self.assertStatus(response, 304)
+    build.assert_not_called()
+
 
 class TestFilteringByRequest(TestCase):
   """Test filter query by request"""
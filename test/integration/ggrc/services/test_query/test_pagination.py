@@ -0,0 +1,92 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for keyset pagination and total modes of /query api."""
+
+import ddt
+import mock
+
+from ggrc.models import all_models
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc.query_helper import WithQueryApi
+
+
+@ddt.ddt
+class TestKeysetPagination(TestCase, WithQueryApi):
+  """Tests for cursor based pagination."""
+
+  DESCRIPTIONS = ["b", "", "a", "b", "", "c", "a", "b"]
+
+  def setUp(self):
+    super(TestKeysetPagination, self).setUp()
+    self.client.get("/login")
+    with factories.single_commit():
+      for i, description in enumerate(self.DESCRIPTIONS):
+        factories.MarketFactory(title="market {}".format(i),
+                                description=description)
+
+  def _get_page(self, cursor, page_size, order_by=None, total_mode=None):
+    """Get a single page of market ids."""
+    query = self._make_query_dict("Market", type_="ids",
+                                  limit=[0, page_size], order_by=order_by)
+    query["cursor"] = cursor
+    if total_mode:
+      query["total_mode"] = total_mode
+    return self._get_first_result_set(query, "Market")
+
+  def _get_all_pages(self, page_size, order_by=None):
+    """Follow cursors through all pages and collect market ids."""
+    ids = []
+    cursor = None
+    while True:
+      page = self._get_page(cursor, page_size, order_by)
+      self.assertEqual(page["total"], len(self.DESCRIPTIONS))
+      ids.extend(page["ids"])
+      cursor = page["next_cursor"]
+      if cursor is None:
+        return ids
+
+  @ddt.data(1, 3, 8, 10)
+  def test_all_pages(self, page_size):
+    """Test that pages of size {} cover all objects once in order."""
+    ids = self._get_all_pages(page_size)
+    self.assertEqual(ids, sorted(m.id for m in all_models.Market.query))
+
+  @ddt.data(False, True)
+  def test_ordered_pages(self, desc):
+    """Test pages ordered by a column with duplicates and empty values."""
+    ids = self._get_all_pages(
+        3, order_by=[{"name": "description", "desc": desc}])
+    self.assertEqual(len(ids), len(set(ids)))
+    self.assertEqual(set(ids), {m.id for m in all_models.Market.query})
+    markets = {m.id: m.description for m in all_models.Market.query}
+    descriptions = [markets[id_] or "" for id_ in ids]
+    self.assertEqual(descriptions, sorted(descriptions, reverse=desc))
+
+  def test_invalid_cursor(self):
+    """Test that a malformed cursor is rejected."""
+    query = self._make_query_dict("Market", type_="ids", limit=[0, 3])
+    query["cursor"] = "invalid"
+    self.assert400(self._post(query))
+
+  def test_skip_total(self):
+    """Test that total is not counted in skip mode."""
+    page = self._get_page(None, 3, total_mode="skip")
+    self.assertIsNone(page.get("total"))
+    self.assertEqual(len(page["ids"]), 3)
+
+  def test_approximate_total(self):
+    """Test that approximate total counts only a limited number of rows."""
+    with mock.patch("ggrc.settings.QUERY_API_APPROXIMATE_TOTAL", 5):
+      page = self._get_page(None, 3, total_mode="approximate")
+    self.assertEqual(page["total"], 5)
+
+  def test_approximate_offset_total(self):
+    """Test approximate total without keyset pagination."""
+    query = self._make_query_dict("Market", type_="ids", limit=[0, 3])
+    query["total_mode"] = "approximate"
+    with mock.patch("ggrc.settings.QUERY_API_APPROXIMATE_TOTAL", 5):
+      page = self._get_first_result_set(query, "Market")
+    self.assertEqual(page["total"], 5)
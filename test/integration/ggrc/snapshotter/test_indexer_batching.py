@@ -0,0 +1,148 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for batched record generation of the snapshot indexer."""
+
+import os
+import time
+import unittest
+
+from ggrc import db
+from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.models import all_models
+from ggrc.snapshotter import indexer
+from ggrc.snapshotter.datastructures import Pair
+from ggrc.utils import QueryCounter
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+BENCHMARK_SNAPSHOTS = int(os.environ.get("GGRC_BENCHMARK_SNAPSHOTS", "0"))
+
+
+def _get_pairs(snapshots):
+  return {Pair.from_4tuple((s.parent_type, s.parent_id,
+                            s.child_type, s.child_id))
+          for s in snapshots}
+
+
+def _count_queries(queries, table):
+  return len([q for q in queries if "FROM {}".format(table) in q])
+
+
+class TestIndexerBatching(TestCase):
+  """Tests for shared lookups of reindexed snapshot chunks."""
+
+  def _create_audit_snapshots(self, audits_count, controls_count):
+    """Create snapshots of every control in every audit."""
+    with factories.single_commit():
+      audits = [factories.AuditFactory() for _ in range(audits_count)]
+      controls = [factories.ControlFactory() for _ in range(controls_count)]
+    snapshots = []
+    for audit in audits:
+      snapshots.extend(self._create_snapshots(audit, controls))
+    db.session.commit()
+    return snapshots
+
+  def test_shared_revision_indexed_once(self):
+    """Searchable attributes of a revision are computed once."""
+    snapshots = self._create_audit_snapshots(audits_count=3, controls_count=1)
+    snapshot_ids = [s.id for s in snapshots]
+    pairs = _get_pairs(snapshots)
+    indexer.delete_records(snapshot_ids)
+
+    with QueryCounter() as counter:
+      indexer.reindex_pairs(pairs)
+
+    self.assertEqual(_count_queries(counter.queries, "revisions"), 1)
+    self.assertEqual(_count_queries(counter.queries,
+                                    "custom_attribute_definitions"), 1)
+    indexed_ids = {key for key, in db.session.query(Record.key).filter(
+        Record.type == "Snapshot",
+        Record.property == "title",
+    )}
+    self.assertEqual(indexed_ids, set(snapshot_ids))
+
+  def test_query_count_independent_of_size(self):
+    """Reindex of a chunk does not need more queries for more objects.
+
+    The smaller chunk is reindexed first, so it also pays for lookups that
+    are cached for the rest of the request.
+    """
+    small_pairs = _get_pairs(self._create_audit_snapshots(1, 2))
+    large_pairs = _get_pairs(self._create_audit_snapshots(1, 10))
+
+    with QueryCounter() as small_counter:
+      indexer.reindex_pairs(small_pairs)
+    indexer.get_indexer().invalidate_cache()
+    with QueryCounter() as large_counter:
+      indexer.reindex_pairs(large_pairs)
+
+    self.assertLessEqual(len(large_counter.queries),
+                         len(small_counter.queries))
+
+  def test_cache_shared_by_chunks(self):
+    """Custom attribute definitions are loaded once for all chunks."""
+    snapshots = self._create_audit_snapshots(audits_count=2, controls_count=2)
+    cache = indexer.IndexCache()
+    with QueryCounter() as counter:
+      for snapshot in snapshots:
+        indexer.reindex_pairs(_get_pairs([snapshot]), cache=cache)
+
+    self.assertEqual(_count_queries(counter.queries,
+                                    "custom_attribute_definitions"), 1)
+    self.assertEqual(_count_queries(counter.queries, "revisions"), 2)
+
+
+@unittest.skipUnless(BENCHMARK_SNAPSHOTS,
+                     "Set GGRC_BENCHMARK_SNAPSHOTS to run the benchmark")
+class TestIndexerBenchmark(TestCase):
+  """Full snapshot reindex benchmark.
+
+  Run with GGRC_BENCHMARK_SNAPSHOTS=100000 to reindex 100k snapshots.
+  """
+
+  CONTROLS_COUNT = 100
+
+  def setUp(self):
+    super(TestIndexerBenchmark, self).setUp()
+    with factories.single_commit():
+      audit = factories.AuditFactory()
+      controls = [factories.ControlFactory()
+                  for _ in range(self.CONTROLS_COUNT)]
+    revisions = self._get_latest_object_revisions(controls).all()
+    # Snapshots of the same controls in different fake audits share revisions
+    # the same way snapshots of real audits do.
+    rows = []
+    for i in range(BENCHMARK_SNAPSHOTS):
+      revision = revisions[i % len(revisions)]
+      rows.append({
+          "parent_type": "Audit",
+          "parent_id": audit.id + i // len(revisions),
+          "child_type": revision.resource_type,
+          "child_id": revision.resource_id,
+          "revision_id": revision.id,
+          "context_id": audit.context_id,
+      })
+    table = all_models.Snapshot.__table__
+    for chunk in range(0, len(rows), indexer.INSERT_CHUNK_SIZE):
+      db.session.execute(table.insert(),
+                         rows[chunk:chunk + indexer.INSERT_CHUNK_SIZE])
+    db.session.commit()
+
+  def test_reindex(self):
+    """Reindex all snapshots of the fixture."""
+    start = time.time()
+    with QueryCounter() as counter:
+      indexer.reindex()
+    elapsed = time.time() - start
+    print "Reindexed {} snapshots in {:.2f}s with {} queries".format(
+        BENCHMARK_SNAPSHOTS, elapsed, len(counter.queries))
+    self.assertEqual(
+        db.session.query(Record.key).filter(
+            Record.type == "Snapshot",
+            Record.property == "title",
+        ).count(),
+        BENCHMARK_SNAPSHOTS,
+    )
@@ -0,0 +1,140 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for latest revision lookup of snapshotted objects."""
+
+import os
+import time
+import unittest
+
+from ggrc import db
+from ggrc.models import all_models
+from ggrc.models.revision import LatestRevision
+from ggrc.models.revision import refresh_latest_revisions
+from ggrc.snapshotter.datastructures import Pair
+from ggrc.snapshotter.datastructures import Stub
+from ggrc.snapshotter.helpers import get_revisions
+from ggrc.utils import QueryCounter
+
+from integration.ggrc import TestCase
+from integration.ggrc.api_helper import Api
+from integration.ggrc.models import factories
+
+
+BENCHMARK_DEPTH = int(os.environ.get("GGRC_BENCHMARK_REVISION_DEPTH", "0"))
+
+LIVE_FILTERS = [all_models.Revision.action.in_(["created", "modified"])]
+
+
+def _get_revision_ids(obj):
+  return [id_ for id_, in db.session.query(all_models.Revision.id).filter(
+      all_models.Revision.resource_type == obj.type,
+      all_models.Revision.resource_id == obj.id,
+  ).order_by(all_models.Revision.id)]
+
+
+class TestLatestRevisions(TestCase):
+  """Tests for the latest_revisions table and get_revisions."""
+
+  def setUp(self):
+    super(TestLatestRevisions, self).setUp()
+    self.api = Api()
+    with factories.single_commit():
+      self.audit = factories.AuditFactory()
+      self.control = factories.ControlFactory()
+    self.api.modify_object(self.control, {"title": "Modified control"})
+    self.control = all_models.Control.query.get(self.control.id)
+    self.pair = Pair(Stub.from_object(self.audit),
+                     Stub.from_object(self.control))
+
+  def test_latest_revision_stored(self):
+    """Logged revisions are stored as the latest revision of the object."""
+    revision_ids = _get_revision_ids(self.control)
+    self.assertEqual(len(revision_ids), 2)
+    latest = LatestRevision.query.get(("Control", self.control.id))
+    self.assertEqual(latest.revision_id, revision_ids[-1])
+
+  def test_single_row_lookup(self):
+    """Latest revisions are read without the revision history."""
+    with QueryCounter() as counter:
+      result = get_revisions({self.pair}, {}, LIVE_FILTERS)
+    self.assertEqual(result,
+                     {self.pair: _get_revision_ids(self.control)[-1]})
+    self.assertEqual(len(counter.queries), 1)
+    self.assertIn("latest_revisions", counter.queries[0])
+
+  def test_missing_latest_revision(self):
+    """Objects without a stored latest revision fall back to history."""
+    LatestRevision.query.delete()
+    db.session.commit()
+    result = get_revisions({self.pair}, {})
+    self.assertEqual(result,
+                     {self.pair: _get_revision_ids(self.control)[-1]})
+
+  def test_deleted_object(self):
+    """Filtered out latest revisions fall back to matching history."""
+    revision_ids = _get_revision_ids(self.control)
+    self.api.delete(self.control)
+    self.assertEqual(
+        get_revisions({self.pair}, {}, LIVE_FILTERS),
+        {self.pair: revision_ids[-1]})
+    self.assertNotEqual(get_revisions({self.pair}, {}),
+                        {self.pair: revision_ids[-1]})
+
+  def test_requested_revision(self):
+    """Requested revisions are used if they belong to the object."""
+    first_revision_id = _get_revision_ids(self.control)[0]
+    self.assertEqual(
+        get_revisions({self.pair}, {self.pair: first_revision_id}),
+        {self.pair: first_revision_id})
+    audit_revision_id = _get_revision_ids(self.audit)[0]
+    self.assertEqual(
+        get_revisions({self.pair}, {self.pair: audit_revision_id}), {})
+
+
+@unittest.skipUnless(BENCHMARK_DEPTH,
+                     "Set GGRC_BENCHMARK_REVISION_DEPTH to run the benchmark")
+class TestLatestRevisionsBenchmark(TestCase):
+  """Compare get_revisions cost for growing revision history depth."""
+
+  CONTROLS_COUNT = 100
+
+  def _add_history(self, controls, depth):
+    """Add revisions to every control until it has depth revisions."""
+    event = all_models.Event(action="BULK", resource_id=0)
+    db.session.add(event)
+    db.session.flush()
+    revision = all_models.Revision.query.filter(
+        all_models.Revision.resource_type == "Control").first()
+    rows = []
+    for control in controls:
+      existing = len(_get_revision_ids(control))
+      rows.extend({
+          "resource_type": "Control",
+          "resource_id": control.id,
+          "event_id": event.id,
+          "action": "modified",
+          "content": revision.content,
+          "modified_by_id": revision.modified_by_id,
+          "context_id": None,
+      } for _ in range(depth - existing))
+    if rows:
+      db.session.execute(all_models.Revision.__table__.insert(), rows)
+      refresh_latest_revisions("Control", [c.id for c in controls])
+    db.session.commit()
+
+  def test_history_depth(self):
+    """get_revisions time does not depend on the history depth."""
+    with factories.single_commit():
+      audit = factories.AuditFactory()
+      controls = [factories.ControlFactory()
+                  for _ in range(self.CONTROLS_COUNT)]
+    pairs = {Pair(Stub.from_object(audit), Stub.from_object(control))
+             for control in controls}
+    for depth in sorted({1, 10, 100, BENCHMARK_DEPTH}):
+      self._add_history(controls, depth)
+      start = time.time()
+      get_revisions(pairs, {}, LIVE_FILTERS)
+      elapsed = time.time() - start
+      print "History depth {}: {:.4f}s for {} objects".format(
+          depth, elapsed, len(pairs))
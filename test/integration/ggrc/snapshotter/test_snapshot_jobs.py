@@ -0,0 +1,142 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for snapshot background jobs."""
+
+import mock
+
+from ggrc import db
+import ggrc.models as models
+from ggrc import snapshotter
+
+from integration.ggrc.snapshotter import SnapshotterBaseTestCase
+
+
+class TestSnapshotJobs(SnapshotterBaseTestCase):
+  """Tests for snapshots created and updated by background tasks."""
+
+  def setUp(self):
+    super(TestSnapshotJobs, self).setUp()
+    self.program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot Jobs"
+    })
+    self.controls = []
+    for i in range(3):
+      control = self.create_object(models.Control, {
+          "title": "Test Control Snapshot Job {}".format(i)
+      })
+      self.create_mapping(self.program, control)
+      self.controls.append(control)
+    self.program = self.refresh_object(self.program)
+
+  def _create_audit(self, snapshot_settings):
+    self.create_object(models.Audit, {
+        "title": "Snapshot job audit",
+        "program": {"id": self.program.id},
+        "status": "Planned",
+        "snapshots": snapshot_settings,
+    })
+    return db.session.query(models.Audit).filter(
+        models.Audit.title == "Snapshot job audit").one()
+
+  def _get_snapshot_count(self, audit):
+    return db.session.query(models.Snapshot).filter(
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit.id,
+    ).count()
+
+  def test_async_create(self):
+    """Audit snapshots are created by a background task on request."""
+    audit = self._create_audit({"operation": "create", "async": True})
+
+    self.assertEqual(self._get_snapshot_count(audit), len(self.controls))
+    response = self.client.get(
+        "/_service/snapshot_jobs/Audit/{}".format(audit.id))
+    self.assert200(response)
+    self.assertEqual(response.json["status"], "Success")
+
+  @mock.patch("ggrc.settings.SNAPSHOT_ASYNC_THRESHOLD", 2, create=True)
+  def test_create_over_threshold(self):
+    """Large audit scopes are handled by a background task."""
+    with mock.patch("ggrc.views.start_upsert_snapshots") as start_job:
+      audit = self._create_audit({"operation": "create"})
+    self.assertTrue(start_job.called)
+    self.assertEqual(self._get_snapshot_count(audit), 0)
+
+  def test_no_job_status(self):
+    """Status of an object without snapshot jobs is not found."""
+    audit = self._create_audit({"operation": "create"})
+    response = self.client.get(
+        "/_service/snapshot_jobs/Audit/{}".format(audit.id))
+    self.assert404(response)
+
+  @mock.patch("ggrc.settings.SNAPSHOT_JOB_CHUNK_SIZE", 1, create=True)
+  def test_chunked_resume(self):
+    """Chunks report progress and a resumed run skips processed pairs."""
+    with mock.patch("ggrc.snapshotter.listeners.create_snapshots"):
+      audit = self._create_audit({"operation": "create"})
+    self.assertEqual(self._get_snapshot_count(audit), 0)
+    event = models.Event.query.first()
+    first_pair = ("Audit", audit.id, "Control",
+                  min(control.id for control in self.controls))
+
+    progress = []
+    snapshotter.upsert_snapshots_in_chunks(
+        audit, event, last_pair=first_pair,
+        progress_callback=progress.append)
+    self.assertEqual([p["done"] for p in progress], [2, 3])
+    self.assertEqual({p["total"] for p in progress}, {3})
+    self.assertEqual(self._get_snapshot_count(audit), 2)
+
+    progress = []
+    audit = self.refresh_object(audit)
+    snapshotter.upsert_snapshots_in_chunks(
+        audit, event, progress_callback=progress.append)
+    self.assertEqual([p["done"] for p in progress], [1, 2, 3])
+    self.assertEqual(tuple(progress[0]["last_pair"]), first_pair)
+    self.assertEqual(self._get_snapshot_count(audit), 3)
+
+  @mock.patch("ggrc.settings.SNAPSHOT_JOB_CHUNK_SIZE", 1, create=True)
+  def test_failed_job_resume(self):
+    """A failed job is retried and resumes from its checkpoint."""
+    from ggrc import views
+    with mock.patch("ggrc.snapshotter.listeners.create_snapshots"):
+      audit = self._create_audit({"operation": "create"})
+    event = models.Event.query.first()
+    upsert_pairs = snapshotter.SnapshotGenerator.upsert_pairs.im_func
+    chunks = []
+
+    def fail_second_chunk(generator, pairs, *args):
+      chunks.append(pairs)
+      if len(chunks) == 2:
+        raise Exception("Chunk failed")
+      return upsert_pairs(generator, pairs, *args)
+
+    with mock.patch.object(snapshotter.SnapshotGenerator, "upsert_pairs",
+                           autospec=True, side_effect=fail_second_chunk):
+      task = views.start_upsert_snapshots(audit, event)
+
+    task = models.BackgroundTask.query.get(task.id)
+    self.assertEqual(task.status, "Success")
+    # The retry skips the first chunk and repeats the failed one
+    self.assertEqual(len(chunks), 4)
+    self.assertEqual(chunks[2], chunks[1])
+    self.assertEqual(self._get_snapshot_count(audit), 3)
+
+  @mock.patch("ggrc.settings.SNAPSHOT_JOB_CHUNK_SIZE", 1, create=True)
+  def test_failed_job_retry_limit(self):
+    """A job that keeps failing is retried a limited number of times."""
+    from ggrc import views
+    from ggrc.models import background_task
+    with mock.patch("ggrc.snapshotter.listeners.create_snapshots"):
+      audit = self._create_audit({"operation": "create"})
+    event = models.Event.query.first()
+
+    with mock.patch.object(snapshotter.SnapshotGenerator, "upsert_pairs",
+                           autospec=True) as upsert_pairs:
+      upsert_pairs.side_effect = Exception("Chunk failed")
+      task = views.start_upsert_snapshots(audit, event)
+    self.assertEqual(upsert_pairs.call_count,
+                     background_task.INLINE_RETRY_LIMIT + 1)
+    task = models.BackgroundTask.query.get(task.id)
+    self.assertEqual(task.status, "Failure")
@@ -0,0 +1,115 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for keyset based query chunks."""
+
+import os
+import time
+import unittest
+
+from ggrc import db
+from ggrc.models import all_models
+from ggrc.utils import QueryCounter
+from ggrc.utils import generate_query_chunks
+from ggrc.utils import list_chunks
+from ggrc.utils import partition_query
+
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+BENCHMARK_ROWS = int(os.environ.get("GGRC_BENCHMARK_CHUNK_ROWS", "0"))
+
+
+class TestQueryChunks(TestCase):
+  """Tests for generate_query_chunks and partition_query."""
+
+  def setUp(self):
+    super(TestQueryChunks, self).setUp()
+    with factories.single_commit():
+      for i in range(5):
+        factories.MarketFactory(title="Market {}".format(4 - i))
+    self.market_ids = sorted(id_ for id_, in db.session.query(
+        all_models.Market.id))
+
+  def test_chunks_by_id(self):
+    """Chunks cover all rows ordered by id without offsets."""
+    query = all_models.Market.query
+    with QueryCounter() as counter:
+      chunks = [[market.id for market in chunk]
+                for chunk in generate_query_chunks(query, chunk_size=2)]
+    self.assertEqual(chunks, list(list_chunks(self.market_ids, 2)))
+    self.assertFalse([q for q in counter.queries if "OFFSET" in q])
+
+  def test_chunks_by_composite_key(self):
+    """Chunks can be walked by a composite key of a column query."""
+    query = db.session.query(all_models.Market.title)
+    key = (all_models.Market.title, all_models.Market.id)
+    chunks = [[title for title, in chunk]
+              for chunk in generate_query_chunks(query, 2, key)]
+    self.assertEqual(chunks, [
+        ["Market 0", "Market 1"],
+        ["Market 2", "Market 3"],
+        ["Market 4"],
+    ])
+
+  def test_filtered_query(self):
+    """Chunks keep filters of the query."""
+    query = all_models.Market.query.filter(
+        all_models.Market.id.in_(self.market_ids[1:4]))
+    ids = [market.id
+           for chunk in generate_query_chunks(query, chunk_size=2)
+           for market in chunk]
+    self.assertEqual(ids, self.market_ids[1:4])
+
+  def test_partitions(self):
+    """Partitions cover all rows with disjoint key ranges."""
+    partitions = partition_query(all_models.Market.query, 2)
+    self.assertEqual(
+        [sorted(market.id for market in partition)
+         for partition in partitions],
+        [self.market_ids[:3], self.market_ids[3:]],
+    )
+
+
+@unittest.skipUnless(BENCHMARK_ROWS,
+                     "Set GGRC_BENCHMARK_CHUNK_ROWS to run the benchmark")
+class TestQueryChunksBenchmark(TestCase):
+  """Compare keyset chunks with offset paging.
+
+  Run with GGRC_BENCHMARK_CHUNK_ROWS=1000000 for a million-row table.
+  """
+
+  CHUNK_SIZE = 1000
+
+  def setUp(self):
+    super(TestQueryChunksBenchmark, self).setUp()
+    table = all_models.Event.__table__
+    rows = [{"action": "BULK", "resource_id": i}
+            for i in range(BENCHMARK_ROWS)]
+    for chunk in list_chunks(rows, 10000):
+      db.session.execute(table.insert(), chunk)
+    db.session.commit()
+
+  def test_walk_table(self):
+    """Walk the whole events table with both approaches."""
+    query = db.session.query(all_models.Event.id, all_models.Event.action)
+
+    start = time.time()
+    count = query.count()
+    offset_rows = 0
+    for offset in range(0, count, self.CHUNK_SIZE):
+      offset_rows += len(query.order_by("id").limit(
+          self.CHUNK_SIZE).offset(offset).all())
+    offset_time = time.time() - start
+
+    start = time.time()
+    keyset_rows = 0
+    for chunk in generate_query_chunks(query, self.CHUNK_SIZE,
+                                       all_models.Event.id):
+      keyset_rows += len(chunk.all())
+    keyset_time = time.time() - start
+
+    print "Offset paging: {} rows in {:.2f}s".format(offset_rows, offset_time)
+    print "Keyset chunks: {} rows in {:.2f}s".format(keyset_rows, keyset_time)
+    self.assertEqual(offset_rows, keyset_rows)
@@ -9,6 +9,7 @@ import ddt
 from integration.ggrc import TestCase
 from ggrc.models import get_model
 from ggrc.models import all_models
+from ggrc.utils import QueryCounter
 from integration.ggrc.api_helper import Api
 from integration.ggrc.generator import Generator
 from integration.ggrc.generator import ObjectGenerator
@@ -249,6 +250,44 @@ class TestCreator(TestCase):
     check(obj_2, 1)
     check(obj2_acl, 1)
 
+  def test_revision_access_batched(self):
+    """Check that revised objects are loaded at once for all revisions."""
+    acr_id = all_models.AccessControlRole.query.filter_by(
+        object_type="Section",
+        name="Admin"
+    ).first().id
+    self.api.set_user(self.users["admin"])
+    for i in range(3):
+      self.generator.generate(all_models.Section, "section", {
+          "section": {"title": "Hidden Section {}".format(i), "context": None}
+      })
+    self.api.set_user(self.users["creator"])
+    for i in range(3):
+      self.generator.generate(all_models.Section, "section", {
+          "section": {
+              "title": "Linked Section {}".format(i),
+              "context": None,
+              "access_control_list": [{
+                  "person": {
+                      "id": self.users["creator"].id,
+                      "type": "Person",
+                  },
+                  "ac_role_id": acr_id,
+                  "context": None
+              }],
+          }
+      })
+
+    with QueryCounter() as counter:
+      response = self.api.get_query(all_models.Revision,
+                                    "resource_type=Section")
+    self.assert200(response)
+    revisions = response.json["revisions_collection"]["revisions"]
+    self.assertEqual(len(revisions), 3)
+    section_queries = [query for query in counter.queries
+                       if "FROM sections" in query]
+    self.assertEqual(len(section_queries), 1)
+
   @ddt.data("creator", "admin")
   def test_count_type_in_accordion(self, glob_role):
     """Return count of Persons in DB for side accordion."""
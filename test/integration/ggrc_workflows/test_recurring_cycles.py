@@ -0,0 +1,95 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for recurring cycles started by the cron job."""
+
+import datetime as dtm
+
+from freezegun import freeze_time
+from mock import patch
+
+from ggrc import db
+from ggrc.models import all_models
+from ggrc_workflows import build_cycle
+from ggrc_workflows import start_recurring_cycles
+from ggrc_workflows.models import Cycle
+from ggrc_workflows.models import CycleTaskGroupObjectTask
+from ggrc_workflows.models import Workflow
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+from integration.ggrc_workflows.generator import WorkflowsGenerator
+from integration.ggrc_workflows.models import factories as wf_factories
+
+
+class TestStartRecurringCycles(TestCase):
+  """Tests for start_recurring_cycles."""
+
+  def setUp(self):
+    super(TestStartRecurringCycles, self).setUp()
+    self.generator = WorkflowsGenerator()
+
+  def _create_workflow(self, objects_count=0):
+    """Create an active monthly workflow with a single task."""
+    with freeze_time(dtm.date(2017, 9, 25)):
+      with factories.single_commit():
+        workflow = wf_factories.WorkflowFactory(repeat_every=1,
+                                                unit=Workflow.MONTH_UNIT)
+        group = wf_factories.TaskGroupFactory(workflow=workflow)
+        wf_factories.TaskGroupTaskFactory(
+            task_group=group,
+            start_date=dtm.date(2017, 9, 26),
+            end_date=dtm.date(2017, 9, 30))
+        for _ in range(objects_count):
+          control = factories.ControlFactory()
+          wf_factories.TaskGroupObjectFactory(
+              task_group=group,
+              object_id=control.id,
+              object_type="Control")
+      workflow_id = workflow.id
+      self.generator.activate_workflow(workflow)
+    return workflow_id
+
+  def test_task_relationships(self):
+    """Cycle task relationships are inserted with their revisions."""
+    workflow_id = self._create_workflow(objects_count=2)
+
+    with freeze_time(dtm.date(2017, 10, 25)):
+      start_recurring_cycles()
+
+    task_ids = [id_ for id_, in db.session.query(
+        CycleTaskGroupObjectTask.id
+    ).join(
+        Cycle
+    ).filter(
+        Cycle.workflow_id == workflow_id
+    )]
+    self.assertTrue(task_ids)
+    relationships = all_models.Relationship.query.filter(
+        all_models.Relationship.source_type == "CycleTaskGroupObjectTask",
+        all_models.Relationship.source_id.in_(task_ids),
+        all_models.Relationship.destination_type == "Control",
+    ).all()
+    self.assertEqual(len(relationships), 2 * len(task_ids))
+    revisions_count = all_models.Revision.query.filter(
+        all_models.Revision.resource_type == "Relationship",
+        all_models.Revision.resource_id.in_(
+            [rel.id for rel in relationships]),
+    ).count()
+    self.assertEqual(revisions_count, len(relationships))
+
+  def test_failed_workflow_skipped(self):
+    """A failing workflow does not roll back cycles of other workflows."""
+    failing_id = self._create_workflow()
+    workflow_id = self._create_workflow()
+
+    def build_cycle_mock(workflow, *args, **kwargs):
+      if workflow.id == failing_id:
+        raise ValueError("Cycle build failed")
+      return build_cycle(workflow, *args, **kwargs)
+
+    with freeze_time(dtm.date(2017, 10, 25)):
+      with patch("ggrc_workflows.build_cycle", side_effect=build_cycle_mock):
+        start_recurring_cycles()
+
+    self.assertEqual(len(Workflow.query.get(failing_id).cycles), 0)
+    self.assertNotEqual(len(Workflow.query.get(workflow_id).cycles), 0)
@@ -0,0 +1,83 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for batched memcache operations."""
+
+import unittest
+
+import mock
+
+from ggrc.cache import memcache
+from ggrc.cache import stats
+from ggrc.cache.local_memcache import LocalMemcacheClient
+
+
+class TestMemCacheMulti(unittest.TestCase):
+  """Tests for chunked multi operations of MemCache."""
+
+  def setUp(self):
+    self.client = LocalMemcacheClient()
+    self.client.flush_all()
+    self.cache = memcache.MemCache(self.client)
+    self.data = {"key:{}".format(i): {"id": i} for i in range(12)}
+
+  @mock.patch("ggrc.cache.memcache.MULTI_CHUNK_SIZE", 5)
+  def test_chunked_calls(self):
+    """Test that multi operations are sent in chunks."""
+    with mock.patch.object(self.client, "add_multi",
+                           wraps=self.client.add_multi) as add_multi:
+      self.assertEqual(self.cache.add_multi(self.data), [])
+    self.assertEqual(add_multi.call_count, 3)
+    with mock.patch.object(self.client, "get_multi",
+                           wraps=self.client.get_multi) as get_multi:
+      self.assertEqual(self.cache.get_multi(self.data.keys()), self.data)
+    self.assertEqual(get_multi.call_count, 3)
+
+  def test_add_existing(self):
+    """Test that add_multi does not replace cached values."""
+    self.client.set("key:1", "cached")
+    self.assertEqual(self.cache.add_multi(self.data), ["key:1"])
+    self.assertEqual(self.client.get("key:1"), "cached")
+    self.assertEqual(self.cache.set_multi(self.data), [])
+    self.assertEqual(self.client.get("key:1"), {"id": 1})
+
+  def test_remove_multi(self):
+    """Test that remove_multi deletes all keys."""
+    self.cache.set_multi(self.data)
+    self.assertTrue(self.cache.remove_multi(["key:1", "key:2", "missing"]))
+    self.assertEqual(len(self.cache.get_multi(self.data.keys())), 10)
+
+  def test_update_multi(self):
+    """Test that update_multi replaces only cached values."""
+    self.client.set("key:1", "cached")
+    self.assertEqual(
+        sorted(self.cache.update_multi({"key:1": "new", "key:2": "new"})),
+        ["key:2"],
+    )
+    self.assertEqual(self.client.get("key:1"), "new")
+    self.assertIsNone(self.client.get("key:2"))
+
+  def test_values_are_copied(self):
+    """Test that cached values can not be changed in place."""
+    value = {"id": 1}
+    self.client.set("key", value)
+    value["id"] = 2
+    self.assertEqual(self.client.get("key"), {"id": 1})
+
+
+class TestResourceCacheStats(unittest.TestCase):
+  """Tests for resource cache counters."""
+
+  def setUp(self):
+    stats.reset_stats()
+
+  def test_hit_rate(self):
+    """Test that hit rate is counted per resource type."""
+    stats.record_read("Control", 3, 1, 0.01)
+    stats.record_read("Control", 1, 3, 0.03)
+    stats.record_read("Market", 0, 2, 0.01)
+    result = stats.get_stats()
+    self.assertEqual(result["Control"]["hit_rate"], 0.5)
+    self.assertEqual(result["Control"]["reads"], 2)
+    self.assertAlmostEqual(result["Control"]["read_time"], 0.04)
+    self.assertEqual(result["Market"]["hit_rate"], 0.0)
@@ -0,0 +1,149 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for the in-memory relationship graph."""
+
+import unittest
+
+import mock
+
+from ggrc.cache import relationship_graph
+from ggrc.cache.relationship_graph import GraphData
+
+
+class _Transaction(object):
+  """Session transaction or savepoint used by session event listeners."""
+  # pylint: disable=too-few-public-methods
+
+  def __init__(self, parent=None, nested=False):
+    self.parent = parent
+    self.nested = nested
+
+
+class TestGraphData(unittest.TestCase):
+  """Tests for GraphData lookups and changes."""
+
+  def setUp(self):
+    self.data = GraphData()
+    self.data.add_relationship(1, "Control", 1, "Assessment", 1)
+    self.data.add_relationship(2, "Objective", 1, "Control", 1)
+    self.data.add_relationship(3, "Snapshot", 1, "Assessment", 2)
+    self.data.add_snapshot(1, "Audit", 1, "Control", 1)
+    self.data.add_snapshot(2, "Audit", 2, "Control", 2)
+
+  def test_neighbours(self):
+    """Both sides of relationships are neighbours."""
+    self.assertEqual(sorted(self.data.get_neighbours("Control", 1)),
+                     [("Assessment", 1), ("Objective", 1)])
+    self.assertEqual(self.data.get_neighbours("Market", 1), [])
+    self.assertEqual(
+        self.data.get_related_ids("Control", "Objective", [1, 2]), {1})
+
+  def test_snapshot_lookups(self):
+    """Objects are found through snapshots of related objects."""
+    self.assertEqual(self.data.get_snapshot_related_ids(
+        "Assessment", "Control", [1, 2]), {2})
+    self.assertEqual(self.data.get_snapshot_related_ids(
+        "Assessment", "Control", [1], parent_type="Program"), set())
+    self.assertEqual(self.data.get_snapshotted_ids(
+        "Control", "Assessment", [2]), {1})
+    self.assertEqual(self.data.get_parent_ids("Audit", "Control", [2]), {2})
+    self.assertEqual(self.data.get_child_ids("Control", "Audit", [1]), {1})
+
+  def test_duplicate_rows(self):
+    """Rows loaded again by a check are not added twice."""
+    self.data.add_relationship(1, "Control", 1, "Assessment", 1)
+    self.data.add_snapshot(2, "Audit", 2, "Control", 2)
+    self.assertEqual(self.data.relationship_count, 3)
+    self.assertEqual(self.data.snapshot_count, 2)
+
+  def test_remove(self):
+    """Removed rows are not found and unknown rows are reported."""
+    self.assertTrue(
+        self.data.remove_relationship("Control", 1, "Assessment", 1))
+    self.assertFalse(
+        self.data.remove_relationship("Control", 1, "Assessment", 1))
+    self.assertEqual(self.data.get_neighbours("Assessment", 1), [])
+    self.assertFalse(
+        self.data.has_relationship("Control", 1, "Assessment", 1))
+    self.assertTrue(
+        self.data.has_relationship("Objective", 1, "Control", 1))
+    self.assertTrue(self.data.remove_snapshot(1))
+    self.assertFalse(self.data.remove_snapshot(1))
+    self.assertEqual(self.data.get_child_ids("Control", "Audit", [1]), set())
+    self.assertEqual(self.data.relationship_count, 2)
+    self.assertEqual(self.data.snapshot_count, 1)
+
+  def test_snapshot_arrays_swap(self):
+    """Snapshots inserted out of order do not change arrays in place."""
+    snapshots = self.data.snapshots
+    self.data.add_snapshot(5, "Audit", 3, "Control", 3)
+    self.assertIs(self.data.snapshots, snapshots)
+    self.data.add_snapshot(4, "Audit", 1, "Control", 4)
+    self.assertIsNot(self.data.snapshots, snapshots)
+    self.assertEqual(list(snapshots.ids), [1, 2, 5])
+    self.assertEqual(list(self.data.snapshots.ids), [1, 2, 4, 5])
+    self.assertEqual(self.data.get_child_ids("Control", "Audit", [1]),
+                     {1, 4})
+
+  def test_remove_snapshots(self):
+    """Snapshots are removed at once and unknown ids are reported."""
+    self.data.add_snapshot(3, "Audit", 3, "Control", 3)
+    self.assertFalse(self.data.remove_snapshots([1, 3, 4]))
+    self.assertEqual(list(self.data.snapshots.ids), [2])
+    self.assertEqual(list(self.data.snapshots.children),
+                     [self.data.encode("Control", 2)])
+    self.assertEqual(self.data.get_parent_ids("Audit", "Control", [1, 3]),
+                     set())
+
+
+class TestRelationshipGraph(unittest.TestCase):
+  """Tests for keeping the graph of a worker up to date."""
+  # pylint: disable=protected-access
+
+  def setUp(self):
+    patcher = mock.patch.object(relationship_graph, "_graph")
+    self.graph = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def test_mark_changed_session(self):
+    """Core writes of a session expire the graph when it commits."""
+    session = mock.MagicMock(info={}, transaction=_Transaction())
+    relationship_graph.mark_changed(session)
+    self.assertFalse(self.graph.expire.called)
+    relationship_graph._apply_pending(session)
+    self.graph.expire.assert_called_once_with()
+    self.assertEqual(session.info, {relationship_graph._FLUSHED_KEY: True})
+
+  def test_savepoints(self):
+    """Changes are applied once the outermost transaction commits."""
+    root = _Transaction()
+    session = mock.MagicMock(info={}, transaction=_Transaction(root, True))
+    relationship_graph._add_pending(session, "released")
+    relationship_graph._apply_pending(session)
+    self.assertFalse(self.graph.apply.called)
+
+    session.transaction = _Transaction(_Transaction(root, True), True)
+    relationship_graph._add_pending(session, "rolled back")
+    relationship_graph._end_transaction(session, session.transaction)
+
+    session.transaction = _Transaction(root)
+    relationship_graph._add_pending(session, "flushed")
+    session.transaction = root
+    relationship_graph._apply_pending(session)
+    self.graph.apply.assert_called_once_with(["released", "flushed"])
+
+  def test_mark_changed(self):
+    """Committed core writes expire the graph right away."""
+    relationship_graph.mark_changed()
+    self.graph.expire.assert_called_once_with()
+
+  @mock.patch.object(relationship_graph.settings, "RELATIONSHIP_GRAPH", 1,
+                     create=True)
+  @mock.patch.object(relationship_graph.settings, "APP_ENGINE", True,
+                     create=True)
+  def test_app_engine(self):
+    """The graph is not loaded on App Engine."""
+    with mock.patch.object(relationship_graph, "_graph", None):
+      relationship_graph.init_graph(mock.MagicMock())
+      self.assertIsNone(relationship_graph._graph)
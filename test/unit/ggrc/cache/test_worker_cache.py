@@ -0,0 +1,93 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for the worker resource cache."""
+
+import threading
+import unittest
+
+import mock
+
+from ggrc.cache import worker_cache
+from ggrc.cache.local_memcache import LocalMemcacheClient
+
+
+class TestWorkerCache(unittest.TestCase):
+  """Tests for WorkerCache and its invalidation."""
+
+  KEYS = ["collection:programs:1", "collection:programs:2",
+          "collection:audits:1"]
+
+  def setUp(self):
+    self.client = LocalMemcacheClient()
+    self.client.flush_all()
+    self.cache = worker_cache.WorkerCache(max_size=2, ttl=60)
+
+  def _generations(self):
+    return worker_cache.get_generations(self.client, self.KEYS)
+
+  def test_lru_eviction(self):
+    """Test that the least recently used entry is evicted."""
+    generations = self._generations()
+    self.cache.set_multi({self.KEYS[0]: 0, self.KEYS[1]: 1}, generations)
+    self.cache.get_multi([self.KEYS[0]], generations)
+    self.cache.set_multi({self.KEYS[2]: 2}, generations)
+    self.assertEqual(self.cache.get_multi(self.KEYS, generations),
+                     {self.KEYS[0]: 0, self.KEYS[2]: 2})
+    self.assertEqual(self.cache.evictions, 1)
+    self.assertEqual((self.cache.hits, self.cache.misses), (3, 1))
+
+  def test_ttl(self):
+    """Test that expired entries are not returned."""
+    generations = self._generations()
+    self.cache.set_multi({self.KEYS[0]: 0}, generations)
+    with mock.patch("ggrc.cache.worker_cache.time.time",
+                    return_value=10 ** 12):
+      self.assertEqual(self.cache.get_multi(self.KEYS, generations), {})
+    self.assertEqual(self.cache.stale, 1)
+
+  def test_generation(self):
+    """Test that entries of invalidated types are outdated in all workers."""
+    generations = self._generations()
+    self.cache.set_multi({self.KEYS[0]: 0, self.KEYS[2]: 2}, generations)
+    with mock.patch("ggrc.cache.worker_cache.get_resource_cache",
+                    return_value=worker_cache.WorkerCache(2, 60)):
+      # invalidation made by another worker
+      worker_cache.invalidate(self.client, [self.KEYS[1]])
+    self.assertEqual(
+        self.cache.get_multi(self.KEYS, self._generations()),
+        {self.KEYS[2]: 2},
+    )
+
+  def test_missing_generation(self):
+    """Test that an evicted generation does not revive old entries."""
+    generations = self._generations()
+    self.cache.set_multi({self.KEYS[0]: 0}, generations)
+    self.client.flush_all()
+    with mock.patch("ggrc.cache.worker_cache.time.time",
+                    return_value=10 ** 9):
+      new_generations = self._generations()
+    self.assertEqual(self.cache.get_multi(self.KEYS, new_generations), {})
+
+  def test_concurrent_access(self):
+    """Test that threads sharing the cache do not break it."""
+    generations = self._generations()
+    errors = []
+
+    def use_cache():
+      try:
+        for i in range(1000):
+          key = self.KEYS[i % 3]
+          self.cache.set_multi({key: i}, generations)
+          self.cache.get_multi(self.KEYS, generations)
+          self.cache.delete_multi([self.KEYS[(i + 1) % 3]])
+      except Exception as error:  # pylint: disable=broad-except
+        errors.append(error)
+
+    threads = [threading.Thread(target=use_cache) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(errors, [])
+    self.assertLessEqual(len(self.cache._entries), 2)
@@ -42,3 +42,35 @@ class TestGetGDRiveFile(unittest.TestCase):
                                              "v3",
                                              http=auth_mock.return_value)
     disco_files.get.assert_called_once_with(fileId=file_data["id"])
+
+
+class TestCreateGDriveFileFromParts(unittest.TestCase):
+  """Test chunked upload of csv parts to GDrive."""
+
+  @staticmethod
+  def _response(status, **headers):
+    resp = mock.MagicMock(status=status)
+    resp.__getitem__.side_effect = headers.__getitem__
+    return resp
+
+  @mock.patch("ggrc_gdrive_integration.file_actions.UPLOAD_CHUNK_SIZE", 4)
+  @mock.patch("ggrc_gdrive_integration.file_actions.get_http_auth")
+  def test_chunked_upload(self, auth_mock):
+    """Test that csv parts are uploaded in fixed size chunks."""
+    request = auth_mock.return_value.request
+    request.side_effect = [
+        (self._response(200, location="session"), ""),
+        (self._response(308), ""),
+        (self._response(308), ""),
+        (self._response(200), '{"id": "1"}'),
+    ]
+    result = file_actions.create_gdrive_file_from_parts(
+        ["abc", "defgh", "ij"], "file.csv")
+    self.assertEqual(result, {"id": "1"})
+    uploads = [(c[1]["body"], c[1]["headers"]["Content-Range"])
+               for c in request.call_args_list[1:]]
+    self.assertEqual(uploads, [
+        ("abcd", "bytes 0-3/*"),
+        ("efgh", "bytes 4-7/*"),
+        ("ij", "bytes 8-9/10"),
+    ])
@@ -185,3 +185,21 @@ class TestModelColumntHandler(unittest.TestCase):
       self.assertEqual(
           {"col_a": test_custom_handler, "col_b": test_handler},
           model_column_handlers(test_custom_class))
+
+
+class TestGenerateCsvParts(unittest.TestCase):
+  """Tests for streamed csv string generation."""
+
+  def test_parts_match_csv_string(self):
+    """Test that joined csv parts equal the full csv string."""
+    csv_lines = [[u"a", u"b"], [u"c", u"\u010d"], [u"", u"e,f"]] * 5
+    csv_string = import_helper.generate_csv_string(
+        [list(line) for line in csv_lines])
+    parts = list(import_helper.generate_csv_parts(iter(csv_lines),
+                                                  part_size=4))
+    self.assertEqual(len(parts), 4)
+    self.assertEqual("".join(parts), csv_string)
+
+  def test_empty_lines(self):
+    """Test that no parts are generated for no csv lines."""
+    self.assertEqual(list(import_helper.generate_csv_parts([])), [])
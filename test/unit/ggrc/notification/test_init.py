@@ -8,22 +8,57 @@ from mock import patch
 
 from ggrc import app  # noqa
 from ggrc.notifications import common
+from ggrc.notifications.local_mail import LocalMailTransport
 
 
 class TestNotificationsInit(unittest.TestCase):
 
   @patch("ggrc.notifications.common.deleted_task_rels_cache")
   @patch("ggrc.notifications.common.cycle_tasks_cache")
-  @patch("ggrc.notifications.common.get_filter_data")
-  def test_get_notification_data(self, get_filter_data, *cache_mocks):
+  @patch("ggrc.notifications.common._preload_objects")
+  @patch("ggrc.notifications.common._preload_people")
+  @patch("ggrc.notifications.common.should_receive")
+  @patch("ggrc.notifications.common.Services.call_service")
+  def test_get_notification_data(self, call_service, should_receive,
+                                 *cache_mocks):
     """ Test that data does not contain empty emails """
     for cache_func in cache_mocks:
       cache_func.return_value = {}
+    should_receive.return_value = True
 
-    get_filter_data.return_value = {
-        "email@example.com": {},
-        "": {},
+    call_service.return_value = {
+        "email@example.com": {"user": {"id": 1}},
+        "": {"user": {"id": 2}},
     }
     notification_data = common.get_notification_data([1, 2])
     self.assertIn("email@example.com", notification_data)
     self.assertNotIn("", notification_data)
+
+  @patch("ggrc.notifications.common.should_receive")
+  def test_group_by_recipient(self, should_receive):
+    """Data of all notifications is grouped by users who should receive it"""
+    should_receive.side_effect = lambda notif, user_data, _: notif != 3
+    data_list = [
+        (1, {"a@example.com": {"x": {1: 1}}, "b@example.com": {"x": {1: 1}}}),
+        (2, {"a@example.com": {"x": {2: 2}, "y": 2}}),
+        (3, {"b@example.com": {"x": {3: 3}}}),
+    ]
+    self.assertEqual(common.group_by_recipient(data_list, {}), {
+        "a@example.com": {"x": {1: 1, 2: 2}, "y": 2},
+        "b@example.com": {"x": {1: 1}},
+    })
+
+  @patch("ggrc.settings.MAIL_BATCH_SIZE", 2, create=True)
+  @patch("ggrc.settings.MAIL_TRANSPORT", "local", create=True)
+  def test_send_emails_in_batches(self):
+    """Emails are handed to the mail transport in batches"""
+    LocalMailTransport.clear()
+    emails = [common.Email("{}@example.com".format(i), "subject", "body")
+              for i in range(3)]
+    with patch.object(LocalMailTransport, "send_batch",
+                      autospec=True,
+                      side_effect=LocalMailTransport.send_batch) as send:
+      common.send_emails(emails)
+    self.assertEqual(send.call_count, 2)
+    self.assertEqual(LocalMailTransport.outbox, emails)
+    LocalMailTransport.clear()
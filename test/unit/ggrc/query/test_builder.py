@@ -60,3 +60,14 @@ class TestQueryHelper(unittest.TestCase):
 
     for expected_result, expression in expressions:
       self.assertEqual(expected_result, helper._expression_keys(expression))
+
+  @mock.patch("ggrc.query.builder.inflector.get_model")
+  def test_slugs_to_ids_cache(self, get_model):
+    """Test that the same slugs are converted to ids only once."""
+    # pylint: disable=protected-access
+    model = get_model.return_value
+    model.query.filter.return_value.all.return_value = [mock.Mock(id=3)]
+    helper = builder.QueryHelper([])
+    self.assertEqual(helper._slugs_to_ids("Control", ["b", "a"]), [3])
+    self.assertEqual(helper._slugs_to_ids("Control", ["a", "b"]), [3])
+    self.assertEqual(model.query.filter.call_count, 1)
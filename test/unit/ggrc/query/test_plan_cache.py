@@ -0,0 +1,80 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for query plan caches."""
+
+import threading
+import unittest
+
+import mock
+
+from ggrc.query import plan_cache
+
+
+class TestQueryPlanCache(unittest.TestCase):
+  """Tests for QueryPlanCache."""
+
+  def test_get_builds_once(self):
+    """Test that a cached value is built only once."""
+    cache = plan_cache.QueryPlanCache("test")
+    build = mock.MagicMock(return_value="value")
+    self.assertEqual(cache.get("key", build), "value")
+    self.assertEqual(cache.get("key", build), "value")
+    build.assert_called_once_with()
+    self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+  def test_none_key(self):
+    """Test that values with None key are not cached."""
+    cache = plan_cache.QueryPlanCache("test")
+    build = mock.MagicMock(return_value="value")
+    cache.get(None, build)
+    cache.get(None, build)
+    self.assertEqual(build.call_count, 2)
+    self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+  def test_max_size(self):
+    """Test that the least recently used value is evicted."""
+    cache = plan_cache.QueryPlanCache("test", max_size=2)
+    cache.get(1, lambda: 1)
+    cache.get(2, lambda: 2)
+    cache.get(1, lambda: 1)
+    cache.get(3, lambda: 3)
+    build = mock.MagicMock(return_value=2)
+    cache.get(1, build)
+    cache.get(2, build)
+    build.assert_called_once_with()
+
+  def test_concurrent_access(self):
+    """Test that threads sharing a cache do not break it."""
+    cache = plan_cache.QueryPlanCache("test", max_size=5)
+    errors = []
+
+    def use_cache():
+      try:
+        for i in range(2000):
+          self.assertEqual(cache.get(i % 7, lambda i=i: i % 7), i % 7)
+      except Exception as error:  # pylint: disable=broad-except
+        errors.append(error)
+
+    threads = [threading.Thread(target=use_cache) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(errors, [])
+    self.assertLessEqual(len(cache._items), 5)
+
+  def test_expression_key(self):
+    """Test that expression keys do not depend on dict ordering."""
+    first = {"left": "title", "op": {"name": "="}, "right": "x"}
+    second = {"right": "x", "op": {"name": "="}, "left": "title"}
+    self.assertEqual(plan_cache.expression_key("Control", first),
+                     plan_cache.expression_key("Control", second))
+    self.assertNotEqual(plan_cache.expression_key("Control", first),
+                        plan_cache.expression_key("Market", first))
+
+  def test_previous_expression_key(self):
+    """Test that expressions using previous results are not cached."""
+    expression = {"object_name": "__previous__", "op": {"name": "relevant"},
+                  "ids": ["0"]}
+    self.assertIsNone(plan_cache.expression_key("Control", expression))
@@ -0,0 +1,140 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the compiled permission index."""
+
+import logging
+import os
+import random
+import timeit
+import unittest
+
+from ggrc.rbac.permission_index import PermissionIndex
+
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_RESOURCES = int(
+    os.environ.get("GGRC_BENCHMARK_PERMISSION_RESOURCES", "0"))
+
+
+def _legacy_match(permissions, action, resource_type, resource_id,
+                  context_id):
+  """Permission match on the nested permissions dict with list scans."""
+  permission = permissions.get(action, {}).get(resource_type, {})
+  contexts = permission.get("contexts", [])
+  return (None in contexts or
+          resource_id in permission.get("resources", []) or
+          context_id in contexts)
+
+
+def _index_match(index, action, resource_type, resource_id, context_id):
+  contexts = index.contexts(action, resource_type)
+  return (None in contexts or
+          resource_id in index.resources(action, resource_type) or
+          context_id in contexts)
+
+
+def _make_large_role_permissions(count):
+  """Permissions of a user with many contexts and resources per type."""
+  permissions = {"__user": "user@example.com"}
+  for action in ("create", "read", "update", "delete"):
+    for resource_type in ("Program", "Audit", "Control", "Assessment"):
+      permissions.setdefault(action, {})[resource_type] = {
+          "contexts": range(1, count, 2),
+          "resources": range(0, count, 2),
+          "conditions": {
+              None: [{"condition": "is", "terms": {}}],
+          } if resource_type == "Audit" else {},
+      }
+  return permissions
+
+
+def _make_checks(max_id, count):
+  """Random permission checks for ids up to max_id."""
+  return [
+      (random.choice(("read", "update")),
+       random.choice(("Program", "Control", "Issue")),
+       random.randint(0, max_id),
+       random.randint(0, max_id))
+      for _ in range(count)
+  ]
+
+
+class TestPermissionIndex(unittest.TestCase):
+  """Tests for PermissionIndex."""
+
+  def setUp(self):
+    self.permissions = {
+        "__user": "user@example.com",
+        "read": {
+            "Program": {"contexts": [1, 2], "resources": [5]},
+            "Audit": {
+                "contexts": [None],
+                "conditions": {3: [{"condition": "is"}]},
+            },
+            "Control": {},
+        },
+        "update": {},
+    }
+    self.index = PermissionIndex(self.permissions)
+
+  def test_lookups(self):
+    """Test lookups of contexts, resources and conditions."""
+    self.assertEqual(self.index.contexts("read", "Program"), {1, 2})
+    self.assertEqual(self.index.resources("read", "Program"), {5})
+    self.assertEqual(self.index.contexts("read", "Audit"), {None})
+    self.assertEqual(self.index.conditions("read", "Audit", 3),
+                     [{"condition": "is"}])
+    self.assertEqual(self.index.conditions("read", "Audit", None), [])
+    self.assertTrue(self.index.has_conditions("read", "Audit"))
+    self.assertFalse(self.index.has_conditions("read", "Program"))
+
+  def test_missing_permissions(self):
+    """Test that empty and missing entries have no permissions."""
+    self.assertFalse(self.index.has_permission("read", "Control"))
+    self.assertFalse(self.index.has_permission("update", "Program"))
+    self.assertFalse(self.index.has_permission("delete", "Program"))
+    self.assertEqual(self.index.contexts("delete", "Program"), set())
+    self.assertEqual(PermissionIndex(None).contexts("read", "Program"),
+                     set())
+
+  def test_union_for_types(self):
+    """Test contexts and resources of contributing resource types."""
+    self.assertEqual(
+        self.index.contexts_for_types("read", ["Program", "Audit"]),
+        {1, 2, None})
+    self.assertEqual(
+        self.index.resources_for_types("read", ["Program", "Audit"]),
+        {5})
+
+  def test_large_role(self):
+    """Index lookups match nested dict lookups for a large role."""
+    permissions = _make_large_role_permissions(500)
+    index = PermissionIndex(permissions)
+    for check in _make_checks(600, 1000):
+      self.assertEqual(_legacy_match(permissions, *check),
+                       _index_match(index, *check))
+
+
+@unittest.skipUnless(
+    BENCHMARK_RESOURCES,
+    "Set GGRC_BENCHMARK_PERMISSION_RESOURCES to run the benchmark")
+class TestPermissionIndexBenchmark(unittest.TestCase):
+  """Compare nested dict and index lookups for a user with a large role.
+
+  Run with GGRC_BENCHMARK_PERMISSION_RESOURCES=5000, timings are logged.
+  """
+
+  def test_large_role(self):
+    """Time permission checks of a role with many contexts and resources."""
+    permissions = _make_large_role_permissions(BENCHMARK_RESOURCES)
+    index = PermissionIndex(permissions)
+    checks = _make_checks(BENCHMARK_RESOURCES * 6 // 5, 1000)
+    legacy_time = min(timeit.repeat(
+        lambda: [_legacy_match(permissions, *check) for check in checks],
+        number=1, repeat=3))
+    index_time = min(timeit.repeat(
+        lambda: [_index_match(index, *check) for check in checks],
+        number=1, repeat=3))
+    logger.info("Nested dict: %.4fs, index: %.4fs", legacy_time, index_time)
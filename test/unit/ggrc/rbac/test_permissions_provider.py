@@ -0,0 +1,69 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for permission checks of DefaultUserPermissions."""
+
+import unittest
+
+import ggrc.app  # noqa pylint: disable=unused-import
+from ggrc.rbac.permission_index import PermissionIndex
+from ggrc.rbac.permissions_provider import DefaultUserPermissions
+
+
+class StaticUserPermissions(DefaultUserPermissions):
+  """User permissions for a fixed permissions dict."""
+
+  def __init__(self, permissions):
+    self.permissions = permissions
+    self.permission_index = PermissionIndex(permissions)
+
+  def _permissions(self):
+    return self.permissions
+
+  def _permission_index(self):
+    return self.permission_index
+
+
+class TestDefaultUserPermissions(unittest.TestCase):
+  """Tests for DefaultUserPermissions."""
+
+  def setUp(self):
+    self.user_permissions = StaticUserPermissions({
+        "read": {
+            "Program": {"contexts": [1, 2], "resources": [5]},
+            "Market": {"contexts": [None]},
+        },
+        "__GGRC_ADMIN__": {
+            "__GGRC_ALL__": {"contexts": [3]},
+        },
+    })
+
+  def test_is_allowed_read_many(self):
+    """Test batched read checks match single read checks."""
+    resources = [(4, 1), (5, 9), (6, 9), (7, 3), (8, None)]
+    expected = {
+        id_ for id_, context_id in resources
+        if self.user_permissions.is_allowed_read("Program", id_, context_id)
+    }
+    self.assertEqual(expected, {4, 5, 7})
+    self.assertEqual(
+        self.user_permissions.is_allowed_read_many("Program", resources),
+        expected)
+
+  def test_is_allowed_read_many_all(self):
+    """Test batched read checks for a type readable in all contexts."""
+    resources = [(1, 1), (2, None)]
+    self.assertEqual(
+        self.user_permissions.is_allowed_read_many("Market", resources),
+        {1, 2})
+    self.assertEqual(
+        self.user_permissions.is_allowed_read_many("Control", resources),
+        set())
+
+  def test_contexts_for(self):
+    """Test read contexts include admin contexts."""
+    self.assertEqual(
+        set(self.user_permissions.read_contexts_for("Program")), {1, 2, 3})
+    self.assertIsNone(self.user_permissions.read_contexts_for("Market"))
+    self.assertEqual(self.user_permissions.read_resources_for("Program"),
+                     [5])
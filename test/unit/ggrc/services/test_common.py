@@ -150,3 +150,43 @@ class TestFilterResource(TestCase):
                                  depth=1,
                                  user_permissions=object())
     self.assertIsNone(res)
+
+
+class TestResourceCache(TestCase):
+  """Tests for the worker cache tier of Resource."""
+
+  def setUp(self):
+    self.resource = mock.MagicMock()
+    self.resource.model.__name__ = "Control"
+    self.cache_manager = self.resource.request.cache_manager
+    for name, kwargs in (
+        ("get_cache_key", {"side_effect": lambda _, type, id: "{}:{}".format(
+            type, id)}),
+        ("cache_stats", {}),
+        ("worker_cache", {}),
+    ):
+      patcher = mock.patch.object(common, name, **kwargs)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def test_rejected_keys(self):
+    """Keys rejected by memcache are not stored in the worker cache."""
+    self.cache_manager.cache_object.add_multi.return_value = ["controls:2"]
+    common.Resource.add_resources_to_cache.im_func(self.resource, {
+        (1, "controls"): "first",
+        (2, "controls"): "second",
+    })
+    local_cache = common.worker_cache.get_resource_cache.return_value
+    local_cache.set_multi.assert_called_once_with(
+        {"controls:1": "first"}, self.cache_manager.resource_generations)
+
+  def test_invalidate_after_delete(self):
+    """Generations are incremented after the memcache value is deleted."""
+    calls = []
+    memcache_client = self.cache_manager.cache_object.memcache_client
+    memcache_client.delete.side_effect = lambda *_: calls.append("delete")
+    common.worker_cache.invalidate.side_effect = (
+        lambda *_: calls.append("invalidate"))
+    common.Resource.invalidate_cache_to.im_func(
+        self.resource, mock.MagicMock(id=1, type="Control"))
+    self.assertEqual(calls, ["delete", "invalidate"])
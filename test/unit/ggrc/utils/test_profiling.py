@@ -0,0 +1,70 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for sampled request profiling."""
+
+import unittest
+
+import flask
+import mock
+
+from ggrc.utils import benchmarks
+from ggrc.utils import profiling
+
+
+class TestHistogram(unittest.TestCase):
+  """Tests for Histogram buckets."""
+
+  def test_buckets(self):
+    """Values are counted in the first bucket that fits them."""
+    histogram = profiling.Histogram((1, 10))
+    for value in (0, 1, 2, 10, 11, 100):
+      histogram.add(value)
+    self.assertEqual(histogram.to_dict(), {
+        "buckets": [1, 10, None],
+        "counts": [2, 2, 2],
+    })
+
+
+class TestProfilingMiddleware(unittest.TestCase):
+  """Tests for ProfilingMiddleware."""
+
+  def setUp(self):
+    self.app = flask.Flask(__name__)
+
+    @self.app.route("/items/<int:item_id>")
+    def item(item_id):  # pylint: disable=unused-variable
+      with benchmarks.BenchmarkContextManager("load item"):
+        pass
+      return str(item_id)
+
+    self.client = self.app.test_client()
+    patcher = mock.patch.object(profiling, "stats",
+                                profiling.ProfilingStats())
+    self.stats = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def _wrap(self, sample_rate):
+    self.app.wsgi_app = profiling.ProfilingMiddleware(self.app, sample_rate)
+
+  def test_sampled_requests(self):
+    """Sampled requests are aggregated by method and endpoint."""
+    self._wrap(1)
+    self.client.get("/items/1")
+    self.client.get("/items/2")
+    self.client.get("/missing")
+    endpoints = self.stats.to_dict()["endpoints"]
+    self.assertEqual(sorted(endpoints), ["GET <unmatched>", "GET item"])
+    item = endpoints["GET item"]
+    self.assertEqual(item["count"], 2)
+    self.assertEqual(item["statuses"], {200: 2})
+    self.assertEqual(sum(item["durations"]["counts"]), 2)
+    self.assertEqual(item["query_counts"]["counts"][0], 2)
+    self.assertEqual(item["benchmarks"]["load item"]["count"], 2)
+    self.assertEqual(endpoints["GET <unmatched>"]["statuses"], {404: 1})
+
+  def test_not_sampled_requests(self):
+    """Requests outside of the sample are not measured."""
+    self._wrap(0)
+    self.client.get("/items/1")
+    self.assertEqual(self.stats.to_dict()["endpoints"], {})